@@ -0,0 +1,131 @@
+import random
+import asyncio
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright
+
+# Requests we never need for scraping: dropped before they leave the browser
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "facebook.net", "facebook.com", "hotjar.com", "clarity.ms", "tiktok.com", "criteo.com",
+    "analytics.", "segment.io", "sentry.io",
+)
+LAUNCH_ARGS = ["--disable-dev-shm-usage", "--disable-gpu", "--disable-extensions"]
+
+
+async def _block_unneeded(route):
+    req = route.request
+    host = urlparse(req.url).netloc
+    if req.resource_type in BLOCKED_RESOURCE_TYPES or any(h in host for h in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+# =========================
+# BROWSER POOL
+# =========================
+class BrowserPool:
+    """
+    Fixed pool of `num_browsers` Chromium processes, each with one context and
+    `pages_per_browser` reusable tabs. Items are handed to whichever tab is free.
+      - images, fonts, media and trackers are blocked through route interception
+      - a failing item only replaces its own tab; a browser is relaunched only if it died
+      - a tab that cannot be replaced is dropped; its item (and, with no tabs left, the rest) give None
+    Usage:
+        results = BrowserPool(...).run(items, handler)   # handler: async (page, item) -> result
+    """
+
+    def __init__(self, num_browsers: int = 2, pages_per_browser: int = 4, headless: bool = True,
+                 user_agents=None, retries: int = 3):
+        self.num_browsers = num_browsers
+        self.pages_per_browser = pages_per_browser
+        self.headless = headless
+        self.user_agents = user_agents or [None]
+        self.retries = retries
+
+    async def _launch(self, slot: int):
+        browser = await self.playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        context = await browser.new_context(
+            user_agent=random.choice(self.user_agents),
+            viewport={"width": random.randint(1280, 1920), "height": random.randint(720, 1080)},
+            device_scale_factor=1,
+            is_mobile=False,
+        )
+        await context.route("**/*", _block_unneeded)
+        self.slots[slot] = {"browser": browser, "context": context}
+
+    async def _new_page(self, slot: int):
+        # the lock stops several tabs of a crashed browser from each relaunching it
+        async with self.locks[slot]:
+            if not self.slots[slot]["browser"].is_connected():
+                print(f"[POOL] Browser {slot} died, relaunching")
+                await self._launch(slot)
+        return await self.slots[slot]["context"].new_page()
+
+    async def _replace_page(self, slot: int, page):
+        try:
+            await page.close()
+        except Exception:
+            pass
+        return await self._new_page(slot)
+
+    async def _work(self, item, handler):
+        tab = await self.pages.get()
+        if tab is None:
+            # every tab is gone: pass the signal on to the next waiting item
+            self.pages.put_nowait(None)
+            print(f"[POOL] No browser tabs left, skipping {item}")
+            return None
+        slot, page = tab
+        try:
+            for attempt in range(1, self.retries + 1):
+                try:
+                    return await handler(page, item)
+                except Exception as e:
+                    print(f"[POOL] Attempt {attempt}/{self.retries} failed for {item}: {e}")
+                try:
+                    page = await self._replace_page(slot, page)
+                except Exception as e:
+                    # relaunch / new_page failed: this tab is dropped from the pool
+                    print(f"[POOL] Could not replace tab of browser {slot}: {e}")
+                    page = None
+                    return None
+            print(f"[POOL] Skipping {item} after {self.retries} failed attempts.")
+            return None
+        finally:
+            if page is not None:
+                self.pages.put_nowait((slot, page))
+            else:
+                self.live_pages -= 1
+                if self.live_pages == 0:
+                    self.pages.put_nowait(None)
+
+    async def _run(self, items, handler):
+        async with async_playwright() as playwright:
+            self.playwright = playwright
+            self.slots = [None] * self.num_browsers
+            self.locks = [asyncio.Lock() for _ in range(self.num_browsers)]
+            self.pages = asyncio.Queue()
+            for slot in range(self.num_browsers):
+                await self._launch(slot)
+                for _ in range(self.pages_per_browser):
+                    self.pages.put_nowait((slot, await self._new_page(slot)))
+            self.live_pages = self.num_browsers * self.pages_per_browser
+            try:
+                results = await asyncio.gather(*(self._work(item, handler) for item in items),
+                                               return_exceptions=True)
+                # an item that still raised only loses its own result
+                return [None if isinstance(r, BaseException) else r for r in results]
+            finally:
+                for slot in self.slots:
+                    try:
+                        await slot["browser"].close()
+                    except Exception:
+                        pass
+
+    def run(self, items, handler) -> list:
+        """Run handler over items on the pool; results keep input order (None for failures)."""
+        items = list(items)
+        if not items:
+            return []
+        return asyncio.run(self._run(items, handler))
@@ -0,0 +1,277 @@
+import calendar
+from datetime import datetime, date
+from urllib.parse import urlparse
+from apis.http_client import PooledFetcher, TRANSIENT_ERRORS
+from apis.http_cache import default_cache
+
+API_HOST = "crazy-rabbit-api.carro.sg"
+API_URL = "https://" + API_HOST + "/api/v1/rabbit/sg/listings/{slug}?lang=en"
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": "application/json",
+}
+SOLD_STATUSES = {"sold", "pending sale", "pending_sale", "reserved", "on hold", "on_hold"}
+
+# =========================
+# VALUE FORMATTERS
+# =========================
+# The API returns numbers and ISO dates; these render them exactly like the text the
+# detail page shows, so ETL_carro keeps working unchanged on either source.
+def _unwrap(v):
+    # some attributes come as {"value": ..., "label": ...} / {"name": ...}
+    while isinstance(v, dict):
+        for k in ("value", "name", "label", "text"):
+            if k in v:
+                v = v[k]
+                break
+        else:
+            return None
+    return v
+
+def _text(v):
+    return str(v).strip() or None
+
+def _number(v):
+    try:
+        return float(str(v).replace(",", "").replace("$", "").strip())
+    except ValueError:
+        return None
+
+def _money(v):
+    n = _number(v)
+    return None if n is None else f"${n:,.0f}"
+
+def _money_per_year(v):
+    n = _number(v)
+    return None if n is None else f"${n:,.0f} /yr"
+
+def _with_unit(unit):
+    def fmt(v):
+        n = _number(v)
+        return None if n is None else f"{n:,.0f} {unit}"
+    return fmt
+
+def _parse_date(v):
+    s = str(v).strip()
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(s[:19], fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def _reg_date(v):
+    d = _parse_date(v)
+    return d.strftime("%d %b %y") if d else None
+
+def _add_months(d, months):
+    y, m = divmod(d.month - 1 + months, 12)
+    year, month = d.year + y, m + 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
+
+def _coe_left(v, today=None):
+    # expiry date -> "X yrs Y mths Z days" in calendar years/months, as the detail page
+    # counts it (not 365/30-day blocks), so ETL_carro gets the same text from both paths
+    d = _parse_date(v)
+    if d is None:
+        return None
+    today = today or date.today()
+    if d <= today:
+        return "0 yrs 0 mths 0 days"
+    months = (d.year - today.year) * 12 + d.month - today.month
+    if _add_months(today, months) > d:
+        months -= 1
+    days = (d - _add_months(today, months)).days
+    yrs, mths = divmod(months, 12)
+    return f"{yrs} yrs {mths} mths {days} days"
+
+def _date_part(v):
+    return str(v).split(" ")[0].split("T")[0]
+
+
+# =========================
+# FIELD MAP
+# =========================
+# raw column (as scraped from the detail page) -> (keys of the listing object, formatter).
+# Only the listing object's own keys are read (listings/{slug} -> "data"), in order,
+# never nested dealer / brand / promotion / similar-car objects, whose generic
+# "name", "price" or "status" keys describe something else. Horse Power is only
+# taken from keys that say the unit is bhp, which ETL_carro converts to kW.
+FIELD_MAP = {
+    "name": (["title", "display_name"], _text),
+    "price": (["asking_price", "selling_price"], _money),
+    "Number of Previous Owners": (["number_of_owners", "no_of_owners"], _text),
+    "Reg. Date": (["registration_date", "original_registration_date"], _reg_date),
+    "COE Left": (["coe_expiry_date", "coe_expiry_at"], _coe_left),
+    "Mileage": (["mileage"], _with_unit("km")),
+    "Engine CC": (["engine_capacity", "engine_cc"], _with_unit("cc")),
+    "Horse Power": (["horsepower", "horse_power", "power_bhp"], _with_unit("bhp")),
+    "Fuel Type": (["fuel_type"], _text),
+    "Transmission": (["transmission"], _text),
+    "Road Tax": (["road_tax", "annual_road_tax"], _money_per_year),
+    "COE Amount": (["coe_price", "coe_amount"], _money),
+    "OMV": (["omv"], _money),
+    "ARF": (["arf"], _money),
+    "Depreciation": (["depreciation", "annual_depreciation"], _money_per_year),
+    "Paper Value": (["paper_value", "parf_value"], _money),
+    "Scrap Value": (["scrap_value"], _money),
+    "Downpayment": (["downpayment", "down_payment"], _money),
+    "Seats": (["seats", "seating_capacity"], _text),
+    "posted_on": (["listed_at"], _date_part),
+    "price_updated_on": (["asking_price_updated_at"], _date_part),
+}
+STATUS_KEYS = ["status", "listing_status"]
+
+# Fields ETL_carro turns into output columns; if the API lacks any of them the
+# listing is re-scraped in the browser. The rest are dropped by the ETL anyway.
+CORE_FIELDS = [
+    "name", "price", "Number of Previous Owners", "Reg. Date", "COE Left", "Mileage",
+    "Engine CC", "Horse Power", "Fuel Type", "Transmission", "Road Tax", "COE Amount", "OMV",
+    "posted_on",
+]
+
+# Compared between the API and the page for the listings in verify_every (both are
+# fetched in the same run, so COE Left counts down to the same day)
+VERIFY_FIELDS = [
+    "price", "Number of Previous Owners", "Reg. Date", "COE Left", "Mileage", "Engine CC",
+    "Horse Power", "Fuel Type", "Transmission", "COE Amount", "OMV", "sold",
+]
+
+
+def _listing_value(listing: dict, keys):
+    """First non-empty value of the listing object under one of keys (no nested search)."""
+    for k in keys:
+        v = _unwrap(listing.get(k))
+        if v not in (None, "", []):
+            return v
+    return None
+
+def listing_from_api(data: dict, url: str) -> dict:
+    """Map one listings/{slug} payload ("data") to the same keys scrape_worker_chunk produces."""
+    car = {"url": url}
+    for column, (keys, fmt) in FIELD_MAP.items():
+        v = _listing_value(data, keys)
+        car[column] = fmt(v) if v is not None else None
+    status = _listing_value(data, STATUS_KEYS)
+    car["sold"] = str(status).strip().lower() in SOLD_STATUSES if status is not None else None
+    return car
+
+def mismatched_fields(api_car: dict, page_car: dict) -> list:
+    """VERIFY_FIELDS both sources have that disagree (case and spacing ignored)."""
+    def norm(v):
+        return " ".join(str(v).lower().split())
+    def known(v):
+        return v not in (None, "") and norm(v) not in ("n.a", "n.a.")
+    return [f for f in VERIFY_FIELDS
+            if known(api_car.get(f)) and known(page_car.get(f)) and norm(api_car[f]) != norm(page_car[f])]
+
+def missing_fields(car: dict) -> list:
+    missing = [f for f in CORE_FIELDS if car.get(f) in (None, "")]
+    if car.get("sold") is None:
+        missing.append("sold")
+    return missing
+
+
+# =========================
+# LISTING SEARCH RESPONSES
+# =========================
+def is_listing_search_response(response) -> bool:
+    """
+    True for the XHR/fetch calls the listing page makes to load (more) cars: the
+    listings search endpoint only, not the listings/{slug} detail calls.
+    """
+    req = response.request
+    parts = urlparse(response.url).path.rstrip("/").split("/")
+    is_search = parts[-1:] == ["listings"] or parts[-2:] == ["listings", "search"]
+    return (urlparse(response.url).netloc == API_HOST and is_search
+            and req.resource_type in ("xhr", "fetch") and response.status == 200)
+
+def listing_items_from_api(body) -> list:
+    """Listing objects with a slug, in page order, of the first such list found in a search response."""
+    queue = [body]
+    while queue:
+        level = []
+        for node in queue:
+            if isinstance(node, list):
+                if node and isinstance(node[0], dict) and "slug" in node[0]:
+                    return [item for item in node if isinstance(item, dict) and item.get("slug")]
+                level.extend(v for v in node if isinstance(v, (dict, list)))
+            elif isinstance(node, dict):
+                level.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        queue = level
+    return []
+
+
+# =========================
+# API-FIRST DETAIL FETCH
+# =========================
+def slug_from(url):
+    return urlparse(url).path.rstrip("/").split("/")[-1]
+
+def fetch_listing(fetcher: PooledFetcher, url: str):
+    """One API round trip for a listing URL; returns the mapped dict or None on failure."""
+    try:
+        resp = fetcher.get(API_URL.format(slug=slug_from(url)), retries=3, retry_sleep=1.2)
+    except TRANSIENT_ERRORS:
+        return None
+    if resp.status_code != 200:
+        print(f"[CARRO API] {resp.status_code} for {url}")
+        return None
+    try:
+        data = resp.json().get("data") or {}
+    except ValueError:
+        print(f"[CARRO API] Non-JSON response for {url}")
+        return None
+    return listing_from_api(data, url)
+
+def fetch_carro_details(links, browser_fallback=None, max_workers=8, requests_per_second=4.0, verify_every=50):
+    """
+    Fetch every listing through the JSON API on a pooled client. Listings the API
+    could not serve, or that lack a core field, are handed to browser_fallback(links)
+    (a list of page-scraped dicts); its values only fill what the API left empty.
+    One in `verify_every` complete listings is also scraped in the browser and its
+    VERIFY_FIELDS compared, so a changed API payload shows up as mismatches in the log.
+    """
+    with PooledFetcher(max_workers=max_workers, requests_per_second=requests_per_second,
+                       headers=HEADERS, cache=default_cache()) as fetcher:
+        cars = fetcher.map(lambda u: fetch_listing(fetcher, u), links)
+
+    fallback_links, verify_links = [], []
+    complete = 0
+    for url, car in zip(links, cars):
+        missing = ["api"] if car is None else missing_fields(car)
+        if missing:
+            fallback_links.append(url)
+            print(f"[CARRO API] {url} missing {missing} → browser fallback")
+            continue
+        if verify_every and complete % verify_every == 0:
+            verify_links.append(url)
+        complete += 1
+    print(f"[CARRO API] {len(links) - len(fallback_links)}/{len(links)} listings complete from API")
+
+    if (fallback_links or verify_links) and browser_fallback is not None:
+        scraped = {row["url"]: row for row in browser_fallback(fallback_links + verify_links)}
+        mismatched = 0
+        for i, (url, car) in enumerate(zip(links, cars)):
+            page = scraped.get(url)
+            if page is None:
+                continue
+            if car is None:
+                cars[i] = page
+                continue
+            if url in verify_links:
+                fields = mismatched_fields(car, page)
+                if fields:
+                    mismatched += 1
+                    print(f"[CARRO API] {url} API and page disagree on {fields}: "
+                          + ", ".join(f"{f}={car.get(f)!r}/{page.get(f)!r}" for f in fields))
+            for k, v in page.items():
+                if car.get(k) in (None, ""):
+                    car[k] = v
+        if verify_links:
+            print(f"[CARRO API] Verified {len(verify_links)} listings against the page, {mismatched} mismatched")
+    return [car for car in cars if car is not None]
@@ -0,0 +1,173 @@
+# carro_api_check.py
+# Check of the listings/{slug} -> raw Carro row mapping (listing_from_api): every
+# field must come from the listing object itself, never from the dealer, brand,
+# promotion or similar-car objects nested in the same payload, and must read the
+# same as the detail page shows it.
+#
+# Usage: python -m apis.carro_api_check [listing.json ...]
+#        python -m apis.carro_api_check --record <slug> [<slug> ...]
+# --record saves the live API response and the detail page of each slug under
+# apis/fixtures/carro/ (listing_<slug>.json / .html). Every recorded pair found
+# there is checked field by field against parse_detail_html on the saved page,
+# COE Left as of the recording date. SYNTHETIC below is hand-written (key names
+# as FIELD_MAP expects them) and only checks that nested objects never leak in.
+import os
+import sys
+import json
+import glob
+from datetime import date
+import requests
+from apis.carro_api import (
+    API_URL, HEADERS, CORE_FIELDS, FIELD_MAP, VERIFY_FIELDS,
+    _coe_left, _listing_value, listing_from_api, mismatched_fields, missing_fields,
+)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "carro")
+PAGE_URL = "https://carro.co/sg/en/cars/{slug}"
+
+# =========================
+# SYNTHETIC FIXTURE
+# =========================
+SYNTHETIC = {
+    "data": {
+        "id": 412345,
+        "slug": "toyota-corolla-altis-16a-elegance-412345",
+        "title": "Toyota Corolla Altis 1.6A Elegance",
+        "status": "available",
+        "asking_price": 78888,
+        "registration_date": "2019-03-12 00:00:00",
+        "coe_expiry_date": "2029-03-11 00:00:00",
+        "number_of_owners": 2,
+        "mileage": 45000,
+        "engine_capacity": 1598,
+        "horsepower": 121,
+        "fuel_type": "Petrol",
+        "transmission": "Auto",
+        "road_tax": 742,
+        "coe_price": 36001,
+        "omv": 19330,
+        "arf": 7062,
+        "depreciation": 8450,
+        "listed_at": "2025-10-14 09:21:07",
+        "asking_price_updated_at": "2025-10-16 11:02:45",
+        # nested objects with the same generic keys: must not leak into the listing
+        "dealer": {"name": "Carro Certified", "status": "sold", "price": 1, "owners": 9},
+        "brand": {"name": "Toyota", "power": 999},
+        "promotions": [{"title": "Free servicing", "price": 0, "status": "on_hold"}],
+        "similar_cars": [{"title": "Honda Civic", "asking_price": 91000, "status": "sold",
+                          "mileage": 12000, "coe_price": 99999, "horsepower": 170}],
+    }
+}
+
+EXPECTED = {
+    "name": "Toyota Corolla Altis 1.6A Elegance",
+    "price": "$78,888",
+    "Number of Previous Owners": "2",
+    "Reg. Date": "12 Mar 19",
+    "Mileage": "45,000 km",
+    "Engine CC": "1,598 cc",
+    "Horse Power": "121 bhp",
+    "Fuel Type": "Petrol",
+    "Transmission": "Auto",
+    "Road Tax": "$742 /yr",
+    "COE Amount": "$36,001",
+    "OMV": "$19,330",
+    "ARF": "$7,062",
+    "Depreciation": "$8,450 /yr",
+    "posted_on": "2025-10-14",
+    "price_updated_on": "2025-10-16",
+    "sold": False,
+}
+
+# COE Left counted in calendar years/months/days from the recording day
+COE_LEFT_CASES = [
+    (date(2026, 10, 17), "2029-03-11 00:00:00", "2 yrs 4 mths 22 days"),
+    (date(2026, 10, 17), "2026-11-17", "0 yrs 1 mths 0 days"),
+    (date(2026, 10, 17), "2031-10-17", "5 yrs 0 mths 0 days"),
+    (date(2026, 1, 31), "2026-02-28", "0 yrs 1 mths 0 days"),
+    (date(2026, 10, 17), "2026-10-01", "0 yrs 0 mths 0 days"),
+]
+
+def check_fixture() -> int:
+    data = SYNTHETIC["data"]
+    car = listing_from_api(data, "https://carro.co/sg/en/buy-car/" + data["slug"])
+    failures = [f"{k}: got {car.get(k)!r}, expected {v!r}" for k, v in EXPECTED.items() if car.get(k) != v]
+    if missing_fields(car):
+        failures.append(f"missing core fields {missing_fields(car)}")
+
+    # a listing without its own price / status / horsepower must not borrow them from nested objects
+    bare = {k: v for k, v in data.items() if k not in ("asking_price", "status", "horsepower", "mileage")}
+    car = listing_from_api(bare, "https://carro.co/sg/en/buy-car/bare")
+    for k in ("price", "sold", "Horse Power", "Mileage"):
+        if car.get(k) is not None:
+            failures.append(f"bare listing {k}: got {car[k]!r} from a nested object, expected None")
+
+    for today, expiry, expected in COE_LEFT_CASES:
+        got = _coe_left(expiry, today)
+        if got != expected:
+            failures.append(f"COE Left {expiry} on {today}: got {got!r}, expected {expected!r}")
+
+    for line in failures:
+        print(f"[FAIL] {line}")
+    print(f"[carro_api_check] synthetic fixture: {'OK' if not failures else f'{len(failures)} failures'}")
+    return len(failures)
+
+def check_recorded(fixture_dir=FIXTURE_DIR) -> int:
+    """API mapping vs the saved detail page for every recorded listing_<slug>.json/.html pair."""
+    failures = 0
+    paths = sorted(glob.glob(os.path.join(fixture_dir, "listing_*.json")))
+    if paths:
+        from apis.carro_scrape import parse_detail_html
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        with open(path[:-len(".json")] + ".html", encoding="utf-8") as f:
+            page = parse_detail_html(f.read(), saved["url"])
+        data = saved["response"].get("data") or {}
+        car = listing_from_api(data, saved["url"])
+        expiry = _listing_value(data, FIELD_MAP["COE Left"][0])
+        car["COE Left"] = _coe_left(expiry, date.fromisoformat(saved["recorded_on"])) if expiry else None
+        bad = mismatched_fields(car, page) + [f"missing {f}" for f in missing_fields(car)]
+        failures += bool(bad)
+        print(f"[carro_api_check] {os.path.basename(path)}: "
+              + ("OK" if not bad else ", ".join(f"{f}: api {car.get(f)!r} / page {page.get(f)!r}"
+                                                  if f in VERIFY_FIELDS else f for f in bad)))
+    print(f"[carro_api_check] recorded fixtures: {len(paths)} checked, {failures} failing")
+    return failures
+
+def check_files(paths) -> int:
+    incomplete = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f).get("data") or {}
+        car = listing_from_api(data, data.get("slug") or path)
+        missing = missing_fields(car)
+        incomplete += bool(missing)
+        print(f"[carro_api_check] {path}: " + ", ".join(f"{k}={car.get(k)!r}" for k in CORE_FIELDS + ["sold"])
+              + (f" | missing {missing}" if missing else ""))
+    return incomplete
+
+def record(slugs, fixture_dir=FIXTURE_DIR):
+    os.makedirs(fixture_dir, exist_ok=True)
+    for slug in slugs:
+        resp = requests.get(API_URL.format(slug=slug), headers=HEADERS, timeout=15)
+        resp.raise_for_status()
+        url = PAGE_URL.format(slug=slug)
+        page = requests.get(url, headers={"User-Agent": HEADERS["User-Agent"]}, timeout=30)
+        page.raise_for_status()
+        path = os.path.join(fixture_dir, f"listing_{slug}")
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"url": url, "recorded_on": date.today().isoformat(), "response": resp.json()},
+                      f, ensure_ascii=False, indent=1)
+        with open(path + ".html", "w", encoding="utf-8") as f:
+            f.write(page.text)
+        print(f"[carro_api_check] Saved {path}.json / .html")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--record"]:
+        record(args[1:])
+    elif args:
+        sys.exit(check_files(args))
+    else:
+        sys.exit(check_fixture() + check_recorded())
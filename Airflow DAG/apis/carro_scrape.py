@@ -1,13 +1,14 @@
 import os
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup as bs
+from apis.html_parser import make_soup
 import pandas as pd
 from datetime import datetime
 import random, time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
+import asyncio
 import requests
 from urllib.parse import urlparse
+from apis.carro_api import fetch_carro_details, is_listing_search_response, listing_items_from_api
+from apis.browser_pool import BrowserPool
 
 # -----------------------------
 # Click individual listings (More Details Version)
@@ -15,9 +16,9 @@ from urllib.parse import urlparse
 
 def run_scraper_with_clicks(prev_df, unlimited_clicker=False, max_clicks=3, max_workers=10, headless=True):
     """
-    Clicks into each car listing on a specific page on SgCarMart.
-    Extracts details from styles_container__ezmR5 on the detail page.
-    Returns a list of dictionaries with detailed info.
+    Collects Carro listing links from the listing page, then fetches each listing's
+    details from the Carro JSON API (browser scrape only for fields the API lacks).
+    Returns a DataFrame with detailed info.
     """
     user_agents = [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -37,8 +38,12 @@ def run_scraper_with_clicks(prev_df, unlimited_clicker=False, max_clicks=3, max_
             is_mobile=False,
         )
         page = context.new_page()
+        # only keep references here; bodies are read in the main flow, never inside the callback
+        api_responses = []
+        page.on("response", lambda r: api_responses.append(r) if is_listing_search_response(r) else None)
 
         all_links = []
+        known_slugs = known_carro_slugs(prev_df)
         
         # -------------------------
         # Phase 1: Collect all Carro Certified links
@@ -48,226 +53,244 @@ def run_scraper_with_clicks(prev_df, unlimited_clicker=False, max_clicks=3, max_
         page.goto(base_url, timeout=60000)
         time.sleep(random.uniform(1, 2))
 
-        # Keep clicking "Show More Cars" and scrape page as we go
-        click_count = 0
-        prev_scroll_height = 0
-        stop_pull_boolean = False
-        while ((click_count < max_clicks) or unlimited_clicker) and not stop_pull_boolean:
-            all_links, prev_scroll_height, stop_pull_boolean = scroll_to_bottom(prev_df, page, all_links, prev_scroll_height)
-            if stop_pull_boolean:
-                break
-            try:
-                show_more_button = page.query_selector("button:has-text('Show More Cars')")
-                if show_more_button:
-                    print(f"Clicking 'Show More Cars' [{click_count+1}]...")
-                    show_more_button.click()
-                    click_count += 1
-                else:
-                    print("No more 'Show More Cars' button found.")
-                    break
-            except Exception as e:
-                print(f"No more cars to load or button missing: {e}")
-                break
+        # Prefer the listing API responses behind "Show More Cars"; fall back to reading cards
+        links = discover_links_via_api(page, api_responses, known_slugs, unlimited_clicker, max_clicks)
+        if links is None:
+            print("Carro: listing API responses not recognised, falling back to scrolling the cards")
+            links = discover_links_via_scroll(page, known_slugs, unlimited_clicker, max_clicks)
+        all_links.extend(links)
 
         print(f"Found {len(all_links)} Carro additional used car links.")
 
         context.close()
         browser.close()
 
-        # Get the URLs of all links scrapped (for debugging)
-        # url_df = pd.DataFrame(all_links)
-        # save_to_excel(url_df, filename=f"carro_urls_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-
-        # -------------------------
-        # Phase 2: Scrape each link with parallelizing
-        # -------------------------
-        final_data = []
-        chunks = chunk_list(all_links, max_workers)
+    # Get the URLs of all links scrapped (for debugging)
+    # url_df = pd.DataFrame(all_links)
+    # save_to_excel(url_df, filename=f"carro_urls_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_chunk = {
-                executor.submit(scrape_worker_chunk, chunk, user_agents, headless): idx
-                for idx, chunk in enumerate(chunks)
-            }
-            for future in as_completed(future_to_chunk):
-                data = future.result()
-                final_data.extend(data)
+    # -------------------------
+    # Phase 2: Fetch each listing from the JSON API; the browser only fills gaps
+    # -------------------------
+    final_data = fetch_carro_details(
+        all_links,
+        browser_fallback=lambda links: scrape_links_with_browser(links, user_agents, max_workers, headless),
+    )
 
-        df = pd.DataFrame(final_data)
-        df["scrape_date"] = datetime.today().strftime("%Y-%m-%d")
+    df = pd.DataFrame(final_data)
+    df["scrape_date"] = datetime.today().strftime("%Y-%m-%d")
 
-        if not prev_df.empty:
-            df = pd.concat([prev_df, df], ignore_index=True, sort=False)
+    if not prev_df.empty:
+        df = pd.concat([prev_df, df], ignore_index=True, sort=False)
 
-        return df
+    return df
 
 # -----------------------------
-# Scraper for each list chunk to help with parallelizing
+# Browser scrape of detail pages (fallback for listings the API cannot fully serve)
 # -----------------------------
-def scrape_worker_chunk(links_chunk, user_agents, headless=True):
-    # Unique thread id
-    thread_id = threading.get_ident() 
-
-    # Open a browser for each parallel process
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        context = browser.new_context(
-            user_agent=random.choice(user_agents),
-            viewport={"width": random.randint(1280, 1920), "height": random.randint(720, 1080)},
-            device_scale_factor=1,
-            is_mobile=False,
-        )
-
-        all_data = []
-        i = 0
-        while i < len(links_chunk):
-            link = links_chunk[i]
-            time.sleep(random.uniform(2, 5))
-            retries = 0
-            success = False
-
-            while retries < 3 and not success:
-                try:
-                    new_page = context.new_page()
-                    new_page.goto(link, timeout=60000)
-                    time.sleep(random.uniform(1.5, 3.5))
-                    new_page.mouse.wheel(0, random.randint(500, 1500))
-                    new_page.wait_for_selector("div.DetailOverview__StyledMetaCard-sc-5e76af8e-7")
-
-                    html = new_page.content()
-                    soup = bs(html, "html.parser")
-
-                    # Title
-                    name_el = soup.select_one("h1.detailTitle")
-                    car_name = name_el.get_text(strip=True) if name_el else "N.A"
-
-                    # Car Price
-                    price_tag = soup.select_one("span.carPrice")
-                    car_price = price_tag.get_text(strip=True) if price_tag else "N.A"
-
-                    # Car Sold Boolean
-                    status_tag = soup.select_one("div.styles__StyledStatusHeader-sc-7efdfd35-5")
-                    status_text = status_tag.get_text(strip=True) if status_tag else ""
-                    is_sold = status_text in ["Sold", "Pending Sale", "Reserved", "On Hold"]
-
-                    # Collect cards (Number of Owners, Reg. Date, COE Left, etc.)
-                    detail_dict = {}
-                    cards = soup.select("div.DetailOverview__StyledMetaCard-sc-5e76af8e-7")
-                    for card in cards:
-                        label_tag = card.select_one("span.DetailOverview__StyleCardTitle-sc-5e76af8e-6")
-                        value_tag = card.select_one("div.font-family-bold")
-                        if label_tag and value_tag:
-                            label = label_tag.get_text(strip=True)
-                            value = value_tag.get_text(strip=True)
-                            detail_dict[label] = value
-
-                    # Collect meta-rows (Transmission, Engine CC, Fuel Type, etc.)
-                    meta_rows = soup.select("div.meta-row")
-                    for row in meta_rows:
-                        name_tag = row.select_one("div.meta-name")
-                        value_tag = row.select_one("div.meta-value")
-                        if name_tag and value_tag:
-                            label = name_tag.get_text(strip=True)
-                            value = value_tag.get_text(strip=True)
-                            detail_dict[label] = value
-
-                    # Combine all info
-                    car_data = {
-                        "name": car_name,
-                        "price": car_price,
-                        "url": link,
-                        "sold": is_sold,
-                    }
-                    
-                    car_data.update(detail_dict)
-                    posted_on_date, asking_price_updated_at = posted_on(slug_from(link))
-                    car_data["posted_on"] = posted_on_date.split(" ")[0] # Add posted_on date
-                    car_data["price_updated_on"] = asking_price_updated_at.split(" ")[0] # Add price updated date
-                    all_data.append(car_data)
-
-                    # Go back to listing
-                    time.sleep(random.uniform(2, 5))  # random pause before closing
-                    new_page.close()
-
-                    success = True
-                    print(f"[Thread {thread_id}] Succesfully scraped listing {i+1}")
-                    i += 1 # only increment if we are succesful in pulling data
-
-                except Exception as e:
-                    print(f"[Thread {thread_id}] Failed to scrape listing {i+1}: {e}")
-                    retries += 1
-                    try:
-                        context.close()
-                        browser.close()
-                    except:
-                        pass
-                    # restart browser/context here
-                    browser = p.chromium.launch(headless=headless)
-                    context = browser.new_context(
-                        user_agent=random.choice(user_agents),
-                        viewport={"width": random.randint(1280, 1920), "height": random.randint(720, 1080)},
-                        device_scale_factor=1,
-                        is_mobile=False,
-                    )
-                    time.sleep(2)
-        
-            if not success:
-                print(f"[Thread {thread_id}] Skipping listing {i+1} after 3 failed attempts.")
-                i += 1
-
-        context.close()
-        browser.close()
-    return all_data
+def scrape_links_with_browser(links, user_agents, max_workers=10, headless=True, pages_per_browser=4):
+    """
+    Scrape detail pages on a shared BrowserPool: max_workers tabs in total, spread
+    over as few Chromium processes as possible, with images/fonts/trackers blocked.
+    """
+    num_browsers = max(1, -(-max_workers // pages_per_browser))
+    pool = BrowserPool(num_browsers=num_browsers, pages_per_browser=min(pages_per_browser, max_workers),
+                       headless=headless, user_agents=user_agents)
+    results = pool.run(links, scrape_listing_page)
+    return [car for car in results if car is not None]
 
 # -----------------------------
-# Scroll to button of the page while pulling urls:
+# Scrape one listing on a pooled page
 # -----------------------------
+async def scrape_listing_page(page, link):
+    await asyncio.sleep(random.uniform(0.5, 1.5))  # keep requests to carro.co spaced out
+    await page.goto(link, timeout=60000, wait_until="domcontentloaded")
+    await page.mouse.wheel(0, random.randint(500, 1500))
+    await page.wait_for_selector("div.DetailOverview__StyledMetaCard-sc-5e76af8e-7")
+    html = await page.content()
+
+    car_data = parse_detail_html(html, link)
+    posted_on_date, asking_price_updated_at = await asyncio.to_thread(posted_on, slug_from(link))
+    car_data["posted_on"] = (posted_on_date or "").split(" ")[0] or None # Add posted_on date
+    car_data["price_updated_on"] = (asking_price_updated_at or "").split(" ")[0] or None # Add price updated date
+    print(f"[Browser] Succesfully scraped listing {link}")
+    return car_data
+
+def parse_detail_html(html, link):
+    # html.parser: the lxml switch was only compared on Motorist pages (apis/motorist_parse_check.py)
+    soup = make_soup(html, parser="html.parser")
+
+    # Title
+    name_el = soup.select_one("h1.detailTitle")
+    car_name = name_el.get_text(strip=True) if name_el else "N.A"
+
+    # Car Price
+    price_tag = soup.select_one("span.carPrice")
+    car_price = price_tag.get_text(strip=True) if price_tag else "N.A"
+
+    # Car Sold Boolean
+    status_tag = soup.select_one("div.styles__StyledStatusHeader-sc-7efdfd35-5")
+    status_text = status_tag.get_text(strip=True) if status_tag else ""
+    is_sold = status_text in ["Sold", "Pending Sale", "Reserved", "On Hold"]
+
+    # Collect cards (Number of Owners, Reg. Date, COE Left, etc.)
+    detail_dict = {}
+    cards = soup.select("div.DetailOverview__StyledMetaCard-sc-5e76af8e-7")
+    for card in cards:
+        label_tag = card.select_one("span.DetailOverview__StyleCardTitle-sc-5e76af8e-6")
+        value_tag = card.select_one("div.font-family-bold")
+        if label_tag and value_tag:
+            label = label_tag.get_text(strip=True)
+            value = value_tag.get_text(strip=True)
+            detail_dict[label] = value
+
+    # Collect meta-rows (Transmission, Engine CC, Fuel Type, etc.)
+    meta_rows = soup.select("div.meta-row")
+    for row in meta_rows:
+        name_tag = row.select_one("div.meta-name")
+        value_tag = row.select_one("div.meta-value")
+        if name_tag and value_tag:
+            label = name_tag.get_text(strip=True)
+            value = value_tag.get_text(strip=True)
+            detail_dict[label] = value
+
+    # Combine all info
+    car_data = {
+        "name": car_name,
+        "price": car_price,
+        "url": link,
+        "sold": is_sold,
+    }
+    car_data.update(detail_dict)
+    return car_data
 
-def scroll_to_bottom(prev_df, page, all_links, prev_scroll_height, step=1500, pause_range=(0.25, 0.5)):
-    previous_height = prev_scroll_height
-    unique_stop_urls = set(prev_df["url"].tolist()) if (prev_df is not None and not prev_df.empty and "url" in prev_df.columns) else None
-    stop_pull_boolean = False
+# -----------------------------
+# Link discovery (stops at the first listing we already have)
+# -----------------------------
+CARD_SELECTOR = "div.ant-col-8 div.LazyRenderCard__StyleCardWrapper-sc-d4ea256-0"
+SHOW_MORE_SELECTOR = "button:has-text('Show More Cars')"
+
+def known_carro_slugs(prev_df):
+    """Slugs of every listing already scraped, built once per run for O(1) lookups."""
+    if prev_df is None or prev_df.empty or "url" not in prev_df.columns:
+        return set()
+    return {slug_from(u) for u in prev_df["url"].dropna().astype(str)}
+
+def card_hrefs(page, start=0):
+    """hrefs of the cards from index `start` on, in one round trip (None for cards not rendered yet)."""
+    return page.eval_on_selector_all(
+        CARD_SELECTOR,
+        "(els, start) => els.slice(start).map(e => { const a = e.querySelector('a'); return a ? a.getAttribute('href') : null; })",
+        start,
+    )
+
+USED_LISTING_PREFIX = "https://carro.co/sg/en/cars/"
+
+def used_listing_link(item):
+    """Detail link of a used-car search item; None for new cars (links without /cars/, as on the cards)."""
+    own = item.get("url") or item.get("link")
+    if isinstance(own, str) and own.strip():
+        link = own if own.startswith("http") else "https://carro.co" + own
+        return link if "/cars/" in link else None  # Skip New Cars
+    return USED_LISTING_PREFIX + item["slug"]
+
+def discover_links_via_api(page, api_responses, known_slugs, unlimited_clicker=False, max_clicks=3):
+    """
+    Read new listing slugs straight from the search API responses the page makes on
+    load and on every "Show More Cars" click, stopping at the first known slug.
+    Returns None if no such response was seen, so the caller can fall back to the DOM.
+    """
+    first = card_hrefs(page)
+    if not first or not first[0]:
+        return None
+
+    links, seen = [], set()
+    click_count = 0
+    got_api_data = False
+    if not api_responses:
+        # first batch was server-rendered: read it from the cards, later batches from the API
+        if scroll_to_bottom(page, known_slugs, links, {"next_index": 0, "height": 0}):
+            return links
+        seen.update(slug_from(link) for link in links)
+    while True:
+        while api_responses:
+            try:
+                items = listing_items_from_api(api_responses.pop(0).json())
+            except Exception:
+                continue
+            got_api_data = got_api_data or bool(items)
+            for item in items:
+                slug = item["slug"]
+                if slug in known_slugs:
+                    print(f"Carro: Reached old listing {slug}")
+                    return links
+                link = used_listing_link(item)
+                if slug not in seen and link is not None:
+                    seen.add(slug)
+                    links.append(link)
+        if click_count > 0 and not got_api_data:
+            return None
+        if not unlimited_clicker and click_count >= max_clicks:
+            return links
+        button = page.query_selector(SHOW_MORE_SELECTOR)
+        if not button:
+            print("No more 'Show More Cars' button found.")
+            return links
+        try:
+            with page.expect_response(is_listing_search_response, timeout=20000):
+                button.click()
+            click_count += 1
+            print(f"Clicked 'Show More Cars' [{click_count}], {len(links)} new links so far")
+        except Exception as e:
+            print(f"No more cars to load or button missing: {e}")
+            return links if got_api_data else None
+
+def discover_links_via_scroll(page, known_slugs, unlimited_clicker=False, max_clicks=3):
+    """Scroll the cards and click "Show More Cars" until a known listing appears."""
+    links = []
+    state = {"next_index": 0, "height": 0}
+    click_count = 0
+    while True:
+        if scroll_to_bottom(page, known_slugs, links, state):
+            return links
+        if not unlimited_clicker and click_count >= max_clicks:
+            return links
+        try:
+            show_more_button = page.query_selector(SHOW_MORE_SELECTOR)
+            if not show_more_button:
+                print("No more 'Show More Cars' button found.")
+                return links
+            print(f"Clicking 'Show More Cars' [{click_count+1}]...")
+            show_more_button.click()
+            click_count += 1
+        except Exception as e:
+            print(f"No more cars to load or button missing: {e}")
+            return links
+
+def scroll_to_bottom(page, known_slugs, all_links, state, step=1500):
+    """
+    Scroll until the page stops growing, reading only cards past state["next_index"]
+    (cards render lazily, so reading stops at the first one without a link yet).
+    Returns True once a known listing is reached.
+    """
     while True:
         height = page.evaluate("() => document.body.scrollHeight")
-        if previous_height == height:
-            break
-        if stop_pull_boolean:
-            break
-        for _ in range(previous_height, height, step):
+        if state["height"] == height:
+            return False
+        for _ in range(state["height"], height, step):
             page.mouse.wheel(0, step)
-            # time.sleep(random.uniform(*pause_range))
-            cards = page.query_selector_all("div.ant-col-8 div.LazyRenderCard__StyleCardWrapper-sc-d4ea256-0")
-            latest_link_saved = all_links[-1] if all_links else None
-            link_pull_boolean = latest_link_saved is None
-            if stop_pull_boolean:
-                break
-            for card in cards:
-                link_el = card.query_selector("a")
-                if not link_el:
-                    continue
-                href = link_el.get_attribute("href")
+            for href in card_hrefs(page, state["next_index"]):
+                if href is None:
+                    break
+                state["next_index"] += 1
                 link = "https://carro.co" + href
-                if unique_stop_urls and link in unique_stop_urls:
+                if slug_from(link) in known_slugs:
                     print(f"Carro: Reached old listing url {link}")
-                    stop_pull_boolean = True
-                    break
-                if not link_pull_boolean:
-                    if link == latest_link_saved:
-                        link_pull_boolean = True
-                    continue
+                    return True
                 # Skip New Cars
                 if "/cars/" in link:
                     all_links.append(link)
-        previous_height = height
-    return all_links, previous_height, stop_pull_boolean
-
-# -----------------------------
-# Split all website links into chunks:
-# -----------------------------
-
-def chunk_list(lst, n):
-    k, m = divmod(len(lst), n)
-    return [lst[i*k + min(i, m):(i+1)*k + min(i+1, m)] for i in range(n)]
+        state["height"] = height
 
 # -----------------------------
 # Helper to get car listing dates
@@ -0,0 +1,110 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+
+# =========================
+# CONFIG (environment)
+# =========================
+#   SCRAPER_LOG_LEVEL     DEBUG | INFO | WARN | ERROR   (default INFO)
+#   SCRAPER_DEBUG_DIR     where captured pages go        (default ./debug)
+#   SCRAPER_DEBUG_SAMPLE  also keep 1 in N pages; 0 = only pages that failed to parse (default 0)
+#   SCRAPER_DEBUG_MAX_MB  disk cap for captured pages; oldest are dropped first (default 50)
+#   SCRAPER_DEBUG_MAX_FILES  file-count cap (default 200)
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+LOG_LEVEL = LEVELS.get(os.environ.get("SCRAPER_LOG_LEVEL", "INFO").upper(), 20)
+
+
+def log_enabled(level: str) -> bool:
+    return LEVELS.get(level, 20) >= LOG_LEVEL
+
+def log(msg: str, level: str = "INFO", tag: str = "DEBUG"):
+    if log_enabled(level):
+        print(f"[{tag}] {msg}", flush=True)
+
+
+# =========================
+# PAGE CAPTURE
+# =========================
+class DebugCapture:
+    """
+    Keeps copies of scraped pages for inspection without writing every page:
+      - pages that failed to parse are always kept
+      - otherwise 1 in `sample_every` pages per kind (0 disables sampling)
+      - files form a ring buffer on disk capped by `max_files` and `max_bytes`
+    Nothing touches the disk until the first page is actually kept.
+    """
+
+    def __init__(self, root: str, sample_every: int = 0, max_files: int = 200, max_bytes: int = 50 * 1024 * 1024):
+        self.root = root
+        self.sample_every = sample_every
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.files = None  # deque of (path, size), oldest first; loaded lazily
+        self.total_bytes = 0
+
+    def _load(self):
+        os.makedirs(self.root, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isfile(path):
+                st = os.stat(path)
+                entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        self.files = deque((path, size) for _, path, size in entries)
+        self.total_bytes = sum(size for _, size in self.files)
+
+    def _should_keep(self, kind: str, failed: bool) -> bool:
+        if failed:
+            return True
+        if self.sample_every <= 0:
+            return False
+        n = self.counters.get(kind, 0)
+        self.counters[kind] = n + 1
+        return n % self.sample_every == 0
+
+    def capture(self, kind: str, key: str, html: str, failed: bool = False):
+        """Maybe keep `html` as <kind>_<key>_<time>.html; returns the path if written."""
+        with self.lock:
+            if not self._should_keep(kind, failed):
+                return None
+            if self.files is None:
+                self._load()
+            safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", str(key))[:80]
+            suffix = "_failed" if failed else ""
+            path = os.path.join(self.root, f"{kind}_{safe_key}{suffix}_{time.time_ns()}.html")
+            data = html.encode("utf-8", errors="replace")
+            with open(path, "wb") as f:
+                f.write(data)
+            self.files.append((path, len(data)))
+            self.total_bytes += len(data)
+            while self.files and (len(self.files) > self.max_files or self.total_bytes > self.max_bytes):
+                old_path, old_size = self.files.popleft()
+                self.total_bytes -= old_size
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+        log(f"Captured {kind} page for {key} -> {path}", level="DEBUG")
+        return path
+
+
+_capture = None
+_capture_lock = threading.Lock()
+
+def debug_capture() -> DebugCapture:
+    """Process-wide capture configured from the environment."""
+    global _capture
+    with _capture_lock:
+        if _capture is None:
+            _capture = DebugCapture(
+                root=os.environ.get("SCRAPER_DEBUG_DIR", "debug"),
+                sample_every=int(os.environ.get("SCRAPER_DEBUG_SAMPLE", "0")),
+                max_files=int(os.environ.get("SCRAPER_DEBUG_MAX_FILES", "200")),
+                max_bytes=int(float(os.environ.get("SCRAPER_DEBUG_MAX_MB", "50")) * 1024 * 1024),
+            )
+        return _capture
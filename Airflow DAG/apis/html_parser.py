@@ -0,0 +1,53 @@
+import os
+from bs4 import BeautifulSoup, FeatureNotFound
+
+# Parser backends in order of preference. lxml is C-backed and several times faster
+# than the pure-Python html.parser; HTML_PARSER=html.parser forces the old behaviour.
+PREFERRED_PARSERS = [p for p in [os.environ.get("HTML_PARSER"), "lxml", "html.parser"] if p]
+
+_available = None
+
+def available_parser() -> str:
+    """First backend from PREFERRED_PARSERS that is installed (checked once per process)."""
+    global _available
+    if _available is None:
+        for name in PREFERRED_PARSERS:
+            try:
+                BeautifulSoup("<p></p>", name)
+                _available = name
+                break
+            except FeatureNotFound:
+                continue
+    return _available
+
+def make_soup(html, parser: str = None) -> BeautifulSoup:
+    """
+    BeautifulSoup tree for html using the fastest installed backend. If that backend
+    fails on a page, it is parsed again with html.parser.
+    """
+    name = parser or available_parser()
+    try:
+        return BeautifulSoup(html, name)
+    except Exception as e:
+        if name == "html.parser":
+            raise
+        print(f"[html_parser] {name} failed ({e}), falling back to html.parser")
+        return BeautifulSoup(html, "html.parser")
+
+
+def compare_backends(pages, extract, parsers=("html.parser", "lxml")) -> bool:
+    """
+    Run extract(soup) on every page with each backend and report pages where the
+    outputs differ. Used to confirm a backend switch does not change scraped values.
+    """
+    same = True
+    for i, html in enumerate(pages):
+        outputs = {name: extract(BeautifulSoup(html, name)) for name in parsers}
+        baseline = outputs[parsers[0]]
+        for name in parsers[1:]:
+            if outputs[name] != baseline:
+                same = False
+                print(f"[html_parser] page {i}: {name} differs from {parsers[0]}: "
+                      f"{outputs[name]!r} vs {baseline!r}")
+    print(f"[html_parser] {len(pages)} pages: backends {'agree' if same else 'DIFFER'} ({', '.join(parsers)})")
+    return same
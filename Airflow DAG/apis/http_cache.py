@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import zlib
+import uuid
+import hashlib
+import tempfile
+import threading
+import requests
+
+HTTP_CACHE_DIR = os.environ.get(
+    "CAR_RESALE_HTTP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "car_resale_http_cache")
+)
+
+# =========================
+# ON-DISK REVALIDATION CACHE
+# =========================
+class HTTPCache:
+    """
+    On-disk cache of page bodies keyed by URL, used for conditional GETs.
+    Only responses that carry a validator (ETag / Last-Modified) are kept.
+    Each entry is a small JSON file with the validators plus a zlib-compressed body,
+    both written atomically, so threads and shard processes can share one folder.
+    """
+
+    def __init__(self, root: str = HTTP_CACHE_DIR, max_age_days: float = 30):
+        self.root = root
+        self.max_age = max_age_days * 86400
+        self.lock = threading.Lock()
+        self.stats = {"revalidated": 0, "fetched": 0, "stored": 0, "bytes_saved": 0}
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        folder = os.path.join(self.root, key[:2])
+        return os.path.join(folder, key + ".json"), os.path.join(folder, key + ".body")
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _count(self, name: str, n: int = 1):
+        with self.lock:
+            self.stats[name] += n
+
+    def lookup(self, url: str):
+        """Cached entry (validators, encoding, body) for url, or None if missing/expired/corrupt."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("url") != url or time.time() - entry.get("stored_at", 0) > self.max_age:
+                return None
+            with open(body_path, "rb") as f:
+                entry["body"] = zlib.decompress(f.read())
+            return entry
+        except (OSError, ValueError, zlib.error):
+            return None
+
+    def store(self, url: str, resp: requests.Response):
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(url)
+        # body first: a reader that sees the new metadata always finds a matching body
+        self._atomic_write(body_path, zlib.compress(resp.content, 6))
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": resp.encoding,
+            "stored_at": time.time(),
+        }
+        self._atomic_write(meta_path, json.dumps(entry).encode("utf-8"))
+        self._count("stored")
+
+    def forget(self, url: str):
+        for path in self._paths(url):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['revalidated']} unchanged (304), {s['fetched']} fetched, "
+                f"{s['stored']} stored, {s['bytes_saved'] / 1e6:.1f} MB not re-downloaded")
+
+
+def conditional_get(get, url: str, cache: HTTPCache = None, headers=None, **kwargs) -> requests.Response:
+    """
+    GET through `get` (requests.get or Session.get) revalidating against the cache.
+    On 304 the cached body is put back on the response (status 200) and
+    resp.from_cache is True, meaning "unchanged since the last time we saw it".
+    """
+    if cache is None:
+        resp = get(url, headers=headers, **kwargs)
+        resp.from_cache = False
+        return resp
+
+    cache_url = requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+    entry = cache.lookup(cache_url)
+    req_headers = dict(headers or {})
+    if entry is not None:
+        if entry.get("etag"):
+            req_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            req_headers["If-Modified-Since"] = entry["last_modified"]
+
+    resp = get(url, headers=req_headers, **kwargs)
+    if resp.status_code == 304 and entry is not None:
+        resp.status_code = 200
+        resp._content = entry["body"]
+        resp.encoding = entry.get("encoding")
+        resp.from_cache = True
+        cache._count("revalidated")
+        cache._count("bytes_saved", len(entry["body"]))
+        return resp
+
+    resp.from_cache = False
+    cache._count("fetched")
+    if resp.status_code == 200:
+        cache.store(cache_url, resp)
+    elif resp.status_code in (404, 410):
+        cache.forget(cache_url)
+    return resp
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def default_cache() -> HTTPCache:
+    """Process-wide cache under HTTP_CACHE_DIR, shared by all scrapers and the sold checker."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HTTPCache()
+        return _default_cache
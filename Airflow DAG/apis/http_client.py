@@ -0,0 +1,121 @@
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from apis.http_cache import conditional_get
+
+TRANSIENT_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ReadTimeout,
+)
+
+# =========================
+# RATE LIMITING
+# =========================
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` requests per second on average,
+    with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(headers=None, pool_size: int = 10) -> requests.Session:
+    """requests.Session with a keep-alive connection pool large enough for pool_size threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+# =========================
+# POOLED FETCHER
+# =========================
+class PooledFetcher:
+    """
+    Shared HTTP fetch engine for the scrapers.
+      - one keep-alive Session shared by all worker threads
+      - at most `max_workers` requests in flight (global concurrency limit)
+      - a token bucket per host (`requests_per_second`, `burst`) as the politeness budget
+      - retries with a pause on transient connection errors
+      - optional HTTPCache: GETs are revalidated with If-None-Match / If-Modified-Since
+    """
+
+    def __init__(self, max_workers: int = 8, requests_per_second: float = 4.0, burst: int = 4,
+                 headers=None, timeout: float = 15, cache=None):
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.timeout = timeout
+        self.cache = cache
+        self.session = make_session(headers, pool_size=max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.limiters = {}
+        self.limiters_lock = threading.Lock()
+
+    def limiter(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self.limiters_lock:
+            if host not in self.limiters:
+                self.limiters[host] = TokenBucket(self.requests_per_second, self.burst)
+            return self.limiters[host]
+
+    def get(self, url: str, retries: int = 3, retry_sleep: float = 1.2, **kwargs) -> requests.Response:
+        """
+        Rate-limited GET. Transient connection errors are retried `retries` times
+        (the last one is re-raised). HTTP error statuses are returned, not raised.
+        With a cache, resp.from_cache is True when the server answered 304 Not Modified.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(retries):
+            self.limiter(url).acquire()
+            try:
+                return conditional_get(self.session.get, url, self.cache, **kwargs)
+            except TRANSIENT_ERRORS as e:
+                print(f"Fetch error ({attempt+1}/{retries}) for {url}: {e}")
+                if attempt == retries - 1:
+                    raise
+                time.sleep(retry_sleep)
+
+    def map(self, func, items) -> list:
+        """
+        Run func(item) for every item on the pool; results keep the input order.
+        func must not call map() itself (the pool is shared and bounded).
+        """
+        return list(self.executor.map(func, items))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,82 @@
+import sqlite3
+import pandas as pd
+
+# =========================
+# MOTORIST LISTING INDEX
+# =========================
+class ListingStore:
+    """
+    SQLite index of every listing already scraped: listing_id (primary key) and its
+    ISO posted date (indexed). A listing's posted date never changes, so this file can
+    be kept between runs (synced to GCS by the DAG) and only new listings are written.
+    Known-ID and latest-date checks become index lookups instead of full-table loops.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS listings ("
+            " listing_id TEXT PRIMARY KEY,"
+            " posted_date TEXT,"  # YYYY-MM-DD or NULL
+            " first_seen TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_listings_posted ON listings(posted_date)")
+        self.conn.commit()
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def __contains__(self, listing_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM listings WHERE listing_id = ?", (listing_id,)).fetchone() is not None
+
+    def posted_date(self, listing_id: str):
+        """Posted date (YYYY-MM-DD) of a known listing, or None."""
+        row = self.conn.execute("SELECT posted_date FROM listings WHERE listing_id = ?", (listing_id,)).fetchone()
+        return row[0] if row else None
+
+    def latest_posted_date(self):
+        return self.conn.execute("SELECT MAX(posted_date) FROM listings").fetchone()[0]
+
+    def add(self, listing_ids, posted_dates, first_seen: str):
+        """Insert listings not seen before; existing rows are left untouched."""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO listings (listing_id, posted_date, first_seen) VALUES (?, ?, ?)",
+            ((lid, d, first_seen) for lid, d in zip(listing_ids, posted_dates)),
+        )
+        self.conn.commit()
+
+    def sync_from_df(self, df: pd.DataFrame, id_col: str, date_col: str):
+        """
+        Make sure every listing in df is indexed (first run, or the store file was lost).
+        Skipped when the row counts already match, so a normal run costs one COUNT(*).
+        A store holding more listings than df (dataset was rebuilt) is reindexed from scratch.
+        """
+        ids = df[id_col].astype(str).str.strip()
+        ids = ids[ids != ""]
+        stored = self.count()
+        if stored == ids.nunique():
+            return 0
+        if stored > ids.nunique():
+            self.conn.execute("DELETE FROM listings")
+        dates = iso_dates(df.loc[ids.index, date_col])
+        before = self.count()
+        self.add(ids.tolist(), dates.tolist(), first_seen=pd.Timestamp.now().strftime("%Y-%m-%d"))
+        added = self.count() - before
+        print(f"[store] Indexed {added} listings from the previous dataset")
+        return added
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iso_dates(s: pd.Series) -> pd.Series:
+    """YYYY-MM-DD strings (None where the value is not a valid date such as 'N.A.')."""
+    d = pd.to_datetime(s.astype(str).str.strip(), format="%Y-%m-%d", errors="coerce")
+    return d.dt.strftime("%Y-%m-%d").astype(object).where(d.notna(), None)
@@ -2,17 +2,16 @@
 import csv
 import os
 import re
-import time
 from datetime import datetime, date
 from typing import Dict, List, Tuple, Optional
+from apis.listing_store import ListingStore, iso_dates
 import pandas as pd
-from bs4 import BeautifulSoup
+from apis.html_parser import make_soup
 from urllib.parse import urljoin
 
 # Reuse old scraper's pieces
 from apis.motorist_webscraping import (
     LIST_URL,
-    DEBUG_DIR,
     dbg,
     get_html,
     parse_detail_page,
@@ -51,32 +50,28 @@ def load_existing(prev_df: pd.DataFrame) -> Tuple[Dict[str, dict], Optional[date
     if prev_df is None or prev_df.empty:
         return rows_by_id, latest, header
 
-    # Normalize URL and listing_id
-    if "url" in prev_df.columns:
-        prev_df["url"] = prev_df["url"].astype(str).str.strip()
-    if "listing_id" not in prev_df.columns:
-        prev_df["listing_id"] = prev_df["url"].apply(listing_id_from_url)
-
+    prev_df = _with_listing_ids(prev_df)
     header = list(prev_df.columns)
 
-    # Convert each row to dict
-    for _, row in prev_df.iterrows():
-        lid = row.get("listing_id", "")
-        if not lid:
-            continue
-        row_dict = row.to_dict()
-        rows_by_id[lid] = row_dict
+    keyed = prev_df[prev_df["listing_id"] != ""]
+    rows_by_id = dict(zip(keyed["listing_id"], keyed.to_dict("records")))
 
-        # Parse Posted Date to track latest
-        d = parse_iso_date(row_dict.get(POSTED_COL, ""))
-        if d and (latest is None or d > latest):
-            latest = d
+    # Parse Posted Date to track latest
+    if POSTED_COL in keyed.columns:
+        posted = pd.to_datetime(iso_dates(keyed[POSTED_COL]))
+        if posted.notna().any():
+            latest = posted.max().date()
 
     return rows_by_id, latest, header
 
-def _date_for_sort(s: str) -> date:
-    d = parse_iso_date(s)
-    return d or date.min  # N.A. sinks to bottom
+def _with_listing_ids(prev_df: pd.DataFrame) -> pd.DataFrame:
+    """Normalised url and a string listing_id column ("" where the url has no id)."""
+    if "url" in prev_df.columns:
+        prev_df["url"] = prev_df["url"].astype(str).str.strip()
+    if "listing_id" not in prev_df.columns:
+        prev_df["listing_id"] = prev_df["url"].apply(listing_id_from_url)
+    prev_df["listing_id"] = prev_df["listing_id"].fillna("").astype(str).str.strip()
+    return prev_df
 
 # def _id_for_sort(r: dict) -> int:
 #     lid = r.get("listing_id") or listing_id_from_url(r.get("url", ""))
@@ -108,7 +103,7 @@ def extract_links_with_spotlight(html: str, base: str) -> List[Tuple[str, bool]]
     Returns [(absolute_url, is_spotlight)] for each /used-car/ link.
     Spotlight is TRUE iff a descendant with classes 'used-cars-label spotlight' exists.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    soup = make_soup(html)
     found: Dict[str, Tuple[str, bool]] = {}
 
     # First pass: collect and mark spotlight based on the badge inside the <a>
@@ -149,9 +144,13 @@ def extract_links_with_spotlight(html: str, base: str) -> List[Tuple[str, bool]]
         seen.add(lid)
     return ordered
 
-def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 10000) -> pd.DataFrame:
+def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 10000,
+                              state_path: str = ":memory:") -> pd.DataFrame:
     """
     Incrementally fetch new Motorist listings based on previous DataFrame.
+    state_path: SQLite ListingStore file indexing listing_id / Posted Date. When it is
+    kept between runs only new listings are written to it; a missing or stale file is
+    rebuilt from prev_df.
 
     Rules (spotlight-aware):
       • Include a listing if its Posted Date > latest in prev_df, OR
@@ -162,30 +161,17 @@ def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 100
     Returns a combined DataFrame (prev + new, current wins on duplicates), sorted newest first.
     """
 
-    # Build rows_by_id from prev_df
-    rows_by_id: Dict[str, dict] = {}
-    latest_date: Optional[date] = None
-
+    prev_keyed = pd.DataFrame()
     if prev_df is not None and not prev_df.empty:
-        # normalize url; ensure listing_id column
-        if "url" in prev_df.columns:
-            prev_df["url"] = prev_df["url"].astype(str).str.strip()
-        if "listing_id" not in prev_df.columns:
-            prev_df["listing_id"] = prev_df["url"].apply(listing_id_from_url)
-        prev_df["listing_id"] = prev_df["listing_id"].astype(str).str.strip()
-
-        # harvest rows and detect latest posted date
-        for _, r in prev_df.iterrows():
-            lid = r.get("listing_id") or ""
-            if not lid:
-                continue
-            rd = r.to_dict()
-            rows_by_id[lid] = rd
-            d = parse_iso_date(rd.get(POSTED_COL, ""))
-            if d and (latest_date is None or d > latest_date):
-                latest_date = d
+        prev_df = _with_listing_ids(prev_df)
+        prev_keyed = prev_df[prev_df["listing_id"] != ""]
 
-    dbg(f"[new] loaded {len(rows_by_id)} rows; latest Posted Date: {latest_date or 'None'}")
+    store = ListingStore(state_path)
+    if not prev_keyed.empty:
+        store.sync_from_df(prev_keyed, "listing_id", POSTED_COL)
+    latest_date = parse_iso_date(store.latest_posted_date() or "")
+
+    dbg(f"[new] {store.count()} listings indexed; latest Posted Date: {latest_date or 'None'}")
 
     """
     Append only *new* rows:
@@ -197,7 +183,7 @@ def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 100
 
     Spotlight/Featured/Sponsored cards NEVER trigger the stop even if older.
     """
-    existing_ids = set(prev_df["listing_id"])
+    new_rows: List[dict] = []
     added = 0
     seen_this_run = set()
 
@@ -206,7 +192,7 @@ def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 100
 
     # Crawl index pages until stop condition
     while page <= max_pages_sanity and not hard_stop:
-        params = {"page": page, "_": int(time.time())}
+        params = {"page": page}
         dbg(f"[new] Page {page}")
 
         try:
@@ -228,9 +214,9 @@ def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 100
             seen_this_run.add(lid)
 
             # CASE A: ID already in df
-            if lid in existing_ids:
-                known_date = parse_iso_date(rows_by_id[lid].get(POSTED_COL, ""))
-                dbg(f"[new] listing's known_date = {known_date}")
+            if lid in store:
+                known_date = parse_iso_date(store.posted_date(lid) or "")
+                dbg(f"[new] listing's known_date = {known_date}", level="DEBUG")
                 # A1) SAME-DAY guard:
                 # If we hit any previously-scraped listing from the LATEST day, stop now
                 # if latest_date and known_date and known_date == latest_date:
@@ -252,7 +238,7 @@ def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 100
             row["listing_id"] = lid
             posted_str = (row.get(POSTED_COL) or "").strip()
             posted = parse_iso_date(posted_str)
-            dbg(f"posted_date: {posted}")
+            dbg(f"posted_date: {posted}", level="DEBUG")
 
             include = False
             if latest_date is None:
@@ -273,7 +259,7 @@ def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 100
                 include = False # spotlight+older → skip but keep going
 
             if include:
-                rows_by_id[lid] = row
+                new_rows.append(row)
                 added += 1
                 dbg(f"[new] + added {lid} (Posted {posted_str or 'N.A.'})")
             
@@ -285,13 +271,21 @@ def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 100
 
     dbg(f"[new] total added this run: {added}")
 
+    # Record the new listings in the index, then append them to the previous rows
+    if new_rows:
+        store.add([r["listing_id"] for r in new_rows],
+                  iso_dates(pd.Series([r.get(POSTED_COL) or "" for r in new_rows], dtype=object)).tolist(),
+                  first_seen=pd.Timestamp.now().strftime("%Y-%m-%d"))
+    store.close()
+
     # Build DataFrame, sort newest first (date, then id)
-    rows = list(rows_by_id.values())
-    if not rows:
+    frames = [f for f in (prev_keyed, pd.DataFrame(new_rows)) if not f.empty]
+    if not frames:
         # stable schema
         out = pd.DataFrame(columns=DEFAULT_COLUMNS + ["listing_id", "scrape_date"])
     else:
-        out = pd.DataFrame(rows)
+        out = pd.concat(frames, ignore_index=True, sort=False)
+        out = out.drop_duplicates(subset=["listing_id"], keep="last")
         for col in DEFAULT_COLUMNS:
             if col not in out.columns:
                 out[col] = pd.NA
@@ -300,17 +294,13 @@ def get_updated_motorist_data(prev_df: pd.DataFrame, max_pages_sanity: int = 100
         if "listing_id" not in out.columns:
             out["listing_id"] = out["url"].apply(listing_id_from_url)
 
-        # sort by Posted Date DESC, then listing_id DESC
-        out = out.sort_values(
-            by=[POSTED_COL, "listing_id"],
-            key=lambda col: (
-                col.map(_date_for_sort)
-                if col.name == POSTED_COL
-                else pd.to_numeric(col, errors="coerce").fillna(-1)
-            ),
-            ascending=[False, False],
-            ignore_index=True,
-        )
+        # sort by Posted Date DESC, then listing_id DESC (unparseable dates sink to the bottom)
+        sort_keys = pd.DataFrame({
+            "posted": pd.to_datetime(iso_dates(out[POSTED_COL])),
+            "lid": pd.to_numeric(out["listing_id"], errors="coerce").fillna(-1),
+        }, index=out.index)
+        order = sort_keys.sort_values(by=["posted", "lid"], ascending=[False, False], na_position="last").index
+        out = out.loc[order].reset_index(drop=True)
 
         # add scrape date if it is empty
         out["scrape_date"] = pd.to_datetime(out["scrape_date"], format="%Y-%m-%d", errors="coerce").dt.strftime("%Y-%m-%d")
@@ -0,0 +1,124 @@
+# motorist_parse_check.py
+# Equivalence check + micro-benchmark for the one-pass Motorist detail parser
+# (parse_detail_soup) against the original per-field scans, and for the lxml
+# parser backend against html.parser.
+#
+# Usage: python -m apis.motorist_parse_check [detail_page.html ...]
+# Without arguments it runs on the built-in fixture pages below. Real pages can be
+# collected with SCRAPER_DEBUG_SAMPLE=1 (see apis/debug_capture.py).
+import sys
+import timeit
+from bs4 import BeautifulSoup
+from apis.html_parser import compare_backends
+from apis.motorist_webscraping import (
+    DETAIL_LABELS,
+    coerce_na,
+    clean_text,
+    find_value_by_label,
+    extract_display_price,
+    extract_sold_flag,
+    extract_posted_date,
+    parse_detail_soup,
+)
+
+def legacy_parse(soup) -> dict:
+    """The original parse_detail_page body: one page-wide scan per field."""
+    h = soup.find(["h1", "h2"])
+    title = clean_text(h.get_text(" ", strip=True)) if h else ""
+    return {
+        "title": title.lstrip("# ").strip(),
+        "price": extract_display_price(soup),
+        "Status": extract_sold_flag(soup),
+        "Posted Date": extract_posted_date(soup),
+        **{lab: coerce_na(find_value_by_label(soup, lab), lab) for lab in DETAIL_LABELS},
+    }
+
+# =========================
+# FIXTURES
+# =========================
+def _spec_rows(values, style):
+    rows = []
+    for lab, val in values.items():
+        if style == "dl":
+            rows.append(f"<dl><dt>{lab}</dt><dd>{val}</dd></dl>")
+        elif style == "table":
+            rows.append(f"<tr><th>{lab}</th><td> {val} </td></tr>")
+        elif style == "span":
+            rows.append(f"<div class='row'><span class='lbl'>\n  {lab}\n</span><span class='val'>{val}</span></div>")
+        else:  # "Label: value" lines
+            rows.append(f"<p>{lab}: {val}</p>")
+    if style == "table":
+        return "<table>" + "".join(rows) + "</table>"
+    return "".join(rows)
+
+def fixture_page(style="dl", sold=False, offer_price=None, with_sidebar=True, drop=(), filler=300):
+    values = {
+        "Registration Date": "12-Mar-2019", "Ownership": "2", "Mileage": "45,000 km",
+        "Veh. Scheme": "Normal", "COE": "$36,001", "OMV": "$19,330", "ARF": "$7,062",
+        "Min. PARF": "$5,297", "Paper Value": "$5,297", "Road Tax Payable": "$742 /yr",
+        "COE Expiry Date": "11-Mar-2029", "PARF Expiry Date": "11-Mar-2029",
+        "Road Tax Expiry Date": "11-Sep-2025", "Manufacturing Year": "2018",
+        "Primary Colour": "White", "Transmission": "Auto", "Fuel Type": "Petrol",
+        "Engine Capacity": "1,598 cc", "Power": "90 kW",
+    }
+    for lab in drop:
+        values[lab] = "-"
+    noise = "".join(f"<div class='card'><span>Related car {i}</span><p>From $1{i:03d}/mth depre</p></div>"
+                    for i in range(filler))
+    sidebar = ""
+    if with_sidebar:
+        badge = "<div class='badge'> Vehicle Sold </div>" if sold else ""
+        sidebar = (f"<aside><h3>Seller Information</h3>{badge}<strong>$68,800</strong>"
+                   f"<span>Instl. $1,020/mth</span><span>$9,450 /yr depre</span></aside>")
+    loan = ""
+    if offer_price is not None:
+        loan = f"<section><div><label>Offer Price</label></div><input value='{offer_price}'/></section>"
+    return (f"<html><head><title>x</title></head><body><h1># Toyota Corolla Altis 1.6A</h1>"
+            f"<p>Posted 06 May 25 | Updated 2 days ago</p>{sidebar}{_spec_rows(values, style)}{loan}{noise}"
+            f"</body></html>")
+
+def fixture_pages():
+    return [
+        fixture_page("dl"),
+        fixture_page("table", sold=True),
+        fixture_page("span", offer_price="71,000"),
+        fixture_page("colon", with_sidebar=False),
+        fixture_page("dl", drop=("ARF", "Min. PARF"), offer_price="0"),
+        fixture_page("table", with_sidebar=False, filler=10),
+    ]
+
+# =========================
+# CHECK + BENCHMARK
+# =========================
+def check(pages) -> bool:
+    ok = True
+    for i, html in enumerate(pages):
+        soup = BeautifulSoup(html, "html.parser")
+        old, new = legacy_parse(soup), parse_detail_soup(soup)
+        diffs = {k: (old[k], new.get(k)) for k in old if old[k] != new.get(k)}
+        if diffs:
+            ok = False
+            print(f"[check] page {i}: MISMATCH {diffs}")
+    print(f"[check] {len(pages)} pages: {'identical output' if ok else 'outputs differ'}")
+    return ok
+
+def benchmark(pages, repeat=5):
+    soups = [BeautifulSoup(html, "html.parser") for html in pages]
+    t_old = timeit.timeit(lambda: [legacy_parse(s) for s in soups], number=repeat) / repeat
+    t_new = timeit.timeit(lambda: [parse_detail_soup(s) for s in soups], number=repeat) / repeat
+    print(f"[bench] {len(pages)} pages: per-field scans {t_old*1000:.1f} ms, one pass {t_new*1000:.1f} ms, "
+          f"speedup x{t_old / t_new:.1f}")
+
+def benchmark_backends(pages, repeat=5, parsers=("html.parser", "lxml")):
+    for name in parsers:
+        t = timeit.timeit(lambda: [parse_detail_soup(BeautifulSoup(h, name)) for h in pages], number=repeat) / repeat
+        print(f"[bench] {len(pages)} pages: parse + extract with {name}: {t*1000:.1f} ms")
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    pages = [open(p, encoding="utf-8").read() for p in paths] if paths else fixture_pages()
+    same = check(pages)
+    benchmark(pages)
+    same = compare_backends(pages, parse_detail_soup) and same
+    benchmark_backends(pages)
+    sys.exit(0 if same else 1)
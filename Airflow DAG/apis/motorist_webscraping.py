@@ -4,8 +4,11 @@ from datetime import datetime
 import time
 import requests
 import pandas as pd
-from bs4 import BeautifulSoup
+from apis.html_parser import make_soup
 from urllib.parse import urljoin
+from apis.http_cache import conditional_get, default_cache
+from apis.http_client import PooledFetcher
+from apis.debug_capture import log, debug_capture
 
 # Config
 BASE = "https://www.motorist.sg"
@@ -23,6 +26,10 @@ HEADERS = {
     "Accept-Language": "en-SG,en;q=0.9",
     "Referer": BASE + "/",
     "Connection": "keep-alive",
+    # list pages used to carry a "_" timestamp param to get past stale caches; that made
+    # every URL unique so the HTTP cache could never revalidate them. no-cache makes
+    # intermediaries revalidate with the site instead, and keeps the URL stable.
+    "Cache-Control": "no-cache",
 }
 
 # Flexible patterns for regex
@@ -47,8 +54,9 @@ MONTHS = {
 }
 
 ## helper functions
-def dbg(msg: str):
-    print(f"[DEBUG] {msg}", flush=True)
+def dbg(msg: str, level: str = "INFO"):
+    # per-request/per-listing lines use level="DEBUG" and only show with SCRAPER_LOG_LEVEL=DEBUG
+    log(msg, level=level)
 
 MISSING_TOKENS = {"", "-", "–", "—", "n/a", "na", "nil"}
 
@@ -62,31 +70,34 @@ def listing_id_from_url(url: str) -> str:
     m = DETAIL_ID_RE.search(url or "")
     return m.group("id") if m else ""
 
-def get_html(url, params=None, retries=3, timeout=30):
-    """GET helper with loud debug."""
+def get_html(url, params=None, retries=3, timeout=30, fetcher=None):
+    """
+    GET helper with loud debug. Revalidates against the shared HTTP cache (304 -> cached body).
+    With a PooledFetcher the request goes through its keep-alive session and rate limit.
+    """
     for attempt in range(1, retries + 1):
         try:
-            r = requests.get(
-                url, params=params, headers=HEADERS, timeout=timeout, allow_redirects=True
-            )
-            dbg(f"GET {r.request.url} -> {r.status_code}")
-            dbg(f"Headers sent: {HEADERS}")
-            dbg(f"Response URL: {r.url}")
+            if fetcher is not None:
+                r = fetcher.get(url, retries=1, params=params, timeout=timeout, allow_redirects=True)
+            else:
+                r = conditional_get(
+                    requests.get, url, default_cache(), params=params, headers=HEADERS, timeout=timeout, allow_redirects=True
+                )
+            dbg(f"GET {r.request.url} -> {r.status_code}{' (not modified)' if r.from_cache else ''}", level="DEBUG")
             if r.ok:
                 return r.text
             else:
-                dbg(f"Non-OK status. Sleeping and retrying... attempt {attempt}/{retries}")
+                dbg(f"Non-OK status {r.status_code} for {r.url}. Sleeping and retrying... attempt {attempt}/{retries}", level="WARN")
         except Exception as e:
-            dbg(f"Exception on GET: {e} (attempt {attempt}/{retries})")
+            dbg(f"Exception on GET: {e} (attempt {attempt}/{retries})", level="WARN")
         time.sleep(1.0 * attempt)
     raise RuntimeError(f"Failed to fetch {url} after {retries} retries")
 
 def extract_detail_links_from_html(html, page_num=None):
     """Try multiple strategies to find detail links and print what we see."""
-    os.makedirs(DEBUG_DIR, exist_ok=True)
 
     # Parse anchors
-    soup = BeautifulSoup(html, "html.parser")
+    soup = make_soup(html)
     anchors = soup.find_all("a", href=True)
 
     links = set()
@@ -108,26 +119,37 @@ def extract_detail_links_from_html(html, page_num=None):
         links.add(urljoin(BASE, m.group(0).rstrip('">)\'')))
 
     links = sorted(links)
-    dbg(f"extract_detail_links_from_html: total detail links = {len(links)}")
+    dbg(f"extract_detail_links_from_html: total detail links = {len(links)}", level="DEBUG")
 
-    # Save listing page for manual inspection
+    # Keep the listing page for inspection if it yielded nothing (or was sampled)
     if page_num is not None:
-        out = os.path.join(DEBUG_DIR, f"listing_page_{page_num}.html")
-        with open(out, "w", encoding="utf-8") as f:
-            f.write(html)
+        debug_capture().capture("listing_page", page_num, html, failed=not links)
 
     return links
 
 def clean_text(x):
     return re.sub(r"\s+", " ", x).strip() if x else ""
 
-def extract_posted_date(soup) -> str:
+DETAIL_LABELS = [
+    "Registration Date","Ownership","Mileage","Veh. Scheme","COE","OMV","ARF",
+    "Min. PARF","Paper Value","Road Tax Payable","COE Expiry Date",
+    "PARF Expiry Date","Road Tax Expiry Date","Manufacturing Year",
+    "Primary Colour","Transmission","Fuel Type","Engine Capacity","Power",
+]
+SELLER_HDR_RE = re.compile(r'^\s*Seller Information\s*$', re.I)
+SELLER_ANY_RE = re.compile(r'Seller Information', re.I)
+PRICE_HINT_RE = re.compile(r'\bInstl\.?\b|\bdepre\b', re.I)
+OFFER_PRICE_RE = re.compile(r'^\s*Offer Price\s*$', re.I)
+
+def extract_posted_date(soup, node=None) -> str:
     """
     Returns the listing's posted date as YYYY-MM-DD if found, else 'N.A.'.
     Handles formats like: 'Posted 06 May 25' or 'Posted 06 May 2025 | Updated …'
+    node: the first text node matching POSTED_RE, if the caller already found it.
     """
     # try to find a node that already matches
-    node = soup.find(string=POSTED_RE)
+    if node is None:
+        node = soup.find(string=POSTED_RE)
     if node:
         m = POSTED_RE.search(node)
     else:
@@ -149,23 +171,30 @@ def extract_posted_date(soup) -> str:
     except Exception:
         return "N.A."
 
+def _value_near_label(label_node):
+    """Value next to a label text node, or None if nothing usable sits beside it."""
+    parent = label_node.find_parent(["dt","th","strong","b","span","div","p"])
+    if parent:
+        for sib in parent.next_siblings:
+            if getattr(sib, "get_text", None):
+                val = clean_text(sib.get_text(" ", strip=True))
+                if val:
+                    return val
+    # Fallback: next text node
+    if label_node.parent:
+        nxt = label_node.parent.find_next(string=True)
+        if nxt:
+            return clean_text(nxt)
+    return None
+
 def find_value_by_label(soup, label):
     """Look for a label like 'Registration Date' and return the associated value."""
     # Exact label match first
     label_node = soup.find(string=re.compile(rf"^\s*{re.escape(label)}\s*$", re.I))
     if label_node:
-        parent = label_node.find_parent(["dt","th","strong","b","span","div","p"])
-        if parent:
-            for sib in parent.next_siblings:
-                if getattr(sib, "get_text", None):
-                    val = clean_text(sib.get_text(" ", strip=True))
-                    if val:
-                        return val
-        # Fallback: next text node
-        if label_node.parent:
-            nxt = label_node.parent.find_next(string=True)
-            if nxt:
-                return clean_text(nxt)
+        val = _value_near_label(label_node)
+        if val is not None:
+            return val
 
     # Secondary: lines like "Label: value"
     for node in soup.find_all(string=True):
@@ -175,13 +204,15 @@ def find_value_by_label(soup, label):
             return clean_text(after)
     return ""
 
-def _find_price_card(soup):
+def _find_price_card(soup, hdr=None, hint=None, prefound=False):
     # Prefer the sidebar that contains "Seller Information"
-    hdr = soup.find(string=re.compile(r'^\s*Seller Information\s*$', re.I))
+    if not prefound:
+        hdr = soup.find(string=SELLER_HDR_RE)
     if hdr:
         return hdr.find_parent(['aside', 'section', 'div', 'article'])
     # Fallback: climb up from any "Instl." / "depre" hint
-    hint = soup.find(string=re.compile(r'\bInstl\.?\b|\bdepre\b', re.I))
+    if not prefound:
+        hint = soup.find(string=PRICE_HINT_RE)
     node = hint
     for _ in range(6):
         if not node:
@@ -208,15 +239,17 @@ def _pick_price_from_container(el):
             candidates.append(n)
     return f"${max(candidates):,}" if candidates else ""
 
-def extract_display_price(soup):
+def extract_display_price(soup, index=None):
     """
     Robust price extractor:
       1) Offer Price (if present & >= 1000)
       2) Exact $xx,xxx text in the price card
       3) Max $ in price card excluding 'mth'/'depre'
+    index: text-node index from index_page_strings, to skip the page-wide searches.
     """
     # 1) Loan Calculator → Offer Price
-    for label in soup.find_all(string=re.compile(r'^\s*Offer Price\s*$', re.I)):
+    offer_labels = index["offer_price"] if index else soup.find_all(string=OFFER_PRICE_RE)
+    for label in offer_labels:
         box = label.find_parent()
         if box:
             inp = box.find_next('input')
@@ -229,7 +262,10 @@ def extract_display_price(soup):
                         return f"${n:,}"
 
     # 2) Price card → look for an element whose text is EXACTLY a price
-    card = _find_price_card(soup)
+    if index:
+        card = _find_price_card(soup, index["seller_hdr"], index["price_hint"], prefound=True)
+    else:
+        card = _find_price_card(soup)
     if card:
         for tag in card.find_all(['h1','h2','h3','strong','span','div'], string=True):
             txt = clean_text(tag.get_text(" ", strip=True))
@@ -242,7 +278,7 @@ def extract_display_price(soup):
             return val
 
     # Last-chance fallback: broaden slightly around Seller Information if card detection fails
-    seller = soup.find(string=re.compile(r'Seller Information', re.I))
+    seller = index["seller_any"] if index else soup.find(string=SELLER_ANY_RE)
     if seller:
         sidebar = seller.find_parent(['aside','section','div','article']) or soup
         for tag in sidebar.find_all(['h1','h2','h3','strong','span','div'], string=True):
@@ -264,7 +300,7 @@ def extract_sold_flag(soup) -> str:
         return "Sold"
 
     # optional: also check the right-hand sidebar where price lives
-    seller_hdr = soup.find(string=re.compile(r'^\s*Seller Information\s*$', re.I))
+    seller_hdr = soup.find(string=SELLER_HDR_RE)
     if seller_hdr:
         sidebar = seller_hdr.find_parent(['aside','section','div','article'])
         if sidebar and sidebar.find(string=SOLD_RE):
@@ -272,39 +308,67 @@ def extract_sold_flag(soup) -> str:
 
     return "Available"
 
-def parse_detail_page(url):
-    """Fetch and parse a detail page; dump HTML for inspection (no per-listing prints)."""
-    html = get_html(url)
-
-    # Persist detail page for inspection
-    os.makedirs(DEBUG_DIR, exist_ok=True)
-    m = DETAIL_ID_RE.search(url)
-    did = m.group("id") if m else str(int(time.time()))
-    path = os.path.join(DEBUG_DIR, f"detail_{did}.html")
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(html)
-    dbg(f"Wrote detail HTML to {path}")
-
-    soup = BeautifulSoup(html, "html.parser")
+def index_page_strings(soup, labels=DETAIL_LABELS):
+    """
+    Single walk over every text node of the page, recording (in document order) the
+    first node each extractor would have found with its own soup.find / find_all scan:
+      label       -> first node whose whole text is the label
+      label_colon -> value of the first "Label: value" text, for the fallback
+      plus the Offer Price labels and the Seller Information / price hint / sold / posted nodes.
+    """
+    wanted = {lab.lower(): lab for lab in labels}
+    lowered = [(lab, lab.lower()) for lab in labels]
+    index = {"label": {}, "label_colon": {}, "offer_price": [], "seller_hdr": None,
+             "seller_any": None, "price_hint": None, "sold": None, "posted": None}
+    for node in soup.find_all(string=True):
+        key = node.strip().lower()
+        lab = wanted.get(key)
+        if lab is not None and lab not in index["label"]:
+            index["label"][lab] = node
+        if ":" in node and len(index["label_colon"]) < len(lowered):
+            t = clean_text(node)
+            tl = t.lower()
+            for lab, lab_l in lowered:
+                if lab not in index["label_colon"] and tl.startswith(lab_l):
+                    index["label_colon"][lab] = clean_text(t.split(":", 1)[-1])
+        if "offer price" in key and OFFER_PRICE_RE.search(node):
+            index["offer_price"].append(node)
+        if index["seller_any"] is None and "seller information" in key:
+            index["seller_any"] = node
+            if SELLER_HDR_RE.search(node):
+                index["seller_hdr"] = node
+        elif index["seller_hdr"] is None and "seller information" in key and SELLER_HDR_RE.search(node):
+            index["seller_hdr"] = node
+        if index["price_hint"] is None and ("instl" in key or "depre" in key) and PRICE_HINT_RE.search(node):
+            index["price_hint"] = node
+        if index["sold"] is None and "sold" in key and SOLD_RE.search(node):
+            index["sold"] = node
+        if index["posted"] is None and "posted" in key and POSTED_RE.search(node):
+            index["posted"] = node
+    return index
+
+def parse_detail_soup(soup) -> dict:
+    """All fields of a detail page from one pass over its text nodes (same output as the per-field scans)."""
+    index = index_page_strings(soup)
 
     # Title and price are parsed but not printed
     h = soup.find(["h1", "h2"])
     title = clean_text(h.get_text(" ", strip=True)) if h else ""
-    price = extract_display_price(soup)
-    sold_flag = extract_sold_flag(soup)
-    posted_date = extract_posted_date(soup)
-
-
-    labels = [
-        "Registration Date","Ownership","Mileage","Veh. Scheme","COE","OMV","ARF",
-        "Min. PARF","Paper Value","Road Tax Payable","COE Expiry Date",
-        "PARF Expiry Date","Road Tax Expiry Date","Manufacturing Year",
-        "Primary Colour","Transmission","Fuel Type","Engine Capacity","Power",
-    ]
-    fields = {lab: coerce_na(find_value_by_label(soup, lab), lab) for lab in labels}
+    price = extract_display_price(soup, index=index)
+    # a sold badge inside the sidebar is also a page-wide match, so the first match decides
+    sold_flag = "Sold" if index["sold"] is not None else "Available"
+    posted_date = extract_posted_date(soup, node=index["posted"])
+
+    fields = {}
+    for lab in DETAIL_LABELS:
+        val = None
+        if lab in index["label"]:
+            val = _value_near_label(index["label"][lab])
+        if val is None:
+            val = index["label_colon"].get(lab, "")
+        fields[lab] = coerce_na(val, lab)
 
     return {
-        "url": url,
         "title": title.lstrip("# ").strip(),
         "price": price,
         "Status": sold_flag,
@@ -312,14 +376,42 @@ def parse_detail_page(url):
         **fields,
     }
 
-def crawl(num_pages=3, delay=0.1):
+def parse_detail_page(url, fetcher=None):
+    """Fetch and parse a detail page; the HTML is only kept if parsing failed (or was sampled)."""
+    html = get_html(url, fetcher=fetcher)
+    soup = make_soup(html)
+    row = {"url": url, **parse_detail_soup(soup)}
+
+    fields = [row[lab] for lab in DETAIL_LABELS]
+    parse_failed = not row["title"] or not row["price"] or all(v == "N.A." for v in fields)
+    debug_capture().capture("detail", listing_id_from_url(url) or url, html, failed=parse_failed)
+    return row
+
+def fetch_details(urls, fetcher=None):
+    """
+    Parse the detail pages of urls, concurrently when a PooledFetcher is given.
+    Returns one row per url in the same order (None where the fetch failed).
+    """
+    def job(url):
+        try:
+            dbg(f"Fetching detail: {url}", level="DEBUG")
+            return parse_detail_page(url, fetcher=fetcher)
+        except Exception as e:
+            dbg(f"detail fetch failed: {url} -> {e}", level="WARN")
+            return None
+
+    if fetcher is None:
+        return [job(u) for u in urls]
+    return fetcher.map(job, urls)
+
+def crawl(num_pages=3, delay=0.1, fetcher=None):
     seen_links = set()
     rows = []
 
     for page in range(1, num_pages + 1):
-        params = {"page": page, "order": "price-asc", "_": int(time.time())}
+        params = {"page": page, "order": "price-asc"}
         dbg(f"--- Page {page} ---")
-        list_html = get_html(LIST_URL, params=params)
+        list_html = get_html(LIST_URL, params=params, fetcher=fetcher)
         links = extract_detail_links_from_html(list_html, page_num=page)
 
         if not links:
@@ -332,22 +424,17 @@ def crawl(num_pages=3, delay=0.1):
             dbg(f"No new links on page {page}. Stopping.")
             break
 
-        for url in new_links:
-            seen_links.add(url)
-            try:
-                dbg(f"Fetching detail: {url}")
-                row = parse_detail_page(url)
+        seen_links.update(new_links)
+        for row in fetch_details(new_links, fetcher):
+            if row is not None:
                 rows.append(row)
-                dbg(f"Added row #{len(rows)}")
-            except Exception as e:
-                dbg(f"[WARN] detail fetch failed: {url} -> {e}")
-            # time.sleep(delay + random.random() * 0.5)  # jitter
+        dbg(f"Rows so far: {len(rows)}")
 
         # time.sleep(delay + random.random() * 0.5)
 
     return rows
 
-def crawl_all(delay=0.1, max_consecutive_no_new=2, max_repeated_pages=2):
+def crawl_all(delay=0.1, max_consecutive_no_new=2, max_repeated_pages=2, fetcher=None):
     """
     Crawl ALL listing pages with guardrails:
       - Stop if a page has no links
@@ -363,12 +450,12 @@ def crawl_all(delay=0.1, max_consecutive_no_new=2, max_repeated_pages=2):
     repeated_pages = 0
 
     while True:
-        params = {"page": page, "_": int(time.time())}  
+        params = {"page": page}
         dbg(f"--- Page {page} ---")
         
         # Break cleanly when the site returns 404 (no pages left)
         try:
-            list_html = get_html(LIST_URL, params=params, retries=3)
+            list_html = get_html(LIST_URL, params=params, retries=3, fetcher=fetcher)
         except RuntimeError as e:
             dbg(f"Non-OK on page {page} (likely 404). Assuming no more pages. Stopping.")
             break
@@ -406,16 +493,11 @@ def crawl_all(delay=0.1, max_consecutive_no_new=2, max_repeated_pages=2):
             break
 
         # Fetch details for any new links
-        for url in new_links:
-            seen_links.add(url)
-            try:
-                dbg(f"Fetching detail: {url}")
-                row = parse_detail_page(url)
+        seen_links.update(new_links)
+        for row in fetch_details(new_links, fetcher):
+            if row is not None:
                 rows.append(row)
-                dbg(f"Added row #{len(rows)}")
-            except Exception as e:
-                dbg(f"[WARN] detail fetch failed: {url} -> {e}")
-            # time.sleep(delay + random.random() * 0.5)  # jitter
+        dbg(f"Rows so far: {len(rows)}")
 
         page += 1
         # time.sleep(delay + random.random() * 0.5)
@@ -423,7 +505,7 @@ def crawl_all(delay=0.1, max_consecutive_no_new=2, max_repeated_pages=2):
     dbg(f"[crawl_all] Finished. Total rows: {len(rows)} across {page-1} pages.")
     return rows
 
-def crawl_available_only(max_pages=500, delay=0.1):
+def crawl_available_only(max_pages=500, delay=0.1, fetcher=None):
     """
     Crawl listing pages and stop as soon as we encounter a SOLD listing.
     Only returns available listings collected up to that point.
@@ -432,10 +514,10 @@ def crawl_available_only(max_pages=500, delay=0.1):
     rows = []
 
     for page in range(1, max_pages + 1):
-        params = {"page": page, "_": int(time.time())}  # default ordering
+        params = {"page": page}  # default ordering
         dbg(f"--- Page {page} ---")
         try:
-            list_html = get_html(LIST_URL, params=params)
+            list_html = get_html(LIST_URL, params=params, fetcher=fetcher)
         except RuntimeError as e:
             dbg(f"[available_only] listing page fetch failed: {e}")
             break
@@ -451,20 +533,18 @@ def crawl_available_only(max_pages=500, delay=0.1):
             dbg(f"[available_only] No new links on page {page}. Stopping.")
             break
 
-        for url in new_links:
-            seen_links.add(url)
-            try:
-                dbg(f"[available_only] Fetching detail: {url}")
-                row = parse_detail_page(url)
-                # IMPORTANT: stop immediately if this listing is sold
-                if row.get("Status", "") == "Sold":
-                    dbg(f"[available_only] Encountered SOLD listing. Halting crawl at {url}")
-                    return rows  # do not include the sold row
-                rows.append(row)
-                dbg(f"[available_only] Added row #{len(rows)}")
-            except Exception as e:
-                dbg(f"[available_only][WARN] detail fetch failed: {url} -> {e}")
-            # time.sleep(delay + random.random() * 0.5)
+        # the page's details are fetched concurrently but walked in page order,
+        # so we still stop at exactly the first SOLD listing
+        seen_links.update(new_links)
+        for url, row in zip(new_links, fetch_details(new_links, fetcher)):
+            if row is None:
+                continue
+            # IMPORTANT: stop immediately if this listing is sold
+            if row.get("Status", "") == "Sold":
+                dbg(f"[available_only] Encountered SOLD listing. Halting crawl at {url}")
+                return rows  # do not include the sold row
+            rows.append(row)
+            dbg(f"[available_only] Added row #{len(rows)}", level="DEBUG")
 
         # time.sleep(delay + random.random() * 0.5)
 
@@ -486,24 +566,26 @@ def save_to_csv(df, filename=None):
     df.to_csv(filepath, index=False)
     print(f"Saved file: {filename}")
 
-def get_motorist_data(mode: str = "available_only", **kwargs) -> pd.DataFrame:
+def get_motorist_data(mode: str = "available_only", max_workers: int = 8,
+                      requests_per_second: float = 4.0, **kwargs) -> pd.DataFrame:
     """
     Returns a DataFrame of Motorist listings.
     mode:
       - "available_only": stops when first SOLD is seen (your current default)
       - "all": crawl all pages with guardrails (crawl_all)
       - "pages": crawl a fixed number of pages (crawl), pass NUM_PAGES via kwargs
+    Detail pages are fetched `max_workers` at a time over one keep-alive session,
+    at most `requests_per_second` to the site; rows keep listing-page order.
     Extra kwargs are passed to the selected crawl function.
     """
-    if mode == "available_only":
-        rows = crawl_available_only(**kwargs)
-    elif mode == "all":
-        rows = crawl_all(**kwargs)
-    elif mode == "pages":
-        num_pages = kwargs.pop("num_pages", 5)
-        rows = crawl(num_pages=num_pages, **kwargs)
-    else:
+    crawlers = {"available_only": crawl_available_only, "all": crawl_all, "pages": crawl}
+    if mode not in crawlers:
         raise ValueError(f"Unknown mode: {mode}")
+    if mode == "pages":
+        kwargs.setdefault("num_pages", 5)
+    with PooledFetcher(max_workers=max_workers, requests_per_second=requests_per_second,
+                       headers=HEADERS, cache=default_cache()) as fetcher:
+        rows = crawlers[mode](fetcher=fetcher, **kwargs)
     if not rows:
         # return empty df with stable schema so downstream never breaks
         df = pd.DataFrame(columns=DEFAULT_COLUMNS + ['scrape_date'])
@@ -0,0 +1,85 @@
+# sgcarmart_extract.py
+# Fast extraction of the JSON that SGCarMart embeds in its Next.js pages.
+# The data sits inside a <script> whose body is a JS string literal, e.g.
+#     self.__next_f.push([1,"...\"listing_data\":{\"data\":[...]}..."])
+# Instead of unicode_escape-decoding every script and walking it char by char,
+# we find the one script by substring search, decode its string literal once
+# with the C JSON decoder, and raw_decode only the object/list we need.
+import re
+import json
+
+_DECODER = json.JSONDecoder()
+LISTING_KEY = '"listing_data":{"data":'
+DETAIL_MARKER = "infoUrlData"
+PUSH_RE = re.compile(r'^\s*self\.__next_f\.push\(\[\s*\d+\s*,\s*"')
+
+# =========================
+# SCRIPT LOCATION / DECODING
+# =========================
+def _script_body_around(html: str, idx: int):
+    """Return (body, body_start) of the <script> element containing html[idx], or (None, -1)."""
+    open_idx = html.rfind("<script", 0, idx)
+    if open_idx == -1:
+        return None, -1
+    body_start = html.find(">", open_idx) + 1
+    body_end = html.find("</script>", idx)
+    if body_start <= 0 or body_start > idx or body_end == -1:
+        return None, -1
+    return html[body_start:body_end], body_start
+
+def decode_script_text(script: str) -> str:
+    """
+    Unescape a Next.js flight script: decode its JS string literal with the JSON
+    decoder (C speed, correct for non-ASCII). Falls back to the old unicode_escape
+    decoding for scripts in any other shape.
+    """
+    m = PUSH_RE.match(script)
+    if m:
+        try:
+            text, _ = _DECODER.raw_decode(script, m.end() - 1)
+            return text
+        except ValueError:
+            pass
+    return script.encode('utf-8').decode('unicode_escape')
+
+# =========================
+# PUBLIC EXTRACTORS
+# =========================
+def extract_listing_data(html: str):
+    """
+    The list of listing dicts on a used-cars list page, or None if the page has none.
+    Raises json.JSONDecodeError if the embedded list is malformed.
+    """
+    # the key is escaped inside the script's string literal, so search for the bare name first
+    idx = html.find("listing_data")
+    while idx != -1:
+        script, _ = _script_body_around(html, idx)
+        if script is not None:
+            text = decode_script_text(script)
+            start = text.find(LISTING_KEY)
+            if start != -1:
+                list_start = text.find("[", start + len(LISTING_KEY))
+                if list_start == -1:
+                    return None
+                data, _ = _DECODER.raw_decode(text, list_start)
+                return data
+        idx = html.find("listing_data", idx + 1)
+    return None
+
+def extract_detail_data(html: str):
+    """
+    The top-level JSON object of a listing detail page (the script that starts with
+    'infoUrlData' within its first 100 characters), or None if not present.
+    """
+    idx = html.find(DETAIL_MARKER)
+    while idx != -1:
+        script, body_start = _script_body_around(html, idx)
+        if script is not None and idx - body_start < 100:
+            text = decode_script_text(script)
+            start = text.find("{")
+            if start == -1:
+                return None
+            data, _ = _DECODER.raw_decode(text, start)
+            return data
+        idx = html.find(DETAIL_MARKER, idx + 1)
+    return None
@@ -0,0 +1,191 @@
+# sgcarmart_extract_check.py
+# Equivalence check + micro-benchmark for the SGCarMart page extractors
+# (apis/sgcarmart_extract.py) against the implementations they replaced.
+#
+# Usage: python -m apis.sgcarmart_extract_check [list_page.html ...] [--detail detail_page.html ...]
+#        python -m apis.sgcarmart_extract_check --record list|detail <url> [<url> ...]
+# Without arguments it runs on the saved pages under apis/fixtures/sgcarmart/
+# (list_*.html, detail_*.html; --record adds to them) and on synthetic pages that
+# use the same escaping as Next.js (htmlEscapeJsonString: <, >, & and U+2028/9
+# as \uXXXX inside the JSON string literal). Saved list pages are also parsed
+# with html.parser and lxml to check that get_brands' <script> list is the same
+# under both backends, before SGCarMart is moved to lxml (apis/html_parser.py).
+import os
+import re
+import sys
+import glob
+import json
+import timeit
+from apis.sgcarmart_extract import extract_listing_data, extract_detail_data
+from apis.html_parser import compare_backends
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "sgcarmart")
+
+# =========================
+# PREVIOUS IMPLEMENTATIONS
+# =========================
+def _legacy_extract_listing_data(html):
+    scripts = re.findall(r"<script[^>]*>(.*?)</script>", html, flags=re.S)
+    cleaned = scripts[-2].encode('utf-8').decode('unicode_escape')
+    key = '"listing_data":{"data":'
+    start = cleaned.find(key)
+    if start == -1:
+        return None
+    i = start + len(key)
+    n = len(cleaned)
+    while i < n and cleaned[i] != '[':
+        i += 1
+    list_start = i
+    depth = 0
+    in_string = False
+    string_char = ''
+    escaped = False
+    while i < n:
+        ch = cleaned[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == string_char:
+                in_string = False
+        else:
+            if ch == '"' or ch == "'":
+                in_string = True
+                string_char = ch
+            elif ch == '[':
+                depth += 1
+            elif ch == ']':
+                depth -= 1
+                if depth == 0:
+                    return json.loads(cleaned[list_start:i+1])
+        i += 1
+    return None
+
+def _legacy_extract_detail_data(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in [s.string for s in soup.find_all('script') if s.string]:
+        if 'infoUrlData' in script[:100]:
+            cleaned = script.encode('utf-8').decode('unicode_escape')
+            start = cleaned.find('{')
+            depth = 0
+            for i, ch in enumerate(cleaned[start:], start=start):
+                if ch == '{':
+                    depth += 1
+                elif ch == '}':
+                    depth -= 1
+                    if depth == 0:
+                        return json.loads(cleaned[start:i+1])
+    return None
+
+# =========================
+# SYNTHETIC PAGES
+# =========================
+def _compact(obj) -> str:
+    # Next.js serialises without spaces, and the extractors key on that exact form
+    return json.dumps(obj, separators=(",", ":"))
+
+_NEXT_ESCAPES = {"<": "\\u003c", ">": "\\u003e", "&": "\\u0026", "\u2028": "\\u2028", "\u2029": "\\u2029"}
+
+def _push_script(payload: str) -> str:
+    literal = json.dumps(payload)
+    for ch, esc in _NEXT_ESCAPES.items():
+        literal = literal.replace(ch, esc)
+    return "<script>self.__next_f.push([1," + literal + "])</script>"
+
+def synthetic_listing_page(n_items=100, padding_scripts=20):
+    items = [{"id": i, "link": f"https://www.sgcarmart.com/used-cars/info/car-{i}", "date": "17-Oct-2025",
+              "title": f"Toyota Corolla Altis 1.6A <Elegance> & Co {i}", "price": 50000 + i} for i in range(n_items)]
+    noise = "".join(_push_script("1:" + _compact({"chunk": "x" * 2000})) for _ in range(padding_scripts))
+    payload = "5:" + _compact({"listing_data": {"data": items, "total": n_items}})
+    return f"<html><head></head><body>{noise}{_push_script(payload)}<script>self.__next_f.push([2,null])</script></body></html>"
+
+def synthetic_detail_page(padding_scripts=20):
+    data = {"infoUrlData": {"id": 1}, "ucInfoPageData": {"data": {"price": "$50,000", "coe_left": "5yrs 2mths"}},
+            "ucInfoDetailData": {"data": {"car_model": "Toyota Corolla Altis", "status": "Available for sale",
+                                          "type_of_vehicle": {"text": "Mid-Sized Sedan"},
+                                          "notes": "<b>1-owner</b> & well kept\n" * 200}}}
+    noise = "".join(_push_script("1:" + _compact({"chunk": "x" * 2000})) for _ in range(padding_scripts))
+    html_body = "<div>" + "<p>text</p>" * 2000 + "</div>"
+    return f"<html><body>{html_body}{noise}{_push_script(_compact(data))}</body></html>"
+
+# =========================
+# BENCHMARK
+# =========================
+def benchmark(list_pages, detail_pages, repeat=20) -> int:
+    """
+    Time legacy vs new extractors on the given page HTML strings and check they agree.
+    Returns the number of pages the new extractors could not read.
+    """
+    cases = [
+        ("listing", list_pages, _legacy_extract_listing_data, extract_listing_data, _listing_ok),
+        ("detail", detail_pages, _legacy_extract_detail_data, extract_detail_data, _detail_ok),
+    ]
+    failures = 0
+    for label, pages, legacy, new, usable in cases:
+        if not pages:
+            continue
+        for html in pages:
+            data = new(html)
+            if data is None or not usable(data):
+                failures += 1
+                print(f"[{label}] FAILED: no usable data found in page")
+            elif legacy(html) != data:
+                print(f"[{label}] WARNING: outputs differ (expected only for non-ASCII text)")
+        t_old = timeit.timeit(lambda: [legacy(h) for h in pages], number=repeat) / repeat
+        t_new = timeit.timeit(lambda: [new(h) for h in pages], number=repeat) / repeat
+        print(f"[{label}] {len(pages)} pages: legacy {t_old*1000:.1f} ms, new {t_new*1000:.1f} ms, "
+              f"speedup x{t_old / t_new:.1f}")
+    return failures
+
+def _listing_ok(data) -> bool:
+    # get_urls reads 'date' (DD-Mon-YYYY) and 'link' of every item
+    return bool(data) and all("date" in item and "link" in item for item in data)
+
+def _detail_ok(data) -> bool:
+    # get_details / get_availability read ucInfoDetailData.data (status) and ucInfoPageData.data
+    detail = data.get("ucInfoDetailData", {}).get("data", {})
+    return "status" in detail and "data" in data.get("ucInfoPageData", {})
+
+# =========================
+# SAVED PAGES
+# =========================
+def saved_pages(kind: str, fixture_dir=FIXTURE_DIR) -> list:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixture_dir, f"{kind}_*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+def record(kind: str, urls, fixture_dir=FIXTURE_DIR):
+    import requests
+    from apis.sgcarmart_scrape import HEADERS
+    os.makedirs(fixture_dir, exist_ok=True)
+    for url in urls:
+        resp = requests.get(url, headers=HEADERS, timeout=30)
+        resp.raise_for_status()
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", url.split("//", 1)[-1])[:120]
+        path = os.path.join(fixture_dir, f"{kind}_{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(resp.text)
+        print(f"[sgcarmart_extract_check] Saved {path}")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    read = lambda p: open(p, encoding="utf-8").read()
+    if args[:1] == ["--record"]:
+        record({"list": "list", "detail": "detail"}[args[1]], args[2:])
+    elif args:
+        split = args.index("--detail") if "--detail" in args else len(args)
+        sys.exit(benchmark([read(p) for p in args[:split]], [read(p) for p in args[split + 1:]]))
+    else:
+        list_pages, detail_pages = saved_pages("list"), saved_pages("detail")
+        print(f"[sgcarmart_extract_check] saved pages: {len(list_pages)} list, {len(detail_pages)} detail")
+        failures = benchmark(list_pages, detail_pages, repeat=5)
+        if list_pages:
+            # get_brands reads a <script> by position: lxml must give the same script list
+            from apis.sgcarmart_scrape import script_texts
+            failures += not compare_backends(list_pages, script_texts)
+        failures += benchmark([synthetic_listing_page()], [synthetic_detail_page()])
+        sys.exit(failures)
@@ -1,28 +1,64 @@
 import requests
-from bs4 import BeautifulSoup
+from apis.html_parser import make_soup
 import re
 import json
 # import ast
 import os
 import pandas as pd
 from datetime import datetime
-from tqdm import tqdm
-import time, random
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from apis.http_client import PooledFetcher, TRANSIENT_ERRORS
+from apis.http_cache import default_cache
+from apis.debug_capture import debug_capture
+from apis.sgcarmart_extract import extract_listing_data, extract_detail_data
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+}
+
+def script_texts(soup):
+    """Text of every <script> with a single string child, in page order."""
+    return [script.string for script in soup.find_all('script') if script.string]
 
 class SGCarMartScraper:
 
-    def __init__(self):
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-        }
+    def __init__(self, fetcher=None, max_workers=8, requests_per_second=4.0):
+        """
+        fetcher: shared PooledFetcher; if None one is created with `max_workers`
+        concurrent requests and a per-host budget of `requests_per_second`,
+        revalidating pages against the shared on-disk HTTP cache. That one is
+        owned by the scraper and shut down by close() / the with block.
+        """
+        self.headers = dict(HEADERS)
+        self._owns_fetcher = fetcher is None
+        self.fetcher = fetcher or PooledFetcher(
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+            headers=self.headers,
+            cache=default_cache(),
+        )
+
+    def close(self):
+        """Shut down the fetcher's threads and session if the scraper created it."""
+        if self._owns_fetcher:
+            self.fetcher.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def get_brands(self):
         url = "https://www.sgcarmart.com/used-cars/listing?q=&avl=a"
-        response = requests.get(url, headers=self.headers)
+        response = self.fetcher.get(url)
         html = response.text
 
-        soup = BeautifulSoup(html, 'html.parser')
-        scripts = [script.string for script in soup.find_all('script') if script.string]
+        # html.parser until lxml is compared on saved SGCarMart pages (sgcarmart_extract_check);
+        # the script picked below is positional, so the backend must not change the list
+        soup = make_soup(html, parser="html.parser")
+        scripts = script_texts(soup)
         target_script = scripts[-2]   # THIRD last one
 
         cleaned = target_script.encode('utf-8').decode('unicode_escape')
@@ -46,118 +82,39 @@ class SGCarMartScraper:
         # return ["Toyota"] #To pull specific brands if got problem
     
 
-    def get_urls(self, brand, start_date):
-        def extract_listing_data(cleaned):
-            key = '"listing_data":{"data":'
-            start = cleaned.find(key)
-            if start == -1:
-                return None
-
-            # # start index of the list
-            # start += len(key)
-            # depth = 0
-            # in_list = False
-
-            # for i, ch in enumerate(cleaned[start:], start=start):
-            #     if ch == '[' and not in_list:
-            #         in_list = True
-            #         depth = 1
-            #         list_start = i
-            #     elif ch == '[' and in_list:
-            #         depth += 1
-            #     elif ch == ']' and in_list:
-            #         depth -= 1
-            #         if depth == 0:
-            #             return cleaned[list_start:i+1]  # returns the full list as string
-
-            # return None  # if no balanced list found
-
-            i = start + len(key)
-            n = len(cleaned)
-
-            # find first '['
-            while i < n and cleaned[i] != '[':
-                i += 1
-            if i >= n:
-                return None
-
-            list_start = i
-            depth = 0
-            in_string = False
-            string_char = ''
-            escaped = False
-
-            while i < n:
-                ch = cleaned[i]
-                if in_string:
-                    if escaped:
-                        escaped = False
-                    elif ch == '\\':
-                        escaped = True
-                    elif ch == string_char:
-                        in_string = False
-                else:
-                    if ch == '"' or ch == "'":
-                        in_string = True
-                        string_char = ch
-                    elif ch == '[':
-                        depth += 1
-                    elif ch == ']':
-                        depth -= 1
-                        if depth == 0:
-                            # found matching closing bracket
-                            return cleaned[list_start:i+1]
-                i += 1
-
-            # if no matching bracket found
-            return None
-        
-        page = 1
+    def get_urls(self, brand, start_date, start_page=1, on_page_done=None, raise_on_list_error=False):
+        """
+        Scrape a brand's listings posted on/after start_date, from start_page onwards.
+        on_page_done(page, rows) is called after each list page's details are fetched
+        (used for checkpointing). With raise_on_list_error a failed list page raises
+        instead of returning an empty DataFrame, so the caller can resume later.
+        """
+        page = start_page
         cars = []
         retry_count = 0
 
         while True:
             url = f"https://www.sgcarmart.com/used-cars/listing?q={brand}&avl=a&limit=100&page={page}"
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"}
-            # response = requests.get(url, headers=headers)
-            # html = response.text
-            for attempt in range(3):
-                try:
-                    response = requests.get(
-                        url,
-                        headers=headers,
-                        timeout=15,
-                        stream=False
-                    )
-                    response.raise_for_status()
-                    html = response.text
-                    break
-                except (requests.exceptions.ChunkedEncodingError,
-                        requests.exceptions.ConnectionError,
-                        requests.exceptions.ReadTimeout) as e:
-                    print(f"List page error ({attempt+1}/3) for {url}: {e}")
-                    if attempt == 2:
-                        # can't read this brand page -> stop this brand gracefully
-                        print(f"List page error for {url} and couldn't be added: {e}")
-                        return pd.DataFrame([])   # or `break` if you prefer
-                    time.sleep(30)
-                except requests.HTTPError as e:
-                    print(f"HTTP error on list page {url}: {e}")
-                    return pd.DataFrame([])
+            try:
+                response = self.fetcher.get(url, retries=3, retry_sleep=30)
+                response.raise_for_status()
+                html = response.text
+            except TRANSIENT_ERRORS as e:
+                # can't read this brand page -> stop this brand gracefully
+                print(f"List page error for {url} and couldn't be added: {e}")
+                if raise_on_list_error:
+                    raise
+                return pd.DataFrame([])
+            except requests.HTTPError as e:
+                print(f"HTTP error on list page {url}: {e}")
+                if raise_on_list_error:
+                    raise
+                return pd.DataFrame([])
             print(url)
-            scripts = re.findall(r"<script[^>]*>(.*?)</script>", html, flags=re.S)
-            # print(scripts)
-            target_script = scripts[-2]   # second last one
-            cleaned = target_script.encode('utf-8').decode('unicode_escape')
-            list_str = extract_listing_data(cleaned)
             finished = False
-            # print(list_str)
             try:
-                if list_str:
-                    data_list = json.loads(list_str)
-                    # print(f"Found {len(data_list)} items in the list")
-                else:
+                data_list = extract_listing_data(html)
+                if data_list is None:
                     print("No listing data found")
                     break
             except json.JSONDecodeError as e:
@@ -179,20 +136,25 @@ class SGCarMartScraper:
                 print("No more data found, ending.")
                 break
                 
+            page_urls = []
             for data in data_list:
                 date_posted = data['date']
-                url = data['link']
                 # convert string to datetime
                 date_posted = datetime.strptime(date_posted, '%d-%b-%Y')
 
                 if date_posted >= start_date:  # more recent than start_date
-                    details = self.get_details(url)
-                    cars.extend(details)
-                    # do something
-                    # print(f"{date_posted} is after {start_date}, url = {url}")
+                    page_urls.append(data['link'])
                 else:
                     finished = True
                     break
+
+            # Fetch this page's detail listings concurrently (results stay in listing order)
+            page_cars = []
+            for details in self.fetcher.map(self.get_details, page_urls):
+                page_cars.extend(details)
+            cars.extend(page_cars)
+            if on_page_done is not None:
+                on_page_done(page, page_cars)
             if finished:
                 break
             
@@ -203,209 +165,128 @@ class SGCarMartScraper:
         return df
     
     def get_details(self, url):
-        def extract_json(script):
-            start = script.find('{')
-            if start == -1:
-                return None
-            depth = 0
-            for i, ch in enumerate(script[start:], start=start):
-                if ch == '{':
-                    depth += 1
-                elif ch == '}':
-                    depth -= 1
-                    if depth == 0:
-                        return script[start:i+1]
-            return None
-        
-        # response = requests.get(url, headers=self.headers)
-        # html = response.text
-
-        # Try pulling 3 times
-        for attempt in range(3):
-            try:
-                resp = requests.get(
-                    url,
-                    headers=self.headers,
-                    timeout=15,
-                    stream=False
-                )
-                resp.raise_for_status()
-                html = resp.text
-                break
-            except (requests.exceptions.ChunkedEncodingError,
-                    requests.exceptions.ConnectionError,
-                    requests.exceptions.ReadTimeout) as e:
-                print(f"Fetch error ({attempt+1}/3) for {url}: {e}")
-                if attempt == 2:
-                    # give up on this listing but don't kill the whole run
-                    return []
-                time.sleep(1.2)
-            except requests.HTTPError as e:
-                print(f"HTTP error for {url}: {e}")
-                return []
-
-        soup = BeautifulSoup(html, 'html.parser')
-        scripts = [script.string for script in soup.find_all('script') if script.string]
+        # Try pulling 3 times (the fetcher's per-host budget replaces the old per-listing sleep)
+        try:
+            resp = self.fetcher.get(url, retries=3, retry_sleep=1.2)
+            resp.raise_for_status()
+            html = resp.text
+        except TRANSIENT_ERRORS:
+            # give up on this listing but don't kill the whole run
+            return []
+        except requests.HTTPError as e:
+            print(f"HTTP error for {url}: {e}")
+            return []
 
         results = []
         # print(url)
         # data['ucInfoDetailData']['data']['status'] == 'Available for sale':
         try:
-            for i, script in enumerate(scripts):
-                if 'infoUrlData' in script[:100]:
-                    cleaned = script.encode('utf-8').decode('unicode_escape')
-                    cleaned = extract_json(cleaned)
-                    data = json.loads(cleaned)
-                    price = data.get("ucInfoPageData", {}).get('data', {}).get('price', {})
-                    ucInfoDetailData = data.get("ucInfoDetailData", {}).get('data', {})
-                    # print(ucInfoDetailData)
-                    coe_left = data.get("ucInfoPageData", {}).get('data', {}).get('coe_left', {})
-                    # print(data.get("ucInfoPageData", {}))
-                    fields = [
-                        "car_model", "depreciation", "reg_date", "mileage", "manufactured",
-                        "road_tax", "transmission", "dereg_value", "omv", "coe", "arf",
-                        "engine_cap", "power", "curb_weight", "owners", "posted_on",
-                        "drive_range", "lifespan", "original_reg_date", "indicative_price",
-                        "auction_closing", 'status', 'fuel_type'
-                    ]
-                    extracted = {field: ucInfoDetailData.get(field) for field in fields}
-                    extracted["type_of_vehicle"] = ucInfoDetailData.get("type_of_vehicle", {}).get("text")
-                    extracted['price'] = price
-                    extracted['url'] = url  # Add the url field
-                    extracted['date_scraped'] = pd.Timestamp.now().strftime('%Y-%m-%d')
-                    extracted['coe_left'] = coe_left
-                    results.append(extracted)
-                    # print(extracted)
-                    time.sleep(random.uniform(0.25, 0.5))
-                    break
+            data = extract_detail_data(html)
+            if data is not None:
+                price = data.get("ucInfoPageData", {}).get('data', {}).get('price', {})
+                ucInfoDetailData = data.get("ucInfoDetailData", {}).get('data', {})
+                # print(ucInfoDetailData)
+                coe_left = data.get("ucInfoPageData", {}).get('data', {}).get('coe_left', {})
+                # print(data.get("ucInfoPageData", {}))
+                fields = [
+                    "car_model", "depreciation", "reg_date", "mileage", "manufactured",
+                    "road_tax", "transmission", "dereg_value", "omv", "coe", "arf",
+                    "engine_cap", "power", "curb_weight", "owners", "posted_on",
+                    "drive_range", "lifespan", "original_reg_date", "indicative_price",
+                    "auction_closing", 'status', 'fuel_type'
+                ]
+                extracted = {field: ucInfoDetailData.get(field) for field in fields}
+                extracted["type_of_vehicle"] = ucInfoDetailData.get("type_of_vehicle", {}).get("text")
+                extracted['price'] = price
+                extracted['url'] = url  # Add the url field
+                extracted['date_scraped'] = pd.Timestamp.now().strftime('%Y-%m-%d')
+                extracted['coe_left'] = coe_left
+                results.append(extracted)
         except Exception as e:
             print(f"Error processing {url}: {e}")
 
         if not results:
             print(f"No match in {url}")
+            debug_capture().capture("sgcarmart_detail", url.rstrip("/").rsplit("/", 1)[-1], html, failed=True)
 
         return results
     
-    def scrape_from_scratch(self, cache_dir):
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-        else:
-            # Clear existing cache files
-            existing_brands = set()
-            for file in os.listdir(cache_dir):
-                existing_brands.add(file.replace("sgcarmart_", "").replace(".csv", ""))
-        brands = self.get_brands()
+    def scrape_from_scratch(self, cache_dir, num_shards=4, max_workers=8, requests_per_second=4.0):
+        """
+        Full scrape of every brand, sharded across `num_shards` worker processes.
+        Each brand keeps a checkpoint (last page / last URL done) and one CSV per list
+        page under cache_dir, so a crashed or retried run resumes at the next page.
+        The politeness budget (`requests_per_second`) is split across the shards.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        brands = [b for b in self.get_brands() if b != 'Mitsubish']
         start_time = pd.Timestamp.now()
-        count = 0       
         start_date = datetime.strptime('1600-09-24', '%Y-%m-%d')
-        # all_cars = []
+        shard_rps = requests_per_second / max(1, num_shards)
+
+        failed = []
+        with ProcessPoolExecutor(max_workers=num_shards) as ex:
+            futures = {
+                ex.submit(scrape_brand_shard, brand, cache_dir, start_date,
+                          max(1, max_workers // num_shards), shard_rps): brand
+                for brand in brands
+            }
+            for fut in as_completed(futures):
+                brand = futures[fut]
+                try:
+                    _, n_rows = fut.result()
+                    print(f"Brand {brand} done with {n_rows} records. Time taken so far: {pd.Timestamp.now() - start_time}")
+                except Exception as e:
+                    print(f"Brand {brand} failed, checkpoint kept for resume: {e}")
+                    failed.append(brand)
 
-        for brand in brands:
-            if brand == 'Mitsubish':
-                continue
-            if brand not in existing_brands:
-                print(f"Getting URLs for brand: {brand}")
-               
-                df = self.get_urls(brand, start_date=start_date)
-                
-                if not df.empty:
-                    df['brand'] = brand.replace("+", " ")
-                    df.to_csv(os.path.join(cache_dir, f"sgcarmart_{brand}.csv"), index=False)
-                    # all_cars.extend(df.to_dict(orient='records'))
-                    print(f"Added data for brand: {brand} with {len(df)} records")
-                    count += len(df)
-                elapsed_time = pd.Timestamp.now() - start_time
-                print(f"Time taken so far: {elapsed_time}")
-                print(f"Total records so far: {count}")
-                print()
-            else:
-                print(f"Skipping brand {brand}, already scraped.")
+        if failed:
+            # leave the cache in place; the task retry resumes from the checkpoints
+            raise RuntimeError(f"SGCarmart full scrape incomplete for {len(failed)} brands: {failed}")
 
-        # Create one final DataFrame and save once at the end
+        # Create one final DataFrame from every brand's page files
         all_dfs = []
-
-        for file in os.listdir(cache_dir):
-            if file.endswith(".csv"):
-                file_path = os.path.join(cache_dir, file)
-                df = pd.read_csv(file_path)
-                all_dfs.append(df)
-
-        final_df = pd.concat(all_dfs, ignore_index=True)
-
-        for file in os.listdir(cache_dir):
-            if file.endswith(".csv"):
-                file_path = os.path.join(cache_dir, file)
-                os.remove(file_path)  # deletes the file
-        
+        for brand in brands:
+            shard_dir = _shard_dir(cache_dir, brand)
+            for file in sorted(os.listdir(shard_dir)):
+                if file.endswith(".csv"):
+                    all_dfs.append(pd.read_csv(os.path.join(shard_dir, file)))
+        final_df = pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
+        print(f"Total records: {len(final_df)}")
+
+        shutil.rmtree(cache_dir, ignore_errors=True)
         return final_df
 
     def get_availability(self, url):
-        def extract_json(script):
-            start = script.find('{')
-            if start == -1:
-                return None
-            depth = 0
-            for i, ch in enumerate(script[start:], start=start):
-                if ch == '{':
-                    depth += 1
-                elif ch == '}':
-                    depth -= 1
-                    if depth == 0:
-                        return script[start:i+1]
-            return None
-        
-        # response = requests.get(url, headers=self.headers)
-        # html = response.text
-
-        # Try pulling 3 times
-        for attempt in range(3):
-            try:
-                resp = requests.get(
-                    url,
-                    headers=self.headers,
-                    timeout=15,
-                    stream=False
-                )
-                # special case: page genuinely gone = sold
-                if resp.status_code in (404, 410):
-                    print(f"[SGCM] {resp.status_code} for {url} → treat as SOLD")
-                    return False
-                resp.raise_for_status()
-                html = resp.text
-                break
-            except (requests.exceptions.ChunkedEncodingError,
-                    requests.exceptions.ConnectionError,
-                    requests.exceptions.ReadTimeout) as e:
-                print(f"Fetch error ({attempt+1}/3) for {url}: {e}")
-                if attempt == 2:
-                    # give up on this listing but don't kill the whole run
-                    time.sleep(300)
-                    return True
-                time.sleep(1.2)
-            except requests.HTTPError as e:
-                print(f"HTTP error for {url}: {e}")
-                return True
+        # One attempt: the sold checker retries the whole check (with_retries), and a
+        # transient error raised from here fails only this listing, not the run
+        resp = self.fetcher.get(url, retries=1)
+        # special case: page genuinely gone = sold
+        if resp.status_code in (404, 410):
+            print(f"[SGCM] {resp.status_code} for {url} → treat as SOLD")
+            return False
+        try:
+            resp.raise_for_status()
+        except requests.HTTPError as e:
+            print(f"HTTP error for {url}: {e}")
+            return True
+        # on a 304 the fetcher puts the cached page back, which may already say sold
+        html = resp.text
 
-        soup = BeautifulSoup(html, 'html.parser')
-        scripts = [script.string for script in soup.find_all('script') if script.string]
         # print(f'URL: {url}')
         try:
-            for i, script in enumerate(scripts):
-                if 'infoUrlData' in script[:100]:
-                    cleaned = script.encode('utf-8').decode('unicode_escape')
-                    cleaned = extract_json(cleaned)
-                    
-                    data = json.loads(cleaned)
-                    # print(data['ucInfoDetailData']['data']['status'])
-                    if data['ucInfoDetailData']['data']['status'] == 'Available for sale':
-                        # print()
-                        return True
-                    elif data['ucInfoDetailData']['data']['status'] == 'SOLD' or data['ucInfoDetailData']['data']['status'] == 'Expired':
-                        # print()
-                        return False
-                    else:
-                        print(f"Unknown status for {url}: {data['ucInfoDetailData']['data']['status']}")
-                        return True
+            data = extract_detail_data(html)
+            if data is not None:
+                # print(data['ucInfoDetailData']['data']['status'])
+                if data['ucInfoDetailData']['data']['status'] == 'Available for sale':
+                    # print()
+                    return True
+                elif data['ucInfoDetailData']['data']['status'] == 'SOLD' or data['ucInfoDetailData']['data']['status'] == 'Expired':
+                    # print()
+                    return False
+                else:
+                    print(f"Unknown status for {url}: {data['ucInfoDetailData']['data']['status']}")
+                    return True
 
         except Exception as e:
             print(f"Error processing {url}: {e}")
@@ -484,6 +365,61 @@ class SGCarMartScraper:
         # print(f"Final DataFrame saved with {len(final_df)} rows and date_scraped = {today}.")
         return final_df
 
+# =========================
+# SHARDED FULL SCRAPE
+# =========================
+def _shard_dir(cache_dir, brand):
+    return os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.+-]", "_", brand))
+
+def _write_json_atomic(path, obj):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+def load_checkpoint(shard_dir):
+    path = os.path.join(shard_dir, "checkpoint.json")
+    if not os.path.exists(path):
+        return {"last_page": 0, "last_url": None, "done": False}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def scrape_brand_shard(brand, cache_dir, start_date, max_workers=2, requests_per_second=1.0):
+    """
+    Scrape one brand (runs in a worker process). After every list page its rows are
+    written to page_<n>.csv and the checkpoint is advanced, both via atomic renames.
+    Returns (brand, rows scraped in this call).
+    """
+    shard_dir = _shard_dir(cache_dir, brand)
+    os.makedirs(shard_dir, exist_ok=True)
+    checkpoint = load_checkpoint(shard_dir)
+    if checkpoint["done"]:
+        print(f"Skipping brand {brand}, already scraped.")
+        return brand, 0
+    if checkpoint["last_page"]:
+        print(f"Resuming brand {brand} from page {checkpoint['last_page'] + 1} (last URL {checkpoint['last_url']})")
+    else:
+        print(f"Getting URLs for brand: {brand}")
+
+    def on_page_done(page, rows):
+        if rows:
+            page_df = pd.DataFrame(rows)
+            page_df['brand'] = brand.replace("+", " ")
+            page_path = os.path.join(shard_dir, f"page_{page:05d}.csv")
+            page_df.to_csv(page_path + ".tmp", index=False)
+            os.replace(page_path + ".tmp", page_path)
+            checkpoint["last_url"] = rows[-1]["url"]
+        checkpoint["last_page"] = page
+        _write_json_atomic(os.path.join(shard_dir, "checkpoint.json"), checkpoint)
+
+    with SGCarMartScraper(max_workers=max_workers, requests_per_second=requests_per_second) as scraper:
+        df = scraper.get_urls(brand, start_date=start_date, start_page=checkpoint["last_page"] + 1,
+                              on_page_done=on_page_done, raise_on_list_error=True)
+
+    checkpoint["done"] = True
+    _write_json_atomic(os.path.join(shard_dir, "checkpoint.json"), checkpoint)
+    return brand, len(df)
+
 def _normalize_url_series(s: pd.Series) -> pd.Series:
     return s.astype(str).str.strip()
 
@@ -495,25 +431,27 @@ def save_to_csv(df, filename=None):
     df.to_csv(filepath, index=False)
     print(f"Saved file: {filename}")
 
-def get_sgcarmart_data(prev_df: pd.DataFrame) -> pd.DataFrame:
+def get_sgcarmart_data(prev_df: pd.DataFrame, max_workers: int = 8, requests_per_second: float = 4.0) -> pd.DataFrame:
     """
     Returns a DataFrame of SGCarmart listings suitable for the DAG.
     - If prev_df is empty  -> full scrape (brand-by-brand) then merge results.
     - If prev_df has rows  -> incremental update since the last 'date_scraped'.
+    Detail pages are fetched `max_workers` at a time, at most `requests_per_second` to the site.
     Ensures:
       * 'url' is present, normalized, and unique (drops duplicate URLs)
       * 'date_scraped' exists (YYYY-MM-DD)
     """
-    scraper = SGCarMartScraper()
-    # Run scrape (full vs incremental)
-    if not prev_df.empty:
-        # incremental
-        df = scraper.update_df(prev_df.copy())
-    else:
-        # full scrape into a cache dir (then merged by your class)
-        cache_dir = "./data/sgcarmart/cache"
-        os.makedirs(cache_dir, exist_ok=True)
-        df = scraper.scrape_from_scratch(cache_dir=cache_dir)
+    with SGCarMartScraper(max_workers=max_workers, requests_per_second=requests_per_second) as scraper:
+        # Run scrape (full vs incremental)
+        if not prev_df.empty:
+            # incremental
+            df = scraper.update_df(prev_df.copy())
+        else:
+            # full scrape into a cache dir (then merged by your class)
+            cache_dir = "./data/sgcarmart/cache"
+            os.makedirs(cache_dir, exist_ok=True)
+            df = scraper.scrape_from_scratch(cache_dir=cache_dir, max_workers=max_workers,
+                                             requests_per_second=requests_per_second)
     # Normalise & dedupe
     if df.empty:
         return df
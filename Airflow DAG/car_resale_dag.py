@@ -1,7 +1,8 @@
-import os, re
+import os, re, tempfile
 import pandas as pd
 from airflow.exceptions import AirflowSkipException
 from airflow.decorators import dag, task
+from airflow.operators.python import get_current_context
 from airflow.providers.google.cloud.hooks.gcs import GCSHook
 from airflow.providers.google.cloud.transfers.gcs_to_bigquery import GCSToBigQueryOperator
 from airflow.providers.google.cloud.hooks.bigquery import BigQueryHook
@@ -13,14 +14,23 @@ from apis.motorist_webscraping import get_motorist_data
 from apis.annual_car_population_api import get_annual_car_population
 from apis.coe_api import get_coe_dataset
 from apis.stock_api import get_stock_data
-from modules.sgcarmart_ETL import ETL_sgcarmart
-from modules.carro_ETL import ETL_carro
-from modules.motorist_ETL import ETL_motorist
+from modules.sgcarmart_ETL import ETL_sgcarmart, save_to_csv as save_sgcarmart_csv
+from modules.carro_ETL import ETL_carro, save_to_csv as save_carro_csv
+from modules.motorist_ETL import ETL_motorist, save_to_csv as save_motorist_csv
+from modules.etl_core import BrandIndex
+from modules.date_parsing import DateFormatCache
+from modules.incremental_etl import incremental_etl
+from modules.incremental_merge import (
+    dashboard_delta, dashboard_merge_sql, incremental_merge_all, merge_version, refresh_time_columns_sql,
+)
 from modules.get_coe_forecast import get_coe_forecast
 from modules.merge_car_datasets import merge_car_datasets
 from modules.merge_all_datasets import merge_all_datasets
+from modules.reference_dimensions import ReferenceLookup, coe_rounds_dimension, pqp_dimension, stock_dimension
 from modules.sold_checker import run_sold_check
 from modules.fill_blanks_assumption import fill_blanks_in_df
+from modules.storage import GCSObjectStore, LocalObjectStore, apply_schema, upload_df, download_df
+from modules.artifact_cache import ArtifactCache
 
 PROJECT_ID = "car-resale-capstone"
 BQ_DATASET = "car_resale_bigquery"
@@ -30,6 +40,12 @@ BQ_LOCATION = "asia-southeast1"
 
 DATA_DIR = "datasets"
 TEMP_DIR = "temporary"
+REFERENCE_DIR = "reference_datasets"
+MOTORIST_STATE_OBJECT = f"{DATA_DIR}/state/motorist_listings.sqlite"
+# Point this at a directory to run the DAG against a local fake-GCS bucket
+LOCAL_GCS_DIR = os.environ.get("CAR_RESALE_LOCAL_GCS_DIR")
+# Worker-local cache so each DAG run downloads a given object version once
+ARTIFACT_CACHE_DIR = os.environ.get("CAR_RESALE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "car_resale_artifacts"))
 
 default_args = {
     'owner': 'airflow',
@@ -47,58 +63,120 @@ default_args = {
 def _gcs_hook():
     return GCSHook(gcp_conn_id=GCP_CONN_ID)
 
-def _upload_to_gcs(df: pd.DataFrame, name: str, subdir: str = DATA_DIR):
-    os.makedirs(subdir, exist_ok=True)
-    local_path = f"{subdir}/{name}.csv"
-    gcs_path   = f"{subdir}/{name}.csv"
-    df.to_csv(local_path, index=False)
+def _object_store():
+    if LOCAL_GCS_DIR:
+        return LocalObjectStore(os.path.join(LOCAL_GCS_DIR, GCS_BUCKET_NAME))
+    return GCSObjectStore(_gcs_hook().get_conn(), GCS_BUCKET_NAME)
+
+def _artifact_cache():
     try:
-        _gcs_hook().upload(bucket_name=GCS_BUCKET_NAME, object_name=gcs_path, filename=local_path)
-        print(f"Uploaded {name}.csv → gs://{GCS_BUCKET_NAME}/{gcs_path}")
-    finally:
-        if os.path.exists(local_path):
-            os.remove(local_path)
-            print(f"Deleted local file: {local_path}")
-        if os.path.isdir(subdir) and not os.listdir(subdir):
-            os.rmdir(subdir)
-            print(f"Deleted empty folder: {subdir}")
-
-def _download_from_gcs(name: str, subdir: str = DATA_DIR) -> pd.DataFrame:
-    gcs_path   = f"{subdir}/{name}.csv"
-    local_path = f"{subdir}/{name}.csv"
-    os.makedirs(subdir, exist_ok=True)
-    hook = _gcs_hook()
+        run_id = get_current_context()["run_id"]
+    except Exception:
+        return None  # outside a task run (e.g. local debugging): no caching
+    return ArtifactCache(ARTIFACT_CACHE_DIR, run_id)
+
+def _upload_to_gcs(df: pd.DataFrame, name: str, subdir: str = DATA_DIR):
+    gcs_path = f"{subdir}/{name}.parquet"
+    num_rows = upload_df(_object_store(), df, gcs_path, name)
+    print(f"Uploaded {num_rows} rows as {name}.parquet → gs://{GCS_BUCKET_NAME}/{gcs_path}")
+
+def _download_from_gcs(name: str, subdir: str = DATA_DIR, columns=None) -> pd.DataFrame:
+    """
+    Load a dataset from GCS. Reads the typed Parquet copy; if only the legacy CSV
+    exists (first run after the Parquet switch) that is read instead.
+    `columns` limits the read to a subset of columns. Objects are fetched once
+    per DAG run and generation through the worker's artifact cache.
+    """
+    store = _object_store()
+    gcs_path = f"{subdir}/{name}.parquet"
+    if not store.exists(gcs_path):
+        gcs_path = f"{subdir}/{name}.csv"
+    cache = _artifact_cache()
     try:
-        hook.download(bucket_name=GCS_BUCKET_NAME, object_name=gcs_path, filename=local_path)
-        print(f"Downloaded {gcs_path} → {local_path}")
-        df = pd.read_csv(local_path)
-        print(f"Loaded {len(df)} rows from {name}.csv")
+        if cache is not None:
+            df = cache.load_df(store, gcs_path, columns=columns)
+        else:
+            df = download_df(store, gcs_path, columns=columns)
+        print(f"Loaded {len(df)} rows from gs://{GCS_BUCKET_NAME}/{gcs_path}")
         return df
     except Exception as e:
         print(f"No existing {gcs_path} found in GCS — returning empty DataFrame. ({e})")
         return pd.DataFrame()
-    finally:
-        if os.path.exists(local_path):
-            os.remove(local_path)
-            print(f"Deleted local file: {local_path}")
-        if os.path.isdir(subdir) and not os.listdir(subdir):
-            os.rmdir(subdir)
-            print(f"Deleted empty folder: {subdir}")
+
+def _download_state_file(object_name: str) -> str:
+    """Local copy of a scraper state file (empty path if it is not in GCS yet)."""
+    local_path = os.path.join(tempfile.mkdtemp(prefix="car_resale_state_"), os.path.basename(object_name))
+    store = _object_store()
+    if store.exists(object_name):
+        with open(local_path, "wb") as f:
+            store.download_to_file(object_name, f)
+        print(f"Loaded state gs://{GCS_BUCKET_NAME}/{object_name}")
+    return local_path
+
+def _upload_state_file(local_path: str, object_name: str):
+    with open(local_path, "rb") as f:
+        _object_store().upload_from_file(object_name, f, content_type="application/octet-stream")
+    print(f"Saved state → gs://{GCS_BUCKET_NAME}/{object_name}")
+
+def _describe_gcs_dataset(name: str, subdir: str = DATA_DIR):
+    """Size and row count of a dataset from its object metadata (no body download)."""
+    store = _object_store()
+    for gcs_path in (f"{subdir}/{name}.parquet", f"{subdir}/{name}.csv"):
+        info = store.stat(gcs_path)
+        if info is not None:
+            return gcs_path, info["size"], info["metadata"].get("row_count")
+    return None, 0, None
+
+def _clean_incremental(name: str, etl_fn, *etl_args, **kwargs) -> pd.DataFrame:
+    """Run etl_fn on new/changed raw rows only and merge into the previous <name>_clean."""
+    raw_df = _download_from_gcs(name, subdir="datasets")
+    prev_clean = _download_from_gcs(f"{name}_clean", subdir="cleaned_datasets")
+    prev_hashes = _download_from_gcs(f"{name}_clean_hashes", subdir="cleaned_datasets")
+    cleaned_df, hashes = incremental_etl(raw_df, prev_clean, prev_hashes, etl_fn, *etl_args, **kwargs)
+    _upload_to_gcs(cleaned_df, f"{name}_clean", subdir="cleaned_datasets")
+    # sidecar goes last: if the upload above fails, the next run simply redoes the same rows
+    _upload_to_gcs(hashes, f"{name}_clean_hashes", subdir="cleaned_datasets")
+    return cleaned_df
+
+def _reference_lookup():
+    """ReferenceLookup over the dimensions extract_coe / extract_stock publish, or None if one is missing."""
+    dims = [_download_from_gcs(name, subdir=REFERENCE_DIR) for name in ["coe_rounds_dim", "pqp_dim", "stock_dim"]]
+    if any(dim.empty for dim in dims):
+        return None
+    return ReferenceLookup(*dims)
+
+def _bq_load(hook, object_name: str, table: str, write_disposition: str = "WRITE_TRUNCATE"):
+    """Load one Parquet object into a BigQuery table (project.dataset.table) and wait for it."""
+    project_id, dataset_id, table_id = table.split(".")
+    hook.insert_job(configuration={"load": {
+        "sourceUris": [f"gs://{GCS_BUCKET_NAME}/{object_name}"],
+        "destinationTable": {"projectId": project_id, "datasetId": dataset_id, "tableId": table_id},
+        "sourceFormat": "PARQUET",
+        "autodetect": True,
+        "writeDisposition": write_disposition,
+    }}, project_id=PROJECT_ID, location=BQ_LOCATION)
+    print(f"Loaded gs://{GCS_BUCKET_NAME}/{object_name} into {table}")
+
+def _bq_query(hook, sql: str):
+    job = hook.insert_job(configuration={"query": {"query": sql, "useLegacySql": False}},
+                          project_id=PROJECT_ID, location=BQ_LOCATION)
+    print(f"BigQuery: {sql.splitlines()[0]} ... ({job.num_dml_affected_rows} rows affected)")
 
 def _gcs_to_bq_task(task_id: str, source_objects, table_name: str, write_disposition: str = "WRITE_TRUNCATE",
-                    autodetect: bool = True, skip_leading_rows: int = 1):
+                    autodetect: bool = True, source_format: str = "PARQUET"):
+    # Parquet carries its own schema (DATE/BOOL/INT64), so no header rows or quoting options
+    csv_options = {"skip_leading_rows": 1, "allow_quoted_newlines": True} if source_format == "CSV" else {}
     return GCSToBigQueryOperator(
         task_id=task_id,
         bucket=GCS_BUCKET_NAME,
         source_objects=source_objects if isinstance(source_objects, list) else [source_objects],
         destination_project_dataset_table=f"{PROJECT_ID}.{BQ_DATASET}.{table_name}",
-        source_format="CSV",
+        source_format=source_format,
         autodetect=autodetect,
         write_disposition=write_disposition,
-        skip_leading_rows=skip_leading_rows,
-        allow_quoted_newlines=True,
         gcp_conn_id=GCP_CONN_ID,
-        location=BQ_LOCATION
+        location=BQ_LOCATION,
+        **csv_options
     )
 
 @dag(
@@ -119,6 +197,9 @@ def my_dag():
         coe_df, pqp_df = get_coe_dataset()
         _upload_to_gcs(coe_df, "coe")
         _upload_to_gcs(pqp_df, "pqp")
+        # Pre-keyed lookups for merge_all_data, built from the same typed values it used to read back
+        _upload_to_gcs(coe_rounds_dimension(apply_schema(coe_df, "coe")), "coe_rounds_dim", subdir=REFERENCE_DIR)
+        _upload_to_gcs(pqp_dimension(apply_schema(pqp_df, "pqp")), "pqp_dim", subdir=REFERENCE_DIR)
     
     @task
     def extract_car_population():
@@ -129,6 +210,7 @@ def my_dag():
     def extract_stock():
         df = get_stock_data()
         _upload_to_gcs(df, "stock")
+        _upload_to_gcs(stock_dimension(apply_schema(df, "stock")), "stock_dim", subdir=REFERENCE_DIR)
 
     @task
     def extract_motorist():
@@ -138,12 +220,16 @@ def my_dag():
             if df.empty:
                 raise AirflowSkipException("Motorist: no data collected (full scrape).")
             print(f"Motorist full scrape: {len(df)} rows.")
+            _upload_to_gcs(df, "motorist")
         else:
-            df = get_updated_motorist_data(prev_df)
+            # listing index kept next to the dataset so known-ID checks don't rescan prev_df
+            state_path = _download_state_file(MOTORIST_STATE_OBJECT)
+            df = get_updated_motorist_data(prev_df, state_path=state_path)
             if df.empty:
                 raise AirflowSkipException("Motorist: no data collected (incremental).")
             print(f"Motorist incremental: now {len(df)} rows total after merge.")
-        _upload_to_gcs(df, "motorist")
+            _upload_to_gcs(df, "motorist")
+            _upload_state_file(state_path, MOTORIST_STATE_OBJECT)
 
     @task
     def extract_sgcarmart():
@@ -165,29 +251,34 @@ def my_dag():
     def extract_initial_data_from_gcs():
         filenames = ["motorist", "sgcarmart", "carro", "coe", "pqp", "carpopulation", "stock"]
         for name in filenames:
-            df = _download_from_gcs(name)
-            print(f"{name} data shape: {df.shape}")
+            gcs_path, size, row_count = _describe_gcs_dataset(name)
+            if gcs_path is None:
+                print(f"{name}: no object found in gs://{GCS_BUCKET_NAME}/{DATA_DIR}")
+                continue
+            print(f"{name}: {gcs_path}, {size} bytes, rows: {row_count if row_count is not None else 'unknown'}")
         return "Extract from GCS completed."
     
     @task
     def clean_sgcarmart():
-        prev_df = _download_from_gcs("sgcarmart", subdir="datasets")
-        cleaned_df = ETL_sgcarmart(prev_df)
-        _upload_to_gcs(cleaned_df, "sgcarmart_clean", subdir="cleaned_datasets")
-        brands_list = cleaned_df['Brand'].dropna().unique().tolist()
+        cleaned_df = _clean_incremental("sgcarmart", ETL_sgcarmart, DateFormatCache.cached(ARTIFACT_CACHE_DIR, "sgcarmart"),
+                                        save_fn=save_sgcarmart_csv)
+        # sorted: the incremental ETL appends re-cleaned rows, so first-appearance order changes
+        # daily, and BrandIndex.fingerprint (the ETL version) must depend only on the set of brands
+        brands_list = sorted(cleaned_df['Brand'].dropna().unique().tolist())
         return brands_list
 
     @task
     def clean_motorist(brands_list):
-        prev_df = _download_from_gcs("motorist", subdir="datasets")
-        cleaned_df = ETL_motorist(prev_df, brands_list)
-        _upload_to_gcs(cleaned_df, "motorist_clean", subdir="cleaned_datasets")
+        _clean_incremental("motorist", ETL_motorist, BrandIndex.cached(brands_list, ARTIFACT_CACHE_DIR),
+                           DateFormatCache.cached(ARTIFACT_CACHE_DIR, "motorist"),
+                           version_extra=BrandIndex.fingerprint(brands_list), coe_left_from_expiry=True,
+                           save_fn=save_motorist_csv)
     
     @task
     def clean_carro(brands_list):
-        prev_df = _download_from_gcs("carro", subdir="datasets")
-        cleaned_df = ETL_carro(prev_df, brands_list)
-        _upload_to_gcs(cleaned_df, "carro_clean", subdir="cleaned_datasets")
+        _clean_incremental("carro", ETL_carro, BrandIndex.cached(brands_list, ARTIFACT_CACHE_DIR),
+                           DateFormatCache.cached(ARTIFACT_CACHE_DIR, "carro"),
+                           version_extra=BrandIndex.fingerprint(brands_list), save_fn=save_carro_csv)
     
     @task
     def coe_forecast():
@@ -206,11 +297,22 @@ def my_dag():
     @task
     def merge_all_data():
         car_df = _download_from_gcs("combined_car_data", subdir="combined_datasets")
-        coe_df = _download_from_gcs("coe", subdir="datasets")
-        pqp_df = _download_from_gcs("pqp", subdir="datasets")
-        stock_df = _download_from_gcs("stock", subdir="datasets")
-        combined_all_df = merge_all_datasets(car_df, coe_df, pqp_df, stock_df)
+        date_formats = DateFormatCache.cached(ARTIFACT_CACHE_DIR, "merge_all")
+        reference = _reference_lookup()
+        if reference is None:
+            # dimensions not published yet: key the raw datasets here instead
+            reference = ReferenceLookup.from_raw(_download_from_gcs("coe", subdir="datasets"),
+                                                 _download_from_gcs("pqp", subdir="datasets"),
+                                                 _download_from_gcs("stock", subdir="datasets"), date_formats)
+        prev_final = _download_from_gcs("final_dashboard_data", subdir="final_datasets")
+        prev_inputs = _download_from_gcs("final_dashboard_inputs", subdir="final_datasets")
+        combined_all_df, inputs = incremental_merge_all(
+            car_df, prev_final, prev_inputs,
+            lambda cars: merge_all_datasets(cars, None, None, None, date_formats, reference),
+            merge_version(merge_all_datasets, reference))
         _upload_to_gcs(combined_all_df, "final_dashboard_data", subdir="final_datasets")
+        # sidecar goes last: if the upload above fails, the next run simply redoes the same rows
+        _upload_to_gcs(inputs, "final_dashboard_inputs", subdir="final_datasets")
 
     @task
     def run_sold_checker():
@@ -224,6 +326,27 @@ def my_dag():
         _upload_to_gcs(updated_motorist_df, "motorist", subdir="datasets")
         _upload_to_gcs(updated_carro_df, "carro", subdir="datasets")
 
+    @task
+    def bq_sync_final_dashboard_data():
+        """Replace only the changed URLs in the dashboard table (full load when there is no previous state)."""
+        final_df = _download_from_gcs("final_dashboard_data", subdir="final_datasets")
+        prev_published = _download_from_gcs("final_dashboard_published", subdir="final_datasets")
+        upserts, keys, published = dashboard_delta(final_df, prev_published)
+        table = f"{PROJECT_ID}.{BQ_DATASET}.final_dashboard_data"
+        hook = BigQueryHook(gcp_conn_id=GCP_CONN_ID, location=BQ_LOCATION, use_legacy_sql=False)
+        if keys is None:
+            _bq_load(hook, "final_datasets/final_dashboard_data.parquet", table)
+        else:
+            if not keys.empty:
+                _upload_to_gcs(upserts, "final_dashboard_delta", subdir=TEMP_DIR)
+                _upload_to_gcs(keys, "final_dashboard_delta_keys", subdir=TEMP_DIR)
+                _bq_load(hook, f"{TEMP_DIR}/final_dashboard_delta.parquet", f"{table}_delta")
+                _bq_load(hook, f"{TEMP_DIR}/final_dashboard_delta_keys.parquet", f"{table}_delta_keys")
+                _bq_query(hook, dashboard_merge_sql(table, f"{table}_delta", f"{table}_delta_keys", final_df.columns))
+            _bq_query(hook, refresh_time_columns_sql(table, pd.Timestamp.today()))
+        # only once BigQuery holds these rows
+        _upload_to_gcs(published, "final_dashboard_published", subdir="final_datasets")
+
     @task
     def all_data_with_blanks_filled():
         df_with_blanks = _download_from_gcs("final_dashboard_data", subdir="final_datasets")
@@ -262,13 +385,11 @@ def my_dag():
     run_sold_checker_task = run_sold_checker()
 
     # Upload dashboard dataset to BigQuery
-    bq_dashboard_data_upload_task = _gcs_to_bq_task(task_id="bq_upload_final_dashboard_data",
-                                                    source_objects="final_datasets/final_dashboard_data.csv",
-                                                    table_name="final_dashboard_data")
+    bq_dashboard_data_upload_task = bq_sync_final_dashboard_data()
     
     # Upload Final COE dataset to BigQuery
     bq_coe_data_upload_task = _gcs_to_bq_task(task_id="bq_upload_final_coe_data",
-                                                    source_objects="final_datasets/final_coe_data.csv",
+                                                    source_objects="final_datasets/final_coe_data.parquet",
                                                     table_name="final_coe_data")
 
     # Fill up blank cells with assumptions
@@ -276,7 +397,7 @@ def my_dag():
 
     # Upload ML dataset to BigQuery
     bq_final_ml_upload_task = _gcs_to_bq_task(task_id="bq_upload_final_ml_data",
-                                              source_objects="final_datasets/final_ml_data.csv",
+                                              source_objects="final_datasets/final_ml_data.parquet",
                                               table_name="final_ml_data")
 
     start_DAG_task >> [run_coe_task, run_car_population_task, run_stock_task,
@@ -0,0 +1,71 @@
+import os
+import re
+import time
+import shutil
+import hashlib
+import uuid
+import pandas as pd
+from modules.storage import read_parquet
+
+# =========================
+# RUN-SCOPED ARTIFACT CACHE
+# =========================
+class ArtifactCache:
+    """
+    Local, run-scoped cache of dataset objects pulled from the bucket.
+    Entries are keyed by (object name, generation), so a task on the same worker
+    reuses a file another task already fetched in this DAG run, while a re-upload
+    (new generation) is always fetched fresh.
+    """
+
+    def __init__(self, root: str, run_id: str, max_age_hours: float = 36):
+        self.root = root
+        self.run_dir = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]", "_", run_id))
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.prune(max_age_hours)
+
+    @staticmethod
+    def key(object_name: str, generation) -> str:
+        return hashlib.sha1(f"{object_name}#{generation}".encode("utf-8")).hexdigest()
+
+    def prune(self, max_age_hours: float):
+        """Remove cache folders of earlier DAG runs that are older than max_age_hours."""
+        cutoff = time.time() - max_age_hours * 3600
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if path == self.run_dir or not os.path.isdir(path):
+                continue
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                print(f"[cache] Pruned old run cache: {path}")
+
+    def fetch(self, store, object_name: str) -> str:
+        """
+        Returns a local path holding the current generation of object_name,
+        downloading it only if this run has not fetched that generation yet.
+        """
+        info = store.stat(object_name)
+        if info is None:
+            raise FileNotFoundError(object_name)
+        ext = os.path.splitext(object_name)[1]
+        path = os.path.join(self.run_dir, self.key(object_name, info["generation"]) + ext)
+        if os.path.exists(path):
+            print(f"[cache] Hit {object_name} (generation {info['generation']})")
+            return path
+        # download to a private temp name, then rename, so concurrent tasks never read half a file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                store.download_to_file(object_name, f, generation=info["generation"])
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        print(f"[cache] Fetched {object_name} ({info['size']} bytes, generation {info['generation']})")
+        return path
+
+    def load_df(self, store, object_name: str, columns=None) -> pd.DataFrame:
+        path = self.fetch(store, object_name)
+        if path.endswith(".csv"):
+            return pd.read_csv(path, usecols=columns or None)
+        return read_parquet(path, columns=columns)
@@ -0,0 +1,160 @@
+import os
+import json
+import warnings
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# =========================
+# DATE PARSING
+# =========================
+# Scraped date columns hold a few thousand distinct strings across hundreds of
+# thousands of rows, usually in one or two layouts per source. parse_dates()
+# parses each distinct string once and maps the result back to the rows.
+#
+# Distinct strings are grouped by their shape (digits -> 9, letters -> a, e.g.
+# "17-Oct-2025" -> "99-aaa-9999"). The format picked for a shape is the first
+# entry of `formats` that parses it; INFER / INFER_DAYFIRST at the end of the
+# list guess the format from one value of that shape. A guess is only kept when
+# it parses every value of the shape and cannot swap day and month (numeric
+# day/month in either order, e.g. "01/02/2025"); otherwise the shape is parsed
+# value by value. Decisions are recorded per source column in a DateFormatCache,
+# so later runs skip the detection. Strings the chosen format cannot parse still
+# go through the whole list, so as long as no two formats accept the same string
+# the result is the same as trying every format in order on every row.
+
+INFER = "infer"
+INFER_DAYFIRST = "infer_dayfirst"
+_MIXED = "mixed"            # no single format guessed: per-value parsing
+_UNPARSEABLE = ""           # nothing in `formats` parsed this shape
+# resolution pandas gives parsed strings (ns before pandas 3, us after)
+_PARSED_DTYPE = pd.to_datetime(pd.Series(["2000-01-01"]), format="%Y-%m-%d").dtype
+
+# non-breaking space -> space, unicode dashes -> '-'
+_DATE_TEXT_TABLE = str.maketrans({"\u00A0": " ", **{chr(c): "-" for c in (*range(0x2010, 0x2016), 0x2212)}})
+
+def clean_date_text(text: pd.Series) -> pd.Series:
+    """Standardise spaces and dashes, 'Sept' -> 'Sep'."""
+    text = text.astype(object).map(lambda v: v.translate(_DATE_TEXT_TABLE) if isinstance(v, str) else v)
+    return text.astype(str).str.replace(r'\bSept\b', 'Sep', regex=True).str.strip()
+
+def date_shapes(text: pd.Series) -> pd.Series:
+    return text.str.replace(r'\d', '9', regex=True).str.replace(r'[^\W\d_]', 'a', regex=True)
+
+class DateFormatCache:
+    """
+    {column key: {shape: format}} decisions of parse_dates, kept as JSON between runs.
+    Only speeds up detection: a shape parses to the same values whether its
+    format comes from the cache or is detected again (given `formats` in which
+    no two entries accept the same string).
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.columns = {}
+        self.dirty = False
+
+    @classmethod
+    def cached(cls, cache_dir: str, name: str) -> "DateFormatCache":
+        """Cache for one source, stored in cache_dir/date_formats_<name>.json."""
+        cache = cls(os.path.join(cache_dir, f"date_formats_{name}.json"))
+        try:
+            with open(cache.path, encoding="utf-8") as f:
+                cache.columns = json.load(f)
+        except (OSError, ValueError):
+            pass
+        return cache
+
+    def formats(self, key: str) -> dict:
+        return self.columns.get(key, {})
+
+    def learn(self, key: str, decisions: dict):
+        if decisions:
+            self.columns.setdefault(key, {}).update(decisions)
+            self.dirty = True
+
+    def save(self):
+        if not (self.path and self.dirty):
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.columns, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+def _to_datetime(values: pd.Series, fmt: str) -> pd.Series:
+    if fmt == _UNPARSEABLE:
+        return pd.Series(pd.NaT, index=values.index, dtype=_PARSED_DTYPE)
+    if fmt in (INFER, INFER_DAYFIRST, _MIXED):
+        return pd.to_datetime(values, format="mixed", dayfirst=(fmt == INFER_DAYFIRST), errors="coerce")
+    return pd.to_datetime(values, format=fmt, errors="coerce")
+
+def _day_month_ambiguous(fmt: str) -> bool:
+    """Numeric day and month other than year-month-day: '01/02/2025' fits both orders."""
+    if "%d" not in fmt or "%m" not in fmt:
+        return False
+    return not (fmt.startswith("%Y") and fmt.index("%m") < fmt.index("%d"))
+
+def _guess(values: pd.Series, infer: str) -> str:
+    """Format guessed from the first value if it parses all of values unambiguously, else infer (per value)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        guessed = guess_datetime_format(values.iloc[0], dayfirst=(infer == INFER_DAYFIRST))
+    if not guessed or _day_month_ambiguous(guessed) or _to_datetime(values, guessed).isna().any():
+        return infer
+    return guessed
+
+def _detect(values: pd.Series, formats):
+    """(format, parsed values) for the first entry of formats that parses any of values."""
+    for fmt in formats:
+        if fmt in (INFER, INFER_DAYFIRST):
+            fmt = _guess(values, fmt)
+        parsed = _to_datetime(values, fmt)
+        if parsed.notna().any():
+            return fmt, parsed
+    return _UNPARSEABLE, _to_datetime(values, _UNPARSEABLE)
+
+def _parse_each_format(values: pd.Series, formats) -> pd.Series:
+    """Every format in order, each on the values still unparsed."""
+    out = pd.Series(pd.NaT, index=values.index, dtype=_PARSED_DTYPE)
+    for fmt in formats:
+        rest = out.isna()
+        if not rest.any():
+            break
+        out[rest] = _to_datetime(values[rest], fmt)
+    return out
+
+def parse_dates(series: pd.Series, formats=(INFER,), column: str = None, cache: DateFormatCache = None) -> pd.Series:
+    """
+    Datetimes for a column of date strings (NaT where nothing parses). `column`
+    names the source column in the cache, e.g. "sgcarmart.Posted_Date".
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    formats = list(formats)
+    codes, uniques = pd.factorize(series)
+    text = clean_date_text(pd.Series(uniques, dtype=object))
+
+    key = f"{column}|{'|'.join(formats)}"
+    known = cache.formats(key) if cache is not None else {}
+    # guesses cached before ambiguous day/month formats were refused
+    known = {shape: fmt for shape, fmt in known.items()
+             if fmt in formats or not _day_month_ambiguous(fmt)}
+    learned = {}
+    parsed = pd.Series(pd.NaT, index=text.index, dtype=_PARSED_DTYPE)
+    shapes = date_shapes(text)
+    for shape, pos in text.groupby(shapes.to_numpy()).indices.items():
+        values = text.iloc[pos]
+        if shape in known:
+            got = _to_datetime(values, known[shape])
+        else:
+            learned[shape], got = _detect(values, formats)
+        rest = got.isna()
+        if rest.any():
+            got[rest] = _parse_each_format(values[rest], formats)
+        parsed.iloc[pos] = got.to_numpy()
+
+    if cache is not None:
+        cache.learn(key, learned)
+        cache.save()
+    return pd.Series(parsed.array.take(codes, allow_fill=True), index=series.index)
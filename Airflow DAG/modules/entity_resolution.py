@@ -0,0 +1,169 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from modules.etl_core import per_unique
+
+# =========================
+# ENTITY RESOLUTION
+# =========================
+# The same car is often listed on more than one site. Listings are grouped into
+# blocks that share Brand, registration month and Engine_Capacity_cc; only
+# listings inside a block are compared, so the work grows with the number of
+# listings rather than with every pair of them. Two listings from different
+# websites are the same vehicle when their Make names agree and mileage, price
+# and COE agree within the tolerances below. Matches are joined transitively
+# (union-find) and every listing gets the Vehicle_ID of its group.
+#
+# Inside a block listings are sorted by price and each is compared with its next
+# BLOCK_WINDOW neighbours: every pair for blocks up to BLOCK_WINDOW + 1 listings,
+# a sorted neighbourhood for the rare bigger ones, so the cost stays linear.
+
+BLOCK_WINDOW = 50
+MILEAGE_TOLERANCE = (1000, 0.05)   # km, or share of the larger mileage, whichever is larger
+PRICE_TOLERANCE = 0.05             # share of the larger price
+COE_TOLERANCE = 0.01               # share of the larger COE
+MIN_COMPARED = 2                   # of mileage / price / COE known on both sides
+MIN_MAKE_OVERLAP = 0.5             # shared Make words / words of the shorter Make
+
+def _make_tokens(makes: pd.Series) -> pd.Series:
+    """Lower-case words of Make ('Corolla Altis 1.6A' -> {'corolla', 'altis', '16a'})."""
+    def tokens(values):
+        words = values.astype(str).str.lower().str.replace(r'[^\w\s]', '', regex=True).str.split()
+        return words.map(lambda w: (w[0], frozenset(w)) if w else None)
+    return per_unique(makes, tokens, missing=None)
+
+def _makes_agree(a, b) -> bool:
+    if a is None or b is None:
+        return False
+    (first_a, words_a), (first_b, words_b) = a, b
+    return first_a == first_b and len(words_a & words_b) >= MIN_MAKE_OVERLAP * min(len(words_a), len(words_b))
+
+def _close(a: np.ndarray, b: np.ndarray, share: float, floor: float = 0):
+    """(known on both sides, within tolerance) per pair."""
+    known = ~(np.isnan(a) | np.isnan(b))
+    limit = np.maximum(floor, share * np.fmax(np.abs(a), np.abs(b)))
+    return known, ~known | (np.abs(a - b) <= limit)
+
+def block_codes(df: pd.DataFrame) -> np.ndarray:
+    """Block number per listing; -1 where a blocking field is missing."""
+    keys = pd.DataFrame({
+        "Brand": df["Brand"].astype("string").str.strip().str.upper(),
+        "Month": pd.to_datetime(df["Registration_Date"], errors="coerce").dt.to_period("M"),
+        "Engine": pd.to_numeric(df["Engine_Capacity_cc"], errors="coerce"),
+    })
+    codes = keys.groupby(list(keys.columns), sort=False, dropna=True).ngroup()
+    return codes.fillna(-1).to_numpy(dtype=np.int64)
+
+def candidate_pairs(blocks: np.ndarray, price: np.ndarray):
+    """(left, right) positions of the listings compared: same block, within BLOCK_WINDOW by price."""
+    order = np.lexsort((price, blocks))
+    sorted_blocks = blocks[order]
+    left, right = [], []
+    for k in range(1, BLOCK_WINDOW + 1):
+        same = (sorted_blocks[:-k] == sorted_blocks[k:]) & (sorted_blocks[:-k] >= 0)
+        if not same.any():
+            break
+        pos = np.flatnonzero(same)
+        left.append(order[pos])
+        right.append(order[pos + k])
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+def union_find(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Group label (smallest member position) per position 0..n-1, joining every (left, right) pair."""
+    parent = np.arange(n)
+    while True:
+        roots_l, roots_r = parent[left], parent[right]
+        split = roots_l != roots_r
+        if not split.any():
+            return parent
+        # hook the larger root under the smaller, then compress paths fully
+        np.minimum.at(parent, np.maximum(roots_l, roots_r)[split], np.minimum(roots_l, roots_r)[split])
+        while True:
+            grand = parent[parent]
+            if (grand == parent).all():
+                break
+            parent = grand
+
+def block_report(blocks: np.ndarray) -> dict:
+    sizes = np.bincount(blocks[blocks >= 0]) if (blocks >= 0).any() else np.zeros(0, dtype=np.int64)
+    sizes = sizes[sizes > 0]
+    return {
+        "listings": len(blocks),
+        "unblocked": int((blocks < 0).sum()),
+        "blocks": len(sizes),
+        "singleton_blocks": int((sizes == 1).sum()),
+        "block_size_mean": round(float(sizes.mean()), 2) if len(sizes) else 0.0,
+        "block_size_p95": int(np.percentile(sizes, 95)) if len(sizes) else 0,
+        "block_size_max": int(sizes.max()) if len(sizes) else 0,
+        "windowed_blocks": int((sizes > BLOCK_WINDOW + 1).sum()),
+    }
+
+def resolve_vehicles(df: pd.DataFrame):
+    """
+    Vehicle_ID per listing (index of df) and a report with the block-size statistics,
+    pairs compared / matched and the number of distinct vehicles.
+    """
+    n = len(df)
+    blocks = block_codes(df)
+    numbers = {col: pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+               for col in ["Mileage_km", "Price", "COE"]}
+    left, right = candidate_pairs(blocks, np.nan_to_num(numbers["Price"], nan=-1.0))
+
+    website = df["Website"].astype("string").str.strip().str.lower().to_numpy(dtype=object)
+    cross_site = website[left] != website[right]
+    left, right = left[cross_site], right[cross_site]
+
+    compared = np.zeros(len(left), dtype=np.int64)
+    agree = np.ones(len(left), dtype=bool)
+    for col, (share, floor) in {"Mileage_km": (MILEAGE_TOLERANCE[1], MILEAGE_TOLERANCE[0]),
+                                "Price": (PRICE_TOLERANCE, 0), "COE": (COE_TOLERANCE, 0)}.items():
+        known, ok = _close(numbers[col][left], numbers[col][right], share, floor)
+        compared += known
+        agree &= ok
+    agree &= compared >= MIN_COMPARED
+    makes = _make_tokens(df["Make"]).to_numpy(dtype=object)
+    agree[agree] = [_makes_agree(makes[a], makes[b]) for a, b in zip(left[agree], right[agree])]
+    left, right = left[agree], right[agree]
+
+    groups = union_find(n, left, right)
+    # ID of a group: hash of its smallest website + URL, so it holds while that listing stays up
+    listing = pd.Series(website, dtype=object) + " " + df["URL"].astype(str).to_numpy(dtype=object)
+    url_codes, urls = pd.factorize(listing.to_numpy(dtype=object), sort=True)
+    anchor = np.full(n, n, dtype=np.int64)
+    np.minimum.at(anchor, groups, url_codes)
+    group_ids = np.array([hashlib.sha1(u.encode("utf-8")).hexdigest()[:16] for u in urls], dtype=object)
+    ids = pd.Series(group_ids[anchor[groups]], index=df.index)
+
+    report = block_report(blocks)
+    report.update({
+        "pairs_compared": int(cross_site.sum()),
+        "pairs_matched": len(left),
+        "vehicles": int(ids.nunique()),
+        "duplicate_listings": n - int(ids.nunique()),
+    })
+    return ids, report
+
+def deduplicate_listings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per vehicle, with its Vehicle_ID. The listing kept is the most complete
+    one (then the latest posted, then the smallest URL); Sold is set if any listing
+    of the vehicle is sold.
+    """
+    if df.empty:
+        return df.assign(Vehicle_ID=pd.Series(dtype=object))
+    ids, report = resolve_vehicles(df)
+    print("[entity_resolution] " + ", ".join(f"{k}={v}" for k, v in report.items()))
+
+    df = df.assign(Vehicle_ID=ids)
+    ranked = df.assign(_filled=df.notna().sum(axis=1),
+                       _posted=pd.to_datetime(df["Posted_Date"], errors="coerce"),
+                       _url=df["URL"].astype(str))
+    ranked = ranked.sort_values(["_filled", "_posted", "_url"], ascending=[False, False, True],
+                                na_position="last", kind="mergesort")
+    keep = ~ranked["Vehicle_ID"].duplicated()
+    sold = df["Sold"].astype("boolean").fillna(False).groupby(df["Vehicle_ID"]).any()
+    out = df.loc[ranked.index[keep.to_numpy()].sort_values()].copy()
+    out["Sold"] = out["Sold"].mask(out["Vehicle_ID"].map(sold).to_numpy(dtype=bool), True)
+    return out
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Column-wise versions of the steps ETL_sgcarmart / ETL_carro / ETL_motorist used to
+# run row by row with df.apply(..., axis=1). Each returns the same values as the
+# original lambda it replaces (see modules/etl_core_check.py); brand matching is
+# longest-prefix rather than the old loop's last-match-wins.
+
+def per_unique(series: pd.Series, fn, missing=np.nan) -> pd.Series:
+    """
+    fn applied to the distinct values of series only, then broadcast back. Scraped
+    columns repeat a small set of strings, so this skips most of the string work.
+    Missing values map to `missing`.
+    """
+    codes, uniques = pd.factorize(series)
+    out = fn(pd.Series(uniques, dtype=series.dtype if len(uniques) else object)).reset_index(drop=True)
+    if (codes < 0).any():
+        # code -1 (missing) picks the appended last element
+        out = pd.concat([out, pd.Series([missing])], ignore_index=True)
+    return pd.Series(out.to_numpy()[codes], index=series.index).infer_objects()
+
+# =========================
+# NUMERIC FIELDS
+# =========================
+def clean_numeric(series, regex=r'([\d,\.]+)'):
+    """First number matched by regex, thousands separators removed."""
+    return pd.to_numeric(
+        series.astype(str)
+              .str.extract(regex)[0]
+              .str.replace(',', '', regex=False),
+        errors='coerce'
+    )
+
+def fix_engine_capacity(series: pd.Series) -> pd.Series:
+    """Missing -> 0; litres typed with a decimal point (0.5 <= x < 10) -> cc; truncated to int."""
+    x = series.fillna(0).astype(float)
+    return pd.Series(np.where((x >= 0.5) & (x < 10), x * 1000, x).astype(np.int64), index=series.index)
+
+def owners_sgcarmart(series: pd.Series) -> pd.Series:
+    """'More than 6' -> 7, otherwise the leading number of the text."""
+    def parse(values):
+        text = values.astype(str).str.strip()
+        first = text.str.split().str[0].astype(object).mask(text.str.lower() == "more than 6", 7)
+        return pd.to_numeric(first, errors='coerce')
+    return per_unique(series, parse)
+
+def owners_motorist(series: pd.Series) -> pd.Series:
+    """'More than 5' -> 6, otherwise the value as a number."""
+    def parse(values):
+        return pd.to_numeric(values.mask(values.eq("More than 5"), 6), errors='coerce')
+    return per_unique(series.astype(object), parse)
+
+# =========================
+# COE
+# =========================
+SGCARMART_COE_LEFT_RE = r'^(?:(\d+)\s*y)?\s*(?:(\d+)\s*m)?\s*(?:(\d+)\s*d)?'
+CARRO_COE_LEFT_RE = r'^(?:(\d+)\s*yrs?)?\s*(?:(\d+)\s*mths?)?\s*(?:(\d+)\s*days?)?'
+
+def coe_left_to_days(series: pd.Series, pattern: str, lower: bool = False) -> pd.Series:
+    """
+    '9y 2m 3d' style text -> days (years count 365, months 30). Missing parts count
+    as 0; missing text gives NA.
+    """
+    def parse(values):
+        text = values.astype(str)
+        if lower:
+            text = text.str.lower()
+        parts = text.str.extract(pattern).fillna('0').astype(np.int64)
+        return parts[0] * 365 + parts[1] * 30 + parts[2]
+    days = per_unique(series, parse, missing=pd.NA)
+    return days.astype('Int64') if series.isna().any() else days
+
+def coe_renewed(cycles: pd.Series) -> pd.Series:
+    """'Y' once a car is past its first COE cycle."""
+    return pd.Series(np.where(cycles.fillna(0) > 1, 'Y', 'N'), index=cycles.index, dtype=object)
+
+# =========================
+# COE CATEGORY
+# =========================
+def coe_category(df):
+    """COE_Category (A/B) from registration date, fuel type, engine cc and power."""
+    # Helpers
+    cut_2014 = pd.Timestamp("2014-02-01")
+    cut_2022 = pd.Timestamp("2022-05-01")
+
+    reg = pd.to_datetime(df["Registration_Date"], errors="coerce")
+    is_ev = df["Fuel_Type"].astype(str).str.strip().eq("Electric")
+    cc = pd.to_numeric(df["Engine_Capacity_cc"], errors="coerce")
+    kw = pd.to_numeric(df["Horse_Power_kW"], errors="coerce")
+
+    conditions = [
+        # Pre-2014-02-01: cc rule only (no power cap), any fuel
+        (reg < cut_2014) & (cc <= 1600),
+        (reg < cut_2014) & (cc > 1600),
+        # 2014-02-01 to 2022-04-30: EV 97 kW cap
+        (reg >= cut_2014) & (reg < cut_2022) & is_ev & (kw <= 97),
+        (reg >= cut_2014) & (reg < cut_2022) & is_ev & (kw > 97),
+        # 2014-02-01 to 2022-04-30: Non-EV needs cc≤1600 AND kW≤97
+        (reg >= cut_2014) & (reg < cut_2022) & (~is_ev) & (cc <= 1600) & (kw <= 97),
+        (reg >= cut_2014) & (reg < cut_2022) & (~is_ev) & (~((cc <= 1600) & (kw <= 97))),
+        # 2022-05-01 and later: EV 110 kW cap
+        (reg >= cut_2022) & is_ev & (kw <= 110),
+        (reg >= cut_2022) & is_ev & (kw > 110),
+        # 2022-05-01 and later: Non-EV unchanged (cc≤1600 AND kW≤97)
+        (reg >= cut_2022) & (~is_ev) & (cc <= 1600) & (kw <= 97),
+        (reg >= cut_2022) & (~is_ev) & (~((cc <= 1600) & (kw <= 97))),
+    ]
+    categories = ['A','B','A','B','A','B','A','B','A','B']
+
+    df['COE_Category'] = np.select(conditions, categories, default='A')
+    return df
+
+# =========================
+# TIME-RELATIVE COLUMNS
+# =========================
+# These depend on today's date, so they are (re)computed on every run, including
+# for rows the incremental ETL carries over unchanged (modules/incremental_etl.py).
+def add_age_columns(df: pd.DataFrame, today=None) -> pd.DataFrame:
+    """Vehicle_Age_Years, Vehicle_Age_Days, COE_Cycles and COE_Renewed from Registration_Date."""
+    today = pd.Timestamp.today().normalize() if today is None else today  # strip away hours/minutes
+    age_days = (today - pd.to_datetime(df['Registration_Date'])).dt.days
+    age_years_exact = age_days / 365.25
+    df['Vehicle_Age_Years'] = age_years_exact.round().astype('Int64')
+    df['Vehicle_Age_Days'] = age_days  # days too, to tell apart cars less than 1 year old
+    cycles = np.floor(age_years_exact / 10).astype("Int64") + 1  # one COE cycle per 10 years
+    df['COE_Cycles'] = cycles.where(age_years_exact.notna(), pd.NA).astype('Int64')
+    df['COE_Renewed'] = coe_renewed(df['COE_Cycles'])
+    return df
+
+def add_coe_left_from_expiry(df: pd.DataFrame, today=None) -> pd.DataFrame:
+    """COE_Left_Days counted down to COE_Expiry_Date (Motorist lists the expiry date, not the time left)."""
+    today = pd.Timestamp.today().normalize() if today is None else today
+    df['COE_Left_Days'] = (pd.to_datetime(df['COE_Expiry_Date']) - today).dt.days.astype('Int64')
+    return df
+
+# =========================
+# BRAND / MAKE
+# =========================
+def clean_brand_key(b) -> str:
+    """Upper-case brand with dots, hyphens, NBSPs and whitespace removed."""
+    return re.sub(r'\s+', '', re.sub(r'[\.\-]', '', str(b).upper().replace('\u00A0', ''))).strip()
+
+class BrandIndex:
+    """
+    Precompiled brand lookup. Cleaned brand keys are bucketed by length and names
+    are tried against the longest bucket first, so each distinct name resolves to
+    its longest matching brand ("MERCEDESBENZ" over "MERCEDES") with one dict
+    lookup per key length instead of one startswith scan per brand. Brands whose
+    keys clean to the same string resolve to the one listed last.
+    The index is plain JSON and can be kept between runs with BrandIndex.cached().
+    """
+
+    def __init__(self, brands_list):
+        self.brands = list(brands_list)
+        self.by_length = {}
+        for i, b in enumerate(self.brands):
+            key = clean_brand_key(b)
+            self.by_length.setdefault(len(key), {})[key] = i  # later duplicates win
+
+    @staticmethod
+    def fingerprint(brands_list) -> str:
+        return hashlib.sha1(json.dumps(list(brands_list), ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+    def to_dict(self) -> dict:
+        return {"brands": self.brands, "by_length": {str(n): keys for n, keys in self.by_length.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BrandIndex":
+        index = cls.__new__(cls)
+        index.brands = list(data["brands"])
+        index.by_length = {int(n): keys for n, keys in data["by_length"].items()}
+        return index
+
+    @classmethod
+    def cached(cls, brands_list, cache_dir: str) -> "BrandIndex":
+        """Index for brands_list, loaded from cache_dir when this exact list was indexed before."""
+        brands_list = list(brands_list)
+        path = os.path.join(cache_dir, f"brand_index_{cls.fingerprint(brands_list)}.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                index = cls.from_dict(json.load(f))
+            if index.brands == brands_list:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+        index = cls(brands_list)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        print(f"[brand_index] Indexed {len(brands_list)} brands -> {path}")
+        return index
+
+    def match_index(self, clean_names: pd.Series) -> np.ndarray:
+        """Index into the brand list of the longest matching brand per name (-1 when none match)."""
+        codes, names = pd.factorize(clean_names)
+        names = pd.Series(names, dtype=clean_names.dtype)
+        best = np.full(len(names), -1, dtype=np.int64)
+        for length in sorted(self.by_length, reverse=True):
+            open_rows = np.flatnonzero(best < 0)
+            if not len(open_rows):
+                break
+            prefix_codes, prefixes = pd.factorize(names.iloc[open_rows].str[:length])
+            hits = pd.Series(prefixes, dtype=object).map(self.by_length[length]).fillna(-1).to_numpy(dtype=np.int64)
+            best[open_rows] = np.where(prefix_codes >= 0, hits[prefix_codes], -1)
+        return np.where(codes >= 0, best[codes], -1)
+
+    def match(self, clean_names: pd.Series) -> pd.Series:
+        best = self.match_index(clean_names)
+        brands = np.array(self.brands + [None], dtype=object)
+        return pd.Series(brands[best], index=clean_names.index, dtype=object)  # -1 -> None
+
+def strip_brand_length(names: pd.Series, brands: pd.Series) -> pd.Series:
+    """name[len(brand):].strip() where a brand is known, else the name unchanged."""
+    out = names.astype(object).copy()
+    lengths = brands.str.len()
+    for length in lengths.dropna().unique():
+        rows = lengths == length
+        out[rows] = per_unique(names[rows], lambda v: v.str[int(length):].str.strip()).to_numpy()
+    return out
+
+def strip_brand_regex(models: pd.Series, brands: pd.Series) -> pd.Series:
+    """car_model without a leading brand (case-insensitive); NA if either is missing."""
+    out = np.full(len(models), pd.NA, dtype=object)
+    known = (brands.notna() & models.notna()).to_numpy()
+    sub_models, sub_brands = models[known].astype(str), brands[known].astype(str)
+    stripped = np.empty(len(sub_models), dtype=object)
+    for brand, pos in sub_models.groupby(sub_brands.to_numpy()).indices.items():
+        stripped[pos] = sub_models.iloc[pos].str.replace(rf'^{re.escape(brand)}\s*', '', regex=True, flags=re.I).to_numpy()
+    out[known] = stripped
+    return pd.Series(out, index=models.index, dtype=object)
@@ -0,0 +1,156 @@
+# etl_core_check.py
+# Equivalence check + benchmark for modules/etl_core.py against the row-wise
+# lambdas the three ETL modules used before.
+#
+# Usage: python -m modules.etl_core_check [rows]     (default 1,000,000)
+import re
+import sys
+import time
+import numpy as np
+import pandas as pd
+from modules.etl_core import (
+    SGCARMART_COE_LEFT_RE,
+    CARRO_COE_LEFT_RE,
+    BrandIndex,
+    clean_brand_key,
+    coe_left_to_days,
+    coe_renewed,
+    fix_engine_capacity,
+    owners_motorist,
+    owners_sgcarmart,
+    strip_brand_length,
+    strip_brand_regex,
+)
+
+BRANDS = ["Toyota", "Honda", "Mercedes-Benz", "Mercedes", "BMW", "MINI", "Mazda", "Nissan", "Kia",
+          "Hyundai", "Volkswagen", "Audi", "Lexus", "Land Rover", "Range Rover", "Porsche", "Volvo",
+          "Subaru", "Mitsubishi", "Suzuki", "Peugeot", "BYD", "Tesla", "Alfa Romeo", "M.G.", "MG",
+          "Aston Martin", "Bentley", "Citroen", "Ferrari", "Fiat", "Ford", "Infiniti", "Jaguar", "Jeep",
+          "Lamborghini", "Maserati", "McLaren", "Opel", "Renault", "Rolls-Royce", "Seat", "Skoda", "Ssangyong",
+          "Chevrolet", "Chery", "Daihatsu", "DS", "Genesis", "Haval", "Hummer", "Lotus", "Maxus", "Polestar",
+          "Proton", "Perodua", "Smart", "Great Wall", "Geely", "Ora", "Aion", "Cupra", "Zeekr", "Xpeng"]
+MODELS = ["Corolla Altis 1.6A", "Civic 1.5A VTEC Turbo", "C-Class C180 Avantgarde", "3 Series 318i",
+          "Cooper S 5DR", "3 1.5A Deluxe", "Qashqai 1.2A DIG-T", "Cerato 1.6A", "Golf 1.4A TSI",
+          "A4 Sedan 1.4A TFSI", "Model 3 Long Range", "Atto 3 Electric", "ZS EV", "X-Trail 2.0A (COE till 03/2027)"]
+
+def synthetic_listings(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    brand = rng.choice(np.array(BRANDS + ["Unknown"], dtype=object), n)
+    # a trim/variant suffix so names are not unrealistically repetitive
+    model = rng.choice(np.array(MODELS, dtype=object), n) + " " + rng.integers(0, 300, n).astype(str).astype(object)
+    name = np.where(brand == "Unknown", "Foo " + model, brand + " " + model)
+    cc = rng.choice(np.array([1598, 1.5, 1.998, 2998, 0.8, 12.0, np.nan, 660]), n)
+    owners_sg = rng.choice(np.array(["1", "2 owners", "More than 6", "3", "nan"], dtype=object), n)
+    owners_mo = rng.choice(np.array(["1", "2", "More than 5", "N.A.", 4, None], dtype=object), n)
+    yrs, mths, days = rng.integers(0, 10, n), rng.integers(0, 12, n), rng.integers(0, 31, n)
+    coe_sg = pd.Series(yrs.astype(str)) + "y " + pd.Series(mths.astype(str)) + "m " + pd.Series(days.astype(str)) + "d"
+    coe_carro = pd.Series(yrs.astype(str)) + " yrs " + pd.Series(mths.astype(str)) + " mths " + pd.Series(days.astype(str)) + " days"
+    return pd.DataFrame({
+        "Brand": pd.Series(brand).replace("Unknown", None),
+        "car_model": name,
+        "name": name,
+        "Engine_Capacity_cc": cc,
+        "owners_sg": owners_sg,
+        "owners_mo": owners_mo,
+        "coe_sg": np.where(rng.random(n) < 0.1, "10 yrs 0 mths", coe_sg).astype(object),
+        "coe_carro": coe_carro.astype(object),
+        "COE_Cycles": pd.Series(rng.choice([1, 2, 3, -1], n)).replace(-1, pd.NA).astype("Int64"),
+    })
+
+# =========================
+# ROW-WISE REFERENCES (the code etl_core replaced)
+# =========================
+def legacy_brand(names, brands_list, longest=True):
+    """The per-brand startswith loop; longest=True visits brands shortest key first so longer prefixes win."""
+    pairs = [(clean_brand_key(b), b) for b in brands_list]
+    if longest:
+        pairs = sorted(pairs, key=lambda p: len(p[0]))  # stable: equal keys keep list order
+    name_clean = (names.str.upper().str.replace(r'[\.\-]', '', regex=True)
+                  .str.replace(r'\s+', '', regex=True).str.strip())
+    out = pd.Series(None, index=names.index, dtype=object)
+    for brand_clean, brand_orig in pairs:
+        mask = name_clean.str.startswith(brand_clean, na=False)
+        out.loc[mask] = brand_orig
+    return out, name_clean
+
+def legacy_coe_left_sg(text):
+    if pd.isna(text):
+        return None
+    match = re.match(r'(?:(\d+)\s*y)?\s*(?:(\d+)\s*m)?\s*(?:(\d+)\s*d)?', str(text).lower())
+    yrs, mths, days = match.groups(default='0')
+    return int(yrs) * 365 + int(mths) * 30 + int(days)
+
+def legacy_coe_left_carro(text):
+    if pd.isna(text):
+        return None
+    match = re.match(r'(?:(\d+)\s*yrs?)?\s*(?:(\d+)\s*mths?)?\s*(?:(\d+)\s*days?)?', text)
+    yrs, mths, days = match.groups(default='0')
+    return int(yrs)*365 + int(mths)*30 + int(days)
+
+LEGACY = {
+    "make (sgcarmart)": lambda df: df.apply(
+        lambda row: re.sub(rf'^{re.escape(str(row["Brand"]))}\s*', '', str(row["car_model"]), flags=re.I)
+        if pd.notna(row["Brand"]) and pd.notna(row["car_model"]) else pd.NA, axis=1),
+    "make (carro/motorist)": lambda df: df.assign(Brand=df["Brand"].fillna(df["name"].str.split().str[0].str.upper())).apply(
+        lambda row: row['name'][len(row['Brand']):].strip() if pd.notnull(row['Brand']) else row['name'], axis=1),
+    "engine cc": lambda df: df["Engine_Capacity_cc"].fillna(0).apply(
+        lambda x: int(x * 1000) if pd.notnull(x) and 0.5 <= x < 10 else int(x)),
+    "owners (sgcarmart)": lambda df: df["owners_sg"].apply(
+        lambda x: 7 if str(x).strip().lower() == "more than 6"
+        else pd.to_numeric(str(x).split()[0], errors='coerce')),
+    "owners (motorist)": lambda df: df["owners_mo"].apply(
+        lambda x: 6 if x == "More than 5" else pd.to_numeric(x, errors='coerce')),
+    "coe left (sgcarmart)": lambda df: df["coe_sg"].apply(legacy_coe_left_sg),
+    "coe left (carro)": lambda df: df["coe_carro"].apply(legacy_coe_left_carro),
+    "coe renewed": lambda df: df["COE_Cycles"].apply(lambda x: 'Y' if (pd.notna(x) and x > 1) else 'N'),
+}
+
+VECTORISED = {
+    "make (sgcarmart)": lambda df: strip_brand_regex(df["car_model"], df["Brand"]),
+    "make (carro/motorist)": lambda df: strip_brand_length(
+        df["name"], df["Brand"].fillna(df["name"].str.split().str[0].str.upper())),
+    "engine cc": lambda df: fix_engine_capacity(df["Engine_Capacity_cc"]),
+    "owners (sgcarmart)": lambda df: owners_sgcarmart(df["owners_sg"]),
+    "owners (motorist)": lambda df: owners_motorist(df["owners_mo"]),
+    "coe left (sgcarmart)": lambda df: coe_left_to_days(df["coe_sg"], SGCARMART_COE_LEFT_RE, lower=True),
+    "coe left (carro)": lambda df: coe_left_to_days(df["coe_carro"], CARRO_COE_LEFT_RE),
+    "coe renewed": lambda df: coe_renewed(df["COE_Cycles"]),
+}
+
+def _same(a: pd.Series, b: pd.Series) -> bool:
+    a_na, b_na = a.isna().to_numpy(), b.isna().to_numpy()
+    a, b = a.astype(object).to_numpy(), b.astype(object).to_numpy()
+    return bool((a_na == b_na).all() and (a[~a_na] == b[~b_na]).all())
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+def run(n: int) -> bool:
+    df = synthetic_listings(n)
+    print(f"[etl_core] {n:,} synthetic rows")
+    ok = True
+
+    brands_list = BRANDS
+    (old, name_clean), t_old = _timed(legacy_brand, df["name"], brands_list)
+    new, t_new = _timed(BrandIndex(brands_list).match, name_clean)
+    ok &= _report("brand match", _same(old, new), t_old, t_new)
+    last_wins, _ = legacy_brand(df["name"], brands_list, longest=False)
+    changed = int((last_wins.fillna("") != new.fillna("")).sum())
+    print(f"[etl_core] longest-prefix brand differs from the old last-match-wins brand on {changed:,} rows")
+
+    for step in LEGACY:
+        old, t_old = _timed(LEGACY[step], df)
+        new, t_new = _timed(VECTORISED[step], df)
+        ok &= _report(step, _same(old, new), t_old, t_new)
+    return ok
+
+def _report(step, same, t_old, t_new) -> bool:
+    print(f"[etl_core] {step:<22} row-wise {t_old:8.2f}s  vectorised {t_new:6.2f}s  "
+          f"x{t_old / max(t_new, 1e-9):6.1f}  {'identical' if same else 'MISMATCH'}")
+    return same
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sys.exit(0 if run(rows) else 1)
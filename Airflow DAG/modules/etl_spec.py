@@ -0,0 +1,127 @@
+import re
+import time
+import pandas as pd
+from modules.etl_core import clean_numeric
+from modules.date_parsing import parse_dates
+
+# Columns (and their order) of every cleaned listing dataset
+COLUMN_ORDER = [
+    "URL",
+    "Brand",
+    "Make",
+    "Price",
+    "Registration_Date",
+    "Sold",
+    "Number_of_Previous_Owners",
+    "Mileage_km",
+    "COE",
+    "OMV",
+    "Road_Tax_Payable",
+    "COE_Expiry_Date",
+    "Transmission",
+    "Fuel_Type",
+    "Engine_Capacity_cc",
+    "Horse_Power_kW",
+    "Scrape_Date",
+    "Posted_Date",
+    "Vehicle_Age_Years",
+    "Vehicle_Age_Days",
+    "COE_Left_Days",
+    "COE_Category",
+    "COE_Cycles",
+    "COE_Renewed",
+    "Website",
+]
+
+# =========================
+# STEP KINDS
+# =========================
+# A source spec is
+#   {"name": ..., "website": ..., "rename": {raw: clean}, "steps": [(column, kind, arg), ...]}
+# Steps run in order on one working frame. Column steps replace `column` with
+# KIND(series, arg); "derive" computes it from the frame (arg(df, ctx)); "frame"
+# lets arg(df, ctx) add several columns at once; "keep" marks rows to drop where
+# arg(series) is False; "date" parses with parse_dates(series, formats=arg), using
+# ctx["date_formats"] (a DateFormatCache) when given. Dropped rows are removed once, together with every column
+# outside COLUMN_ORDER, when the spec has run.
+
+def _money(s, _):
+    return pd.to_numeric(s.astype(str).str.replace(r'[\$,]', '', regex=True).str.strip(), errors='coerce')
+
+def _extract_number(s, regex):
+    return pd.to_numeric(s.str.extract(regex)[0], errors='coerce')
+
+def _strip_patterns(s, patterns):
+    for pattern in patterns:
+        s = s.str.replace(pattern, '', regex=True).str.strip()
+    return s
+
+def _undo_future_century(s, _):
+    # two-digit years parsed into the future are pushed back 100 years
+    today = pd.Timestamp.today().normalize()
+    mask = s.dt.year > today.year
+    s = s.copy()
+    s[mask] = s[mask] - pd.DateOffset(years=100)
+    return s
+
+COLUMN_KINDS = {
+    "replace": lambda s, mapping: s.replace(mapping),
+    "replace_regex": lambda s, mapping: s.replace(mapping, regex=True),
+    "money": _money,
+    "number": lambda s, regex: clean_numeric(s, regex) if regex else clean_numeric(s),
+    "extract_number": _extract_number,
+    "strip_patterns": _strip_patterns,
+    "fillna": lambda s, value: s.fillna(value),
+    "undo_future_century": _undo_future_century,
+    "normalize": lambda s, _: s.dt.normalize(),
+    "astype": lambda s, dtype: s.astype(dtype),
+    "map": lambda s, fn: fn(s),
+}
+
+# =========================
+# ENGINE
+# =========================
+def run_spec(spec: dict, raw_df: pd.DataFrame, ctx: dict = None) -> pd.DataFrame:
+    """
+    Clean raw_df as described by spec. Returns the COLUMN_ORDER frame of kept rows
+    and prints the time spent per output column.
+    """
+    ctx = ctx or {}
+    started = time.perf_counter()
+    df = raw_df.rename(columns=spec["rename"])  # the only full copy before the final selection
+    keep = pd.Series(True, index=df.index)
+    timings = {}
+
+    for column, kind, arg in spec["steps"]:
+        t0 = time.perf_counter()
+        if kind == "keep":
+            keep &= arg(df[column]).fillna(False).astype(bool)
+        elif kind == "derive":
+            df[column] = arg(df, ctx)
+        elif kind == "frame":
+            df = arg(df, ctx)
+        elif kind == "date":
+            df[column] = parse_dates(df[column], arg, column=f"{spec['name']}.{column}", cache=ctx.get("date_formats"))
+        else:
+            df[column] = COLUMN_KINDS[kind](df[column], arg)
+        timings[column] = timings.get(column, 0.0) + time.perf_counter() - t0
+
+    df["Website"] = spec["website"]
+    out = df.loc[keep.to_numpy(), COLUMN_ORDER]
+
+    total = time.perf_counter() - started
+    slowest = sorted(timings.items(), key=lambda kv: kv[1], reverse=True)[:6]
+    print(f"[etl] {spec['name']}: {len(raw_df)} -> {len(out)} rows in {total:.2f}s; "
+          + ", ".join(f"{col} {secs:.3f}s" for col, secs in slowest))
+    return out
+
+def na_like(s: pd.Series, pattern=r'(?:N\.?A\.?|NA|N\/A|--|-)') -> pd.Series:
+    """True where the value is missing or a placeholder such as 'N.A.' or '-'."""
+    return s.isna() | s.astype('string').str.strip().str.fullmatch(pattern).fillna(False).astype(bool)
+
+def not_matching(pattern: str, case: bool = True):
+    """keep-step predicate: rows whose value does not contain the regex."""
+    return lambda s: ~s.str.contains(pattern, case=case, regex=True).fillna(False).astype(bool)
+
+def any_of(words) -> str:
+    return '|'.join(map(re.escape, words))
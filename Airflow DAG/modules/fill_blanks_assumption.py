@@ -34,9 +34,16 @@ CATEGORICAL_COLS = [
 ]
 
 def _to_datetime(s: pd.Series) -> pd.Series:
+    # Parquet inputs are already typed, only strings need parsing
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
     return pd.to_datetime(s, errors="coerce")
 
 def _to_numeric(s: pd.Series) -> pd.Series:
+    # Parquet inputs are already numeric; nullable Int64 goes to float64 so the
+    # median/mean fills below can hold fractional values
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.astype("float64") if pd.api.types.is_extension_array_dtype(s) else s
     return pd.to_numeric(s, errors="coerce")
 
 def _to_bool_from_strings(s: pd.Series) -> pd.Series:
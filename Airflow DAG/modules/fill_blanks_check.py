@@ -0,0 +1,69 @@
+# fill_blanks_check.py
+# Regression check for modules/fill_blanks_assumption.py on a final frame that
+# went through the Parquet round-trip (modules/storage.py), where the nullable
+# Int64 columns of FINAL_CAR_SCHEMA come back as Int64 rather than float64.
+#
+# Usage: python -m modules.fill_blanks_check
+import io
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from modules.storage import read_parquet, write_parquet
+from modules.fill_blanks_assumption import fill_blanks_in_df
+
+def final_frame() -> pd.DataFrame:
+    """Small final_dashboard_data frame whose group medians are fractional (97/98 kW -> 97.5)."""
+    return pd.DataFrame({
+        "URL": [f"https://example.com/car-{i}" for i in range(7)],
+        "Brand": ["Toyota", "Toyota", "Toyota", "Honda", "Honda", "Tesla", "Tesla"],
+        "Make": ["Corolla Altis", "Corolla Altis", "Corolla Altis", "Civic", "Civic", "Model 3", "Model 3"],
+        "Price": [60000.0, 61000.0, 59000.0, 80000.0, np.nan, 120000.0, 118000.0],
+        "Registration_Date": pd.to_datetime(["2020-01-15"] * 3 + ["2021-06-01"] * 2 + ["2022-03-01"] * 2),
+        "Sold": [False, True, False, False, False, True, False],
+        "Mileage_km": [50000.0, np.nan, 52001.0, 30000.0, 30001.0, np.nan, 10000.0],
+        "Road_Tax_Payable": [682.0, np.nan, 683.0, 742.0, 743.0, np.nan, 400.0],
+        "Fuel_Type": ["Petrol", "Petrol", "Petrol", "Petrol", "Petrol", "Electric", "Electric"],
+        "Engine_Capacity_cc": [1598, 1598, 1598, 1498, 1498, pd.NA, pd.NA],
+        "Horse_Power_kW": [97, 98, pd.NA, 95, pd.NA, 208, pd.NA],
+        "COE_Left_Days": [1500, 1400, 1450, 2000, 2001, 2500, 2400],
+        "Classic_Car": [False] * 7,
+        "Website": ["sgcarmart.com"] * 3 + ["carro.co"] * 2 + ["motorist.sg"] * 2,
+    })
+
+def round_trip(df: pd.DataFrame, name: str = "final_dashboard_data") -> pd.DataFrame:
+    buf = io.BytesIO()
+    write_parquet(df, buf, name)
+    buf.seek(0)
+    return read_parquet(buf)
+
+def run() -> bool:
+    df = round_trip(final_frame())
+    print(f"[fill_blanks] Horse_Power_kW after the Parquet round-trip: {df['Horse_Power_kW'].dtype}")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # fill_blanks_in_df also saves a CSV under ./final_datasets
+        try:
+            filled = fill_blanks_in_df(df)
+        except TypeError as e:
+            print(f"[fill_blanks] FAILED: {e}")
+            return False
+        finally:
+            os.chdir(cwd)
+
+    # 1598cc group median of 97 and 98 kW is 97.5, rounded half to even
+    expected = {"Horse_Power_kW": [97, 98, 98, 95, 95, 208, 208]}
+    ok = True
+    for col, values in expected.items():
+        got = filled[col].astype("Int64").tolist()
+        same = got == values
+        ok &= same
+        print(f"[fill_blanks] {col:<16} {got}  {'OK' if same else f'MISMATCH, expected {values}'}")
+    missing = int(filled[["Mileage_km", "Road_Tax_Payable", "Horse_Power_kW"]].isna().sum().sum())
+    ok &= missing == 0
+    print(f"[fill_blanks] blanks left in the filled columns: {missing}")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
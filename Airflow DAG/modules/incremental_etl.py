@@ -0,0 +1,96 @@
+import os
+import inspect
+import hashlib
+import pandas as pd
+from modules.etl_core import add_age_columns, add_coe_left_from_expiry
+
+# =========================
+# INCREMENTAL ETL
+# =========================
+# The raw scrape datasets only grow by new listings and sold-flag updates, so the
+# cleaned output is kept between runs together with a sidecar of
+#   URL | Row_Hash | ETL_Version
+# for every raw row that was cleaned. On the next run only raw rows whose
+# (URL, Row_Hash) pair is not in the sidecar go through the ETL; everything else
+# is carried over from the previous cleaned output, with the columns that depend
+# on today's date recomputed. A change to the ETL code (or to its extra inputs,
+# e.g. the brand list) changes ETL_Version and forces a full rebuild.
+
+HASH_COLUMNS = ["URL", "Row_Hash", "ETL_Version"]
+ETL_SOURCES = ["etl_core.py", "etl_spec.py", "date_parsing.py", "incremental_etl.py"]
+
+
+def row_hashes(raw_df: pd.DataFrame) -> pd.Series:
+    """Stable content hash per raw row (hex), independent of column order."""
+    cols = sorted(raw_df.columns)
+    hashed = pd.util.hash_pandas_object(raw_df[cols].astype(str), index=False)
+    return hashed.map("{:016x}".format)
+
+def etl_version(etl_fn, extra: str = "", sources=ETL_SOURCES) -> str:
+    """Fingerprint of the ETL module source, the shared helpers in `sources` and `extra`."""
+    module_file = inspect.getsourcefile(etl_fn) or ""
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1(extra.encode("utf-8"))
+    for path in [module_file] + [os.path.join(here, name) for name in sources]:
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(path.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def refresh_time_columns(df: pd.DataFrame, coe_left_from_expiry: bool = False, today=None) -> pd.DataFrame:
+    """Recompute the columns that are relative to today's date from the stored base dates."""
+    if df.empty:
+        return df
+    df = add_age_columns(df, today)
+    if coe_left_from_expiry:
+        df = add_coe_left_from_expiry(df, today)
+    return df
+
+def incremental_etl(raw_df: pd.DataFrame, prev_clean: pd.DataFrame, prev_hashes: pd.DataFrame,
+                    etl_fn, *etl_args, version_extra: str = "", coe_left_from_expiry: bool = False,
+                    url_col: str = "url", save_fn=None):
+    """
+    Clean only the new or changed rows of raw_df with etl_fn(raw_subset, *etl_args,
+    save_csv=False) and merge them into prev_clean. save_fn, if given, is called with
+    the merged frame, so a CSV export always holds the whole cleaned dataset.
+    Returns (clean_df, hashes_df); hashes_df is the sidecar to store for the next run.
+    """
+    version = etl_version(etl_fn, version_extra)
+    hashes = pd.DataFrame({
+        "URL": raw_df[url_col].astype(str).str.strip().to_numpy(),
+        "Row_Hash": row_hashes(raw_df).to_numpy(),
+        "ETL_Version": version,
+    })
+
+    full = (prev_clean is None or prev_clean.empty or prev_hashes is None or prev_hashes.empty
+            or not set(HASH_COLUMNS).issubset(prev_hashes.columns)
+            or (prev_hashes["ETL_Version"] != version).any())
+    if full:
+        print(f"[incremental_etl] Full rebuild of {len(raw_df)} raw rows (no usable previous output or ETL changed)")
+        return etl_fn(raw_df, *etl_args), hashes
+
+    seen = pd.MultiIndex.from_frame(prev_hashes[["URL", "Row_Hash"]])
+    changed = ~pd.MultiIndex.from_frame(hashes[["URL", "Row_Hash"]]).isin(seen)
+    changed_urls = set(hashes.loc[changed, "URL"])
+    changed = hashes["URL"].isin(changed_urls).to_numpy()  # re-clean every raw row of a changed URL
+    current_urls = set(hashes["URL"])
+
+    # keep previous cleaned rows whose raw row is still present and unchanged
+    prev_urls = prev_clean["URL"].astype(str).str.strip()
+    carried = prev_clean[prev_urls.isin(current_urls) & ~prev_urls.isin(changed_urls)]
+    carried = refresh_time_columns(carried.copy(), coe_left_from_expiry)
+
+    frames = [carried]
+    if changed.any():
+        frames.append(etl_fn(raw_df[changed].copy(), *etl_args, save_csv=False))
+    clean = pd.concat([f for f in frames if not f.empty] or [prev_clean.iloc[0:0]], ignore_index=True)
+    clean = clean[prev_clean.columns] if set(prev_clean.columns) == set(clean.columns) else clean
+
+    print(f"[incremental_etl] {int(changed.sum())} new/changed of {len(raw_df)} raw rows cleaned; "
+          f"{len(carried)} carried over, {int((~prev_urls.isin(current_urls)).sum())} dropped; "
+          f"{len(clean)} cleaned rows")
+    if save_fn is not None:
+        save_fn(clean)
+    return clean, hashes
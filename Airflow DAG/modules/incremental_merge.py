@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+from modules.incremental_etl import etl_version, row_hashes
+from modules.reference_dimensions import month_number
+
+# =========================
+# INCREMENTAL MERGE_ALL
+# =========================
+# merge_all_datasets enriches each combined car row on its own (reference
+# lookups + row-wise rules), so only rows whose inputs changed need it again:
+#   - final_dashboard_inputs  URL | Input_Hash | Merge_Version, one row per combined car row
+#     enriched last run. Merge_Version covers the merge code and the reference
+#     dimensions, so a new COE round / PQP month / STI month re-enriches everything.
+#   - final_dashboard_published  URL | Output_Hash | Occurrence, one row per dashboard row
+#     as last written to BigQuery. Today's rows are diffed against it and only
+#     the URLs that changed are replaced in the table (dashboard_merge_sql).
+# Hashes leave out the columns that move with today's date; the carried rows get
+# today's values from the combined data and BigQuery recomputes them in place
+# (refresh_time_columns_sql), so a quiet day costs one small load plus DML.
+# Motorist's COE_Left_Days counts down daily (expiry date - today), and with it
+# the columns merge_all derives from it (COE_DERIVED_COLUMNS).
+
+TIME_COLUMNS = ["Vehicle_Age_Years", "Vehicle_Age_Days", "COE_Cycles", "COE_Renewed", "COE_Left_Days"]
+COE_DERIVED_COLUMNS = ["COE_Expiry_Date", "Previous_COE_Per_Month_Remaining", "Current_COE_Per_Month_Remaining"]
+COUNTDOWN_WEBSITES = ["motorist.sg"]  # COE_Left_Days from modules/etl_core.add_coe_left_from_expiry
+INPUT_HASH_COLUMNS = ["URL", "Input_Hash", "Merge_Version"]
+PUBLISHED_HASH_COLUMNS = ["URL", "Output_Hash", "Occurrence"]
+MERGE_SOURCES = ["reference_dimensions.py", "date_parsing.py"]
+
+
+def stable_row_hashes(df: pd.DataFrame, skip=TIME_COLUMNS) -> pd.Series:
+    """row_hashes without the columns in skip (the TIME_COLUMNS)."""
+    return row_hashes(df.drop(columns=[c for c in skip if c in df.columns]))
+
+def merge_version(merge_fn, reference) -> str:
+    return etl_version(merge_fn, reference.version, sources=MERGE_SOURCES)
+
+def _urls(df: pd.DataFrame) -> pd.Series:
+    return df["URL"].astype(str).str.strip()
+
+def _coe_start(registration, expiry) -> pd.DataFrame:
+    """What merge_all_datasets looks up from the COE start: 10- and 5-year start months, and renewed or not."""
+    reg = pd.to_datetime(registration, errors="coerce")
+    start = pd.concat([reg.rename("reg"), (pd.to_datetime(expiry) - pd.DateOffset(years=10)).rename("start")], axis=1).max(axis=1)
+    return pd.DataFrame({"ten": month_number(start), "five": month_number(start + pd.DateOffset(years=5)),
+                         "renewal": (reg != start).to_numpy()}, index=reg.index)
+
+def refresh_coe_left(final_df: pd.DataFrame) -> pd.DataFrame:
+    """COE_DERIVED_COLUMNS from COE_Left_Days as merge_all_datasets computes them; drops rows with none left."""
+    left = pd.to_numeric(final_df["COE_Left_Days"], errors="coerce")
+    final_df = final_df[(left > 0).to_numpy()].copy()
+    left = left[left > 0]
+    final_df["COE_Expiry_Date"] = pd.to_datetime(final_df["Scrape_Date"]) + pd.to_timedelta(left, unit="D")
+    months_left = left.div(30.4375).apply(np.ceil).clip(lower=1).astype("Int64")
+    for col, coe in [("Previous_COE_Per_Month_Remaining", "Previous_COE"),
+                     ("Current_COE_Per_Month_Remaining", "Premium_Current_COE")]:
+        final_df[col] = pd.to_numeric(final_df[coe], errors="coerce").div(months_left).round().astype("Int64")
+    return final_df
+
+def incremental_merge_all(car_df: pd.DataFrame, prev_final: pd.DataFrame, prev_inputs: pd.DataFrame,
+                          enrich, version: str):
+    """
+    enrich(car_subset) only the combined rows that are new or changed since the
+    previous run and merge them into prev_final.
+    Returns (final_df, inputs_df); inputs_df is the sidecar to store for the next run.
+    """
+    urls = _urls(car_df)
+    inputs = pd.DataFrame({
+        "URL": urls.to_numpy(),
+        "Input_Hash": stable_row_hashes(car_df).to_numpy(),
+        "Merge_Version": version,
+    })
+
+    full = (prev_final is None or prev_final.empty or prev_inputs is None or prev_inputs.empty
+            or not set(INPUT_HASH_COLUMNS).issubset(prev_inputs.columns)
+            or (prev_inputs["Merge_Version"] != version).any())
+    if full:
+        print(f"[incremental_merge] Full merge of {len(car_df)} car rows (no usable previous output, or merge inputs changed)")
+        return enrich(car_df.copy()), inputs
+
+    seen = pd.MultiIndex.from_frame(prev_inputs[["URL", "Input_Hash"]])
+    changed = ~pd.MultiIndex.from_frame(inputs[["URL", "Input_Hash"]]).isin(seen)
+    changed_urls = set(inputs.loc[changed, "URL"])
+
+    # previous dashboard rows of unchanged URLs, with today's date-relative columns
+    prev_urls = _urls(prev_final)
+    keep = (prev_urls.isin(set(urls)) & ~prev_urls.isin(changed_urls)).to_numpy()
+    carried = prev_final[keep].copy()
+    today = car_df.set_axis(urls.to_numpy())[TIME_COLUMNS]
+    today = today[~today.index.duplicated()]
+    for col in TIME_COLUMNS:
+        carried[col] = today[col].reindex(prev_urls[keep].to_numpy()).array
+    # a counted-down COE whose start month moved looks up other PQP prices: enrich it again
+    expiry = pd.to_datetime(carried["Scrape_Date"]) + pd.to_timedelta(pd.to_numeric(carried["COE_Left_Days"], errors="coerce"), unit="D")
+    moved = (_coe_start(carried["Registration_Date"], carried["COE_Expiry_Date"])
+             != _coe_start(carried["Registration_Date"], expiry)).any(axis=1)
+    changed_urls |= set(_urls(carried)[moved])
+    carried = refresh_coe_left(carried[~moved])
+    changed = urls.isin(changed_urls).to_numpy()  # re-enrich every row of a changed URL
+
+    frames = [carried]
+    if changed.any():
+        frames.append(enrich(car_df[changed].copy()))
+    final = pd.concat([f for f in frames if not f.empty] or [prev_final.iloc[0:0]], ignore_index=True)
+    final = final[prev_final.columns] if set(prev_final.columns) == set(final.columns) else final
+
+    print(f"[incremental_merge] {int(changed.sum())} new/changed of {len(car_df)} car rows enriched; "
+          f"{len(carried)} dashboard rows carried over; {len(final)} dashboard rows")
+    return final, inputs
+
+# =========================
+# BIGQUERY DELTA
+# =========================
+def _published_hashes(final_df: pd.DataFrame) -> pd.DataFrame:
+    hashes = stable_row_hashes(final_df, skip=TIME_COLUMNS + COE_DERIVED_COLUMNS)
+    published = pd.DataFrame({"URL": _urls(final_df).to_numpy(), "Output_Hash": hashes.to_numpy()})
+    # numbers identical rows of a URL, so dropping one of two duplicates still counts as a change
+    published["Occurrence"] = published.groupby(["URL", "Output_Hash"]).cumcount()
+    return published
+
+def dashboard_delta(final_df: pd.DataFrame, prev_published: pd.DataFrame):
+    """
+    Changes of final_df against what was last written to BigQuery.
+    Returns (upserts, keys, published):
+      upserts    every row of a URL whose rows changed (new URLs included)
+      keys       URL column of the URLs to replace: changed, new or gone; None when
+                 there is nothing to diff against and the table needs a full load
+      published  the sidecar to store once the table is updated
+    """
+    published = _published_hashes(final_df)
+    if prev_published is None or prev_published.empty or not set(PUBLISHED_HASH_COLUMNS).issubset(prev_published.columns):
+        return final_df, None, published
+
+    prev_published = prev_published.astype({"Occurrence": "int64"})
+    current = pd.MultiIndex.from_frame(published[PUBLISHED_HASH_COLUMNS])
+    previous = pd.MultiIndex.from_frame(prev_published[PUBLISHED_HASH_COLUMNS])
+    changed_urls = (set(published.loc[~current.isin(previous), "URL"])
+                    | set(prev_published.loc[~previous.isin(current), "URL"]))
+    upserts = final_df[published["URL"].isin(changed_urls).to_numpy()]
+    keys = pd.DataFrame({"URL": sorted(changed_urls)}, dtype=object)
+    print(f"[incremental_merge] Dashboard delta: {len(keys)} URLs replaced, {len(upserts)} rows written")
+    return upserts, keys, published
+
+def dashboard_merge_sql(table: str, delta_table: str, keys_table: str, columns) -> str:
+    """Replace the rows of every URL in keys_table with the rows in delta_table, in one statement."""
+    cols = ", ".join(f"`{c}`" for c in columns)
+    return (
+        f"MERGE `{table}` T\n"
+        f"USING `{delta_table}` S\n"
+        f"ON FALSE\n"
+        f"WHEN NOT MATCHED BY SOURCE AND T.URL IN (SELECT URL FROM `{keys_table}`) THEN DELETE\n"
+        f"WHEN NOT MATCHED THEN INSERT ({cols}) VALUES ({cols})"
+    )
+
+def refresh_time_columns_sql(table: str, today) -> str:
+    """
+    TIME_COLUMNS recomputed from Registration_Date as modules/etl_core.add_age_columns
+    does (half-even rounding like pandas). For COUNTDOWN_WEBSITES, COE_Left_Days goes
+    down by the days since the row was last written (Registration_Date + the old
+    Vehicle_Age_Days), and COE_DERIVED_COLUMNS follow as in refresh_coe_left.
+    Rows whose COE runs out are removed by the next dashboard_delta / MERGE.
+    """
+    age_days = f"DATE_DIFF(DATE '{pd.Timestamp(today):%Y-%m-%d}', Registration_Date, DAY)"
+    cycles = f"CAST(FLOOR({age_days} / 365.25 / 10) AS INT64) + 1"
+    countdown = "LOWER(Website) IN (" + ", ".join(f"'{w}'" for w in COUNTDOWN_WEBSITES) + ")"
+    left = f"COE_Left_Days - ({age_days} - Vehicle_Age_Days)"
+    months_left = f"GREATEST(CAST(CEIL(({left}) / 30.4375) AS INT64), 1)"
+
+    def per_month(coe):
+        return f"CAST(ROUND(CAST({coe} AS NUMERIC) / {months_left}, 0, 'ROUND_HALF_EVEN') AS INT64)"
+
+    return (
+        f"UPDATE `{table}` SET\n"
+        f"  Vehicle_Age_Days = {age_days},\n"
+        f"  Vehicle_Age_Years = CAST(ROUND(CAST({age_days} AS NUMERIC) / 365.25, 0, 'ROUND_HALF_EVEN') AS INT64),\n"
+        f"  COE_Cycles = {cycles},\n"
+        f"  COE_Renewed = {cycles} > 1,\n"
+        f"  COE_Left_Days = IF({countdown}, {left}, COE_Left_Days),\n"
+        f"  COE_Expiry_Date = IF({countdown}, DATE_ADD(Scrape_Date, INTERVAL {left} DAY), COE_Expiry_Date),\n"
+        f"  Previous_COE_Per_Month_Remaining = IF({countdown}, {per_month('Previous_COE')}, Previous_COE_Per_Month_Remaining),\n"
+        f"  Current_COE_Per_Month_Remaining = IF({countdown}, {per_month('Premium_Current_COE')}, Current_COE_Per_Month_Remaining)\n"
+        f"WHERE Registration_Date IS NOT NULL"
+    )
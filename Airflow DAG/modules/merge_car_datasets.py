@@ -1,6 +1,8 @@
 import pandas as pd
 import os
 from datetime import datetime
+from modules.etl_spec import COLUMN_ORDER
+from modules.entity_resolution import deduplicate_listings
 
 def merge_car_datasets(df_sgcarmart, df_motorist, df_carro):
     #Standardize columns
@@ -12,34 +14,7 @@ def merge_car_datasets(df_sgcarmart, df_motorist, df_carro):
     #Merge all into one DataFrame
     combined_df = pd.concat([df_sgcarmart, df_motorist, df_carro], ignore_index=True)
 
-    column_order = [
-        "URL",
-        "Brand",
-        "Make",
-        "Price",
-        "Registration_Date",
-        "Sold",
-        "Number_of_Previous_Owners",
-        "Mileage_km",
-        "COE",
-        "OMV",
-        "Road_Tax_Payable",
-        "COE_Expiry_Date",
-        "Transmission",
-        "Fuel_Type",
-        "Engine_Capacity_cc",
-        "Horse_Power_kW",
-        "Scrape_Date",
-        "Posted_Date",
-        "Vehicle_Age_Years",
-        "Vehicle_Age_Days",
-        "COE_Left_Days",
-        "COE_Category",
-        "COE_Cycles",
-        "COE_Renewed",
-        "Website"
-    ]
-    combined_df = combined_df[column_order]
+    combined_df = combined_df[COLUMN_ORDER]
 
     #Convert all to appropriate dtypes
     cat_cols = ["Brand","Make","Transmission","Fuel_Type","COE_Category","Website", "URL"]
@@ -51,6 +26,9 @@ def merge_car_datasets(df_sgcarmart, df_motorist, df_carro):
         .map({"Y": True, "N": False})
     )
 
+    #Same car listed on several sites -> one row per vehicle (Vehicle_ID)
+    combined_df = deduplicate_listings(combined_df).reset_index(drop=True)
+
     #Save file as csv
     save_to_csv(combined_df, filename=None)
 
@@ -0,0 +1,163 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from modules.date_parsing import parse_dates
+
+# =========================
+# REFERENCE DIMENSIONS
+# =========================
+# merge_all_datasets attaches to every listing
+#   - the COE bidding round in force when it was posted (latest round of its
+#     category on or before Posted_Date),
+#   - the PQP of its category in the month its 10-year and 5-year COE started,
+#   - the STI average of the month it was posted.
+# coe / pqp / stock change at most twice a month, so extract_coe and
+# extract_stock publish them once, already keyed by integers:
+#   coe_rounds_dim  Vehicle_Class, Bidding_Day (days since 1970-01-01), round columns;
+#                   sorted by class then day
+#   pqp_dim         Vehicle_Class, Month_Number (year * 12 + month - 1), both PQP prices;
+#                   one row for every month between a class's first and last PQP
+#   stock_dim       Month_Number, Stocks_Monthly_Avg; one row for every month
+# ReferenceLookup resolves listings against them with a searchsorted for the
+# rounds and array offsets for PQP and STI, instead of string/datetime merges.
+
+ROUND_COLUMNS = ["Quota", "Bids_Success", "Bids_Received", "Premium"]
+PQP_COLUMNS = ["PQP_Price_Ten_Year", "PQP_Price_Five_Year"]
+_CLASS_STRIDE = 1 << 32  # rounds key = class code * _CLASS_STRIDE + day
+
+def category_letter(s: pd.Series) -> pd.Series:
+    """'Category A' / 'Cat A ' -> 'A'."""
+    return s.astype("string").str.strip().str[-1:].str.upper()
+
+def month_number(dates: pd.Series) -> np.ndarray:
+    """year * 12 + month - 1 per date, -1 where the date is missing."""
+    dates = pd.to_datetime(dates, errors="coerce")
+    months = dates.dt.year * 12 + dates.dt.month - 1
+    return months.fillna(-1).to_numpy(dtype=np.int64)
+
+def day_number(dates: pd.Series) -> pd.Series:
+    """Days since 1970-01-01 (NA where the date is missing)."""
+    dates = pd.to_datetime(dates, errors="coerce").dt.normalize()
+    return ((dates - pd.Timestamp("1970-01-01")).dt.days).astype("Int64")
+
+# =========================
+# BUILD (extract_coe / extract_stock)
+# =========================
+def coe_rounds_dimension(coe_df: pd.DataFrame, date_formats=None) -> pd.DataFrame:
+    rounds = pd.DataFrame({
+        "Vehicle_Class": category_letter(coe_df["Vehicle_Class"]),
+        "Bidding_Day": day_number(parse_dates(coe_df["Bidding_Date"], column="coe.Bidding_Date", cache=date_formats)),
+    })
+    for col in ROUND_COLUMNS:
+        rounds[col] = pd.to_numeric(coe_df[col], errors="coerce") if col in coe_df.columns else np.nan
+    rounds = rounds.dropna(subset=["Vehicle_Class", "Bidding_Day"])
+    # stable: rounds on the same day keep their dataset order
+    return rounds.sort_values(["Vehicle_Class", "Bidding_Day"], kind="mergesort").reset_index(drop=True)
+
+def pqp_dimension(pqp_df: pd.DataFrame, date_formats=None) -> pd.DataFrame:
+    pqp = pd.DataFrame({
+        "Vehicle_Class": category_letter(pqp_df["Vehicle_Class"]),
+        "Month_Number": month_number(parse_dates(pqp_df["Month"], column="pqp.Month", cache=date_formats)),
+    })
+    for col in PQP_COLUMNS:
+        pqp[col] = pd.to_numeric(pqp_df[col], errors="coerce")
+    pqp = pqp[pqp["Vehicle_Class"].notna() & (pqp["Month_Number"] >= 0)]
+    if pqp.duplicated(["Vehicle_Class", "Month_Number"]).any():
+        raise pd.errors.MergeError("pqp has more than one row per (Vehicle_Class, month)")
+    dense = []
+    for cls, rows in pqp.groupby("Vehicle_Class", sort=True):
+        months = pd.RangeIndex(rows["Month_Number"].min(), rows["Month_Number"].max() + 1, name="Month_Number")
+        block = rows.set_index("Month_Number")[PQP_COLUMNS].reindex(months).reset_index()
+        block.insert(0, "Vehicle_Class", cls)
+        dense.append(block)
+    columns = ["Vehicle_Class", "Month_Number"] + PQP_COLUMNS
+    return pd.concat(dense, ignore_index=True)[columns] if dense else pd.DataFrame(columns=columns)
+
+def stock_dimension(stock_df: pd.DataFrame) -> pd.DataFrame:
+    year = pd.to_numeric(stock_df["Year"], errors="coerce")
+    month = pd.to_numeric(stock_df["Month"], errors="coerce")
+    stock = pd.DataFrame({
+        "Month_Number": (year * 12 + month - 1),
+        "Stocks_Monthly_Avg": pd.to_numeric(stock_df["Average_Close"], errors="coerce").round().astype("Int64"),
+    }).dropna(subset=["Month_Number"])
+    stock["Month_Number"] = stock["Month_Number"].astype(np.int64)
+    if stock["Month_Number"].duplicated().any():
+        raise pd.errors.MergeError("stock has more than one row per month")
+    if stock.empty:
+        return stock.reset_index(drop=True)
+    months = pd.RangeIndex(stock["Month_Number"].min(), stock["Month_Number"].max() + 1, name="Month_Number")
+    return stock.set_index("Month_Number").reindex(months).reset_index()
+
+# =========================
+# LOOKUP (merge_all_datasets)
+# =========================
+class ReferenceLookup:
+    """Listing-side lookups against the three reference dimensions."""
+
+    def __init__(self, rounds_dim: pd.DataFrame, pqp_dim: pd.DataFrame, stock_dim: pd.DataFrame):
+        # rounds: one sorted int64 key per round, class blocks in class order
+        self.round_classes = pd.Index(pd.unique(rounds_dim["Vehicle_Class"].astype(object)))
+        codes = self.round_classes.get_indexer(rounds_dim["Vehicle_Class"].astype(object))
+        self.round_keys = codes * _CLASS_STRIDE + rounds_dim["Bidding_Day"].to_numpy(dtype=np.int64)
+        self.round_codes = codes
+        self.round_values = {col: rounds_dim[col].to_numpy(dtype=float) for col in ROUND_COLUMNS}
+
+        # pqp: per class, first row and first month of its dense block
+        pqp_class = pqp_dim["Vehicle_Class"].astype(object)
+        self.pqp_classes = pd.Index(pd.unique(pqp_class))
+        first_rows = np.flatnonzero(~pqp_class.duplicated().to_numpy())
+        pqp_months = pqp_dim["Month_Number"].to_numpy(dtype=np.int64)
+        # one extra empty block at the end, picked by class code -1 (unknown class)
+        self.pqp_start = np.append(first_rows, 0)
+        self.pqp_first_month = np.append(pqp_months[first_rows], 0)
+        self.pqp_count = np.append(np.diff(np.append(first_rows, len(pqp_dim))), 0)
+        self.pqp_values = {col: pqp_dim[col].array for col in PQP_COLUMNS}
+
+        self.stock_first_month = int(stock_dim["Month_Number"].iloc[0]) if len(stock_dim) else 0
+        self.stock_values = pd.array(stock_dim["Stocks_Monthly_Avg"], dtype="Int64")
+
+        # changes whenever any looked-up value does (incremental merge_all re-enriches everything then)
+        digest = hashlib.sha1()
+        for dim in (rounds_dim, pqp_dim, stock_dim):
+            digest.update(pd.util.hash_pandas_object(dim.astype(str), index=False).to_numpy().tobytes())
+        self.version = digest.hexdigest()[:16]
+
+    @classmethod
+    def from_raw(cls, coe_df, pqp_df, stock_df, date_formats=None) -> "ReferenceLookup":
+        return cls(coe_rounds_dimension(coe_df, date_formats), pqp_dimension(pqp_df, date_formats),
+                   stock_dimension(stock_df))
+
+    def current_round(self, classes: pd.Series, dates: pd.Series) -> pd.DataFrame:
+        """ROUND_COLUMNS of the latest round of each row's class on or before its date (NA when none)."""
+        codes = self.round_classes.get_indexer(classes.astype("string").str.strip().astype(object))
+        days = day_number(dates)
+        known = (codes >= 0) & days.notna().to_numpy()
+        keys = codes * _CLASS_STRIDE + days.fillna(0).to_numpy(dtype=np.int64)
+        pos = np.searchsorted(self.round_keys, keys, side="right") - 1
+        # the round found must belong to the row's own class
+        hit = known & (pos >= 0)
+        hit[hit] = self.round_codes[pos[hit]] == codes[hit]
+        pos = np.where(hit, pos, -1)
+        out = pd.DataFrame(index=classes.index)
+        for col in ROUND_COLUMNS:
+            out[col] = pd.api.extensions.take(self.round_values[col], pos, allow_fill=True)
+        return out
+
+    def pqp_prices(self, classes: pd.Series, ten_year_start: pd.Series, five_year_start: pd.Series):
+        """(PQP_Price_Ten_Year, PQP_Price_Five_Year) in the start month of each horizon."""
+        codes = self.pqp_classes.get_indexer(classes.astype(object).where(classes.notna(), None))
+        out = []
+        for col, start in zip(PQP_COLUMNS, [ten_year_start, five_year_start]):
+            months = month_number(start)
+            offset = months - self.pqp_first_month[codes]
+            ok = (months >= 0) & (offset >= 0) & (offset < self.pqp_count[codes])
+            rows = np.where(ok, self.pqp_start[codes] + offset, -1)
+            out.append(pd.Series(self.pqp_values[col].take(rows, allow_fill=True), index=classes.index))
+        return tuple(out)
+
+    def stock_average(self, dates: pd.Series) -> pd.Series:
+        """Stocks_Monthly_Avg of each date's month."""
+        months = month_number(dates)
+        offset = months - self.stock_first_month
+        rows = np.where((months >= 0) & (offset >= 0) & (offset < len(self.stock_values)), offset, -1)
+        return pd.Series(self.stock_values.take(rows, allow_fill=True), index=dates.index)
@@ -1,10 +1,11 @@
-import os, time, random, requests, threading
+import os, time, random, threading
 import pandas as pd
 from datetime import datetime
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from apis.sgcarmart_scrape import SGCarMartScraper
-from apis.motorist_webscraping import get_html, extract_sold_flag
+from apis.html_parser import make_soup
+from apis.sgcarmart_scrape import SGCarMartScraper, HEADERS as SGCARMART_HEADERS
+from apis.motorist_webscraping import extract_sold_flag
+from apis.http_client import PooledFetcher
+from apis.http_cache import default_cache
 
 # =========================
 # WEBSITE CHECKER CONFIG
@@ -50,72 +51,73 @@ def with_retries(func, *, tries=3, base_sleep=0.8, jitter=0.3, **kwargs):
 
 
 # =========================
-# SITE: SGCARMART
+# POOLED CHECKING
 # =========================
-def process_sgcarmart(df_site: pd.DataFrame, master_df: pd.DataFrame, prev_df:pd.DataFrame, max_workers: int = 2):
-    """
-    Parallel-ish SGCM checker.
-    Uses small pool (default 2) to avoid hitting SGCM too hard.
-    """
-    if df_site.empty:
-        return 0
-
-    sold_count = 0
-    lock = threading.Lock()
-    futures = {}
-
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        for i, row in enumerate(df_site.itertuples(index=False)):
-            url = getattr(row, "URL", None)
-            if not isinstance(url, str) or not url.strip():
-                continue
-
-            def job(u=url, idx=i):
-                # each worker gets its own scraper, so no shared state
-                tid = threading.get_ident()
-                scraper = SGCarMartScraper()
-
-                def _inner_call():
-                    available = scraper.get_availability(u)
-                    return not available  # True -> sold
+# One PooledFetcher per site: a keep-alive session reused for every URL of that
+# host, at most `max_workers` checks in flight and `requests_per_second` as the
+# politeness budget. Each URL is fetched once; its status code and body (the cached
+# body on a 304) decide sold / not sold. with_retries is the only retry layer (fetcher retries=1).
+SITE_LIMITS = {
+    "sgcarmart.com": {"max_workers": 1, "requests_per_second": 4.0},
+    "carro.co": {"max_workers": 5, "requests_per_second": 4.0},
+    "motorist.sg": {"max_workers": 5, "requests_per_second": 4.0},
+}
 
-                ok, is_sold = with_retries(_inner_call, tries=3)
-                if not ok:
-                    print(f"<{tid}> [SGCM] FAIL → {u}")
-                    return u, False, tid
+def site_fetcher(site: str, headers=None) -> PooledFetcher:
+    return PooledFetcher(headers=headers or BASE_HEADERS, cache=default_cache(), **SITE_LIMITS[site])
+
+def check_urls(label: str, urls, check_once, fetcher: PooledFetcher) -> list:
+    """check_once(fetcher, url) for every URL on the fetcher's pool; returns the URLs found sold."""
+    def job(u):
+        tid = threading.get_ident()
+        ok, is_sold = with_retries(check_once, tries=3, fetcher=fetcher, url=u)
+        if not ok:
+            print(f"<{tid}> [{label}] FAIL → {u}")
+            return False
+        print(f"<{tid}> [{label}] {'SOLD' if is_sold else 'OK'} → {u}")
+        return bool(is_sold)
+
+    urls = [u for u in urls if isinstance(u, str) and u.strip()]
+    sold = fetcher.map(job, urls)
+    return [u for u, is_sold in zip(urls, sold) if is_sold]
+
+def mark_sold(master_df: pd.DataFrame, prev_df: pd.DataFrame, sold_urls, label: str,
+              prev_column: str, prev_value) -> int:
+    sold_urls = set(sold_urls)
+    master_df.loc[master_df["URL"].isin(sold_urls), "Sold"] = True
+    prev_df.loc[prev_df["url"].isin(sold_urls), prev_column] = prev_value
+    print(f"[{label}] Finished, marked {len(sold_urls)} as sold.")
+    return len(sold_urls)
 
-                return u, is_sold, tid
 
-            fut = ex.submit(job)
-            futures[fut] = url
+# =========================
+# SITE: SGCARMART
+# =========================
+def process_sgcarmart(df_site: pd.DataFrame, master_df: pd.DataFrame, prev_df: pd.DataFrame, fetcher: PooledFetcher):
+    if df_site.empty:
+        return 0
+    scraper = SGCarMartScraper(fetcher=fetcher)  # one scraper on the shared fetcher for every job
 
-        for fut in as_completed(futures):
-            url, is_sold, tid = fut.result()
-            if is_sold:
-                with lock:
-                    master_df.loc[master_df["URL"] == url, "Sold"] = True
-                    prev_df.loc[prev_df["url"] == url, "status"] = "Sold"
-                    sold_count += 1
-                print(f"<{tid}> [SGCM] SOLD → {url}")
-            else:
-                print(f"<{tid}> [SGCM] OK → {url}")
+    def sgcarmart_check_once(fetcher, url):
+        return not scraper.get_availability(url)  # True -> sold (404 / SOLD / Expired)
 
-    print(f"[SGCM] Finished, marked {sold_count} as sold.")
-    return sold_count
+    sold = check_urls("SGCM", df_site["URL"], sgcarmart_check_once, fetcher)
+    return mark_sold(master_df, prev_df, sold, "SGCM", "status", "Sold")
 
 
 # =========================
 # SITE: CARRO
 # =========================
-def carro_check_once(url: str) -> bool:
+def carro_check_once(fetcher: PooledFetcher, url: str) -> bool:
     """
     Fetch a Carro detail page and read the status header.
     Returns True if SOLD / PENDING / RESERVED / ON HOLD, else False.
+    On a 304 the cached page is read: it may have been cached already showing sold.
     """
-    r = requests.get(url, headers=BASE_HEADERS, timeout=12, allow_redirects=True)
+    r = fetcher.get(url, retries=1, timeout=12, allow_redirects=True)
     if r.status_code in (404, 410):
         return True  # definitely gone
-    soup = BeautifulSoup(r.text, "html.parser")
+    soup = make_soup(r.text, parser="html.parser")  # lxml only compared on Motorist pages so far
 
     status_tag = soup.select_one("div.styles__StyledStatusHeader-sc-7efdfd35-5")
     if status_tag:
@@ -124,104 +126,35 @@ def carro_check_once(url: str) -> bool:
             return True
     return False
 
-def process_carro(df_site: pd.DataFrame, master_df: pd.DataFrame, prev_df:pd.DataFrame, max_workers: int = 5):
+def process_carro(df_site: pd.DataFrame, master_df: pd.DataFrame, prev_df: pd.DataFrame, fetcher: PooledFetcher):
     if df_site.empty:
         return 0
-
-    sold_count = 0
-    futures = {}
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        for row in df_site.itertuples(index=False):
-            url = getattr(row, "URL", None)
-            if not isinstance(url, str) or not url.strip():
-                continue
-
-            def job(u=url):
-                tid = threading.get_ident()
-                ok, val = with_retries(carro_check_once, tries=3, url=u)
-                if val:
-                    print(f"<{tid}> [CARRO] SOLD → {u}")
-                else:
-                    print(f"<{tid}> [CARRO] OK → {u}")
-                return u, (val if ok else False)
-
-            fut = ex.submit(job)
-            futures[fut] = url
-
-        for fut in as_completed(futures):
-            url, is_sold = fut.result()
-            if is_sold:
-                master_df.loc[master_df["URL"] == url, "Sold"] = True
-                prev_df.loc[prev_df["url"] == url, "sold"] = True
-                sold_count += 1
-                print(f"[CARRO] SOLD → {url}")
-
-    print(f"[CARRO] Finished, marked {sold_count} as sold.")
-    return sold_count
+    sold = check_urls("CARRO", df_site["URL"], carro_check_once, fetcher)
+    return mark_sold(master_df, prev_df, sold, "CARRO", "sold", True)
 
 
 # =========================
 # SITE: MOTORIST
 # =========================
-def motorist_check_once(url: str) -> bool:
+def motorist_check_once(fetcher: PooledFetcher, url: str) -> bool:
     """
-    Use your motorist_webscraping helpers:
-    - get_html(url) already has retries
-    - extract_sold_flag(soup) checks “Vehicle Sold”
+    One GET per listing: 404 / 410 -> sold; otherwise extract_sold_flag(soup) looks
+    for the "Vehicle Sold" badge, in the cached page on a 304. Other error statuses
+    raise, so with_retries tries again.
     """
-    # 1) fast check: is the page gone?
-    try:
-        r = requests.get(url, headers=BASE_HEADERS, timeout=10, allow_redirects=True)
-        if r.status_code in (404, 410):
-            print(f"[MOTORIST] {r.status_code} for {url} → treat as SOLD")
-            return True
-    except Exception as e:
-        print(f"[MOTORIST] fetch error for {url}: {e}")
-        return False
-
-    # 2) fall back to existing HTML+parser flow
-    html = get_html(url)
-    soup = BeautifulSoup(html, "html.parser")
-    status = extract_sold_flag(soup)
+    r = fetcher.get(url, retries=1, timeout=10, allow_redirects=True)
+    if r.status_code in (404, 410):
+        print(f"[MOTORIST] {r.status_code} for {url} → treat as SOLD")
+        return True
+    r.raise_for_status()
+    status = extract_sold_flag(make_soup(r.text))
     return str(status).lower().startswith("sold")
 
-
-def process_motorist(df_site: pd.DataFrame, master_df: pd.DataFrame, prev_df:pd.DataFrame, max_workers: int = 5):
+def process_motorist(df_site: pd.DataFrame, master_df: pd.DataFrame, prev_df: pd.DataFrame, fetcher: PooledFetcher):
     if df_site.empty:
         return 0
-
-    sold_count = 0
-    futures = {}
-
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        for row in df_site.itertuples(index=False):
-            url = getattr(row, "URL", None)
-            if not isinstance(url, str) or not url.strip():
-                continue
-
-            def job(u=url):
-                # wrap with our retry too, to be consistent
-                tid = threading.get_ident()
-                ok, val = with_retries(motorist_check_once, tries=3, url=u)
-                if val:
-                    print(f"<{tid}> [MOTORIST] SOLD → {u}")
-                else:
-                    print(f"<{tid}> [MOTORIST] OK → {u}")
-                return u, (val if ok else False)
-
-            fut = ex.submit(job)
-            futures[fut] = url
-
-        for fut in as_completed(futures):
-            url, is_sold = fut.result()
-            if is_sold:
-                master_df.loc[master_df["URL"] == url, "Sold"] = True
-                prev_df.loc[prev_df["url"] == url, "Status"] = "Sold"
-                sold_count += 1
-                print(f"[MOTORIST] SOLD → {url}")
-
-    print(f"[MOTORIST] Finished, marked {sold_count} as sold.")
-    return sold_count
+    sold = check_urls("MOTORIST", df_site["URL"], motorist_check_once, fetcher)
+    return mark_sold(master_df, prev_df, sold, "MOTORIST", "Status", "Sold")
 
 
 # =========================
@@ -233,7 +166,7 @@ def run_sold_check(df, prev_sgcm_df, prev_motor_df, prev_carro_df):
     df["URL"] = df["URL"].astype(str)
 
     # only check those not already sold
-    pending = df[df["Sold"] == False].copy()
+    pending = df[(df["Sold"] == False).fillna(False).astype(bool)].copy()
     pending["website_lc"] = pending["Website"].str.lower()
 
     sgcm_df = pending[pending["website_lc"] == "sgcarmart.com"]
@@ -243,11 +176,15 @@ def run_sold_check(df, prev_sgcm_df, prev_motor_df, prev_carro_df):
     print(f"[MAIN] To check → SGCM: {len(sgcm_df)}, CARRO: {len(carro_df)}, MOTORIST: {len(motor_df)}")
 
     total_sold = 0
-    total_sold += process_sgcarmart(sgcm_df, df, prev_sgcm_df, max_workers=1)
-    total_sold += process_carro(carro_df, df, prev_carro_df, max_workers=5)
-    total_sold += process_motorist(motor_df, df, prev_motor_df, max_workers=5)
+    with site_fetcher("sgcarmart.com", headers=SGCARMART_HEADERS) as fetcher:
+        total_sold += process_sgcarmart(sgcm_df, df, prev_sgcm_df, fetcher)
+    with site_fetcher("carro.co") as fetcher:
+        total_sold += process_carro(carro_df, df, prev_carro_df, fetcher)
+    with site_fetcher("motorist.sg") as fetcher:
+        total_sold += process_motorist(motor_df, df, prev_motor_df, fetcher)
 
     print(f"[MAIN] Total newly-marked SOLD = {total_sold}")
+    print(f"[MAIN] HTTP cache: {default_cache().summary()}")
 
     save_to_csv(df)
     return df, prev_sgcm_df, prev_motor_df, prev_carro_df
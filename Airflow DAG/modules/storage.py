@@ -0,0 +1,336 @@
+import io
+import os
+import json
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PARQUET_COMPRESSION = "zstd"
+PARQUET_MIME = "application/vnd.apache.parquet"
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # resumable upload / ranged download chunk (multiple of 256 KB)
+
+# =========================
+# DATASET SCHEMAS
+# =========================
+# Column types written for each dataset. Allowed types:
+#   "str"     -> text (object column of python str, blanks kept as NaN)
+#   "float"   -> float64
+#   "Int64"   -> nullable integer
+#   "boolean" -> nullable boolean
+#   "date"    -> stored as a Parquet DATE, read back as datetime64
+# Columns not listed keep their pandas dtype, except object columns which are
+# written as text (same as what a CSV round-trip used to give us).
+
+CLEAN_CAR_SCHEMA = {
+    "URL": "str",
+    "Brand": "str",
+    "Make": "str",
+    "Price": "float",
+    "Registration_Date": "date",
+    "Sold": "boolean",
+    "Number_of_Previous_Owners": "float",
+    "Mileage_km": "float",
+    "COE": "float",
+    "OMV": "float",
+    "Road_Tax_Payable": "float",
+    "COE_Expiry_Date": "date",
+    "Transmission": "str",
+    "Fuel_Type": "str",
+    "Engine_Capacity_cc": "Int64",
+    "Horse_Power_kW": "float",
+    "Scrape_Date": "date",
+    "Posted_Date": "date",
+    "Vehicle_Age_Years": "Int64",
+    "Vehicle_Age_Days": "Int64",
+    "COE_Left_Days": "float",
+    "COE_Category": "str",
+    "COE_Cycles": "Int64",
+    "COE_Renewed": "str",
+    "Website": "str",
+}
+
+# Sidecar of the incremental ETL (modules/incremental_etl.py): one row per cleaned raw row
+CLEAN_HASH_SCHEMA = {"URL": "str", "Row_Hash": "str", "ETL_Version": "str"}
+
+COMBINED_CAR_SCHEMA = {**CLEAN_CAR_SCHEMA, "COE_Renewed": "boolean", "Vehicle_ID": "str"}
+
+FINAL_CAR_SCHEMA = {
+    **COMBINED_CAR_SCHEMA,
+    "Previous_COE": "float",
+    "Horse_Power_kW": "Int64",
+    "COE_Left_Days": "Int64",
+    "Stocks_Monthly_Avg": "Int64",
+    "Quota_Current_COE": "Int64",
+    "Bids_Success_Current_COE": "Int64",
+    "Bids_Received_Current_COE": "Int64",
+    "Premium_Current_COE": "Int64",
+    "Previous_COE_Per_Month_Remaining": "Int64",
+    "Current_COE_Per_Month_Remaining": "Int64",
+    "Five_Year_COE": "boolean",
+    "Classic_Car": "boolean",
+}
+FINAL_CAR_SCHEMA.pop("COE")
+
+DATASET_SCHEMAS = {
+    # Raw scrapes are mostly text; only the typed flags are pinned
+    "sgcarmart": {"url": "str", "date_scraped": "str"},
+    "motorist": {"url": "str", "listing_id": "str", "scrape_date": "str"},
+    "carro": {"url": "str", "sold": "boolean", "scrape_date": "str"},
+    "carpopulation": {},
+    "coe": {
+        "Bidding_Date": "date",
+        "Vehicle_Class": "str",
+        "Quota": "float",
+        "Bids_Success": "float",
+        "Bids_Received": "float",
+        "Premium": "float",
+    },
+    "pqp": {
+        "Month": "date",
+        "Vehicle_Class": "str",
+        "PQP_Price_Ten_Year": "Int64",
+        "PQP_Price_Five_Year": "Int64",
+    },
+    "stock": {"Year": "Int64", "Month": "Int64", "Average_Close": "float"},
+    # Reference dimensions (modules/reference_dimensions.py) published by extract_coe / extract_stock
+    "coe_rounds_dim": {
+        "Vehicle_Class": "str",
+        "Bidding_Day": "Int64",
+        "Quota": "float",
+        "Bids_Success": "float",
+        "Bids_Received": "float",
+        "Premium": "float",
+    },
+    "pqp_dim": {
+        "Vehicle_Class": "str",
+        "Month_Number": "Int64",
+        "PQP_Price_Ten_Year": "Int64",
+        "PQP_Price_Five_Year": "Int64",
+    },
+    "stock_dim": {"Month_Number": "Int64", "Stocks_Monthly_Avg": "Int64"},
+    "sgcarmart_clean": CLEAN_CAR_SCHEMA,
+    "motorist_clean": CLEAN_CAR_SCHEMA,
+    "carro_clean": CLEAN_CAR_SCHEMA,
+    "sgcarmart_clean_hashes": CLEAN_HASH_SCHEMA,
+    "motorist_clean_hashes": CLEAN_HASH_SCHEMA,
+    "carro_clean_hashes": CLEAN_HASH_SCHEMA,
+    "combined_car_data": COMBINED_CAR_SCHEMA,
+    "final_dashboard_data": FINAL_CAR_SCHEMA,
+    # Incremental merge_all / BigQuery delta (modules/incremental_merge.py)
+    "final_dashboard_inputs": {"URL": "str", "Input_Hash": "str", "Merge_Version": "str"},
+    "final_dashboard_published": {"URL": "str", "Output_Hash": "str", "Occurrence": "Int64"},
+    "final_dashboard_delta": FINAL_CAR_SCHEMA,
+    "final_dashboard_delta_keys": {"URL": "str"},
+    "final_ml_data": FINAL_CAR_SCHEMA,
+    "final_coe_data": {
+        "Bidding_Date": "date",
+        "Vehicle_Class": "str",
+        "Quota": "Int64",
+        "Bids_Success": "Int64",
+        "Bids_Received": "Int64",
+        "Premium": "Int64",
+        "Premium_Forecast": "Int64",
+        "CI_Lower": "Int64",
+        "CI_Upper": "Int64",
+    },
+}
+
+
+# =========================
+# SCHEMA HELPERS
+# =========================
+def _as_text(s: pd.Series) -> pd.Series:
+    # keep blanks as NaN so downstream isna()/dropna() behave like after read_csv
+    out = s.astype(object).where(s.notna(), np.nan)
+    mask = out.notna()
+    out[mask] = out[mask].astype(str)
+    return out
+
+def _cast(s: pd.Series, kind: str) -> pd.Series:
+    if kind == "str":
+        return _as_text(s)
+    if kind == "float":
+        return pd.to_numeric(s, errors="coerce").astype("float64")
+    if kind == "Int64":
+        return pd.to_numeric(s, errors="coerce").round().astype("Int64")
+    if kind == "boolean":
+        if pd.api.types.is_bool_dtype(s):
+            return s.astype("boolean")
+        m = s.astype(str).str.strip().str.lower()
+        out = pd.Series(pd.NA, index=s.index, dtype="boolean")
+        out[m.isin({"true", "1", "yes", "y", "t"})] = True
+        out[m.isin({"false", "0", "no", "n", "f"})] = False
+        return out
+    if kind == "date":
+        if pd.api.types.is_datetime64_any_dtype(s):
+            return s.dt.normalize()
+        return pd.to_datetime(s, errors="coerce").dt.normalize()
+    raise ValueError(f"Unknown column type '{kind}'")
+
+def apply_schema(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Returns a copy of df with the column types declared for dataset `name`.
+    Unknown object columns are written as text so Parquet never sees mixed types.
+    """
+    schema = DATASET_SCHEMAS.get(name, {})
+    out = df.copy()
+    for col in out.columns:
+        if col in schema:
+            out[col] = _cast(out[col], schema[col])
+        elif out[col].dtype == object:
+            out[col] = _as_text(out[col])
+    return out
+
+
+# =========================
+# PARQUET READ / WRITE
+# =========================
+def to_arrow_table(df: pd.DataFrame, name: str) -> pa.Table:
+    df = apply_schema(df, name)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # "date" columns are stored as DATE so BigQuery loads them as DATE, not TIMESTAMP
+    schema = DATASET_SCHEMAS.get(name, {})
+    fields = []
+    for field in table.schema:
+        if schema.get(field.name) == "date":
+            field = field.with_type(pa.date32())
+        fields.append(field)
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata), safe=False)
+
+def write_parquet(df: pd.DataFrame, where, name: str):
+    """Write df (typed with the schema for `name`) to a path or writable file object."""
+    table = to_arrow_table(df, name)
+    pq.write_table(table, where, compression=PARQUET_COMPRESSION)
+    return table.num_rows
+
+def read_parquet(source, columns=None) -> pd.DataFrame:
+    """
+    Read a Parquet path or file object, optionally only the given columns.
+    DATE columns come back as datetime64 and text blanks as NaN.
+    """
+    table = pq.read_table(source, columns=columns)
+    # self_destruct frees each Arrow column once converted, so we never hold two full copies
+    df = table.to_pandas(date_as_object=False, split_blocks=True, self_destruct=True)
+    del table
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+# =========================
+# OBJECT STORES
+# =========================
+class GCSObjectStore:
+    """
+    Streams objects to and from a GCS bucket without touching local disk.
+    Uploads are chunked resumable uploads from an in-memory buffer; downloads
+    are ranged reads, so Parquet column projection only fetches what it needs.
+    """
+
+    def __init__(self, client, bucket_name: str, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.bucket = client.bucket(bucket_name)
+        self.chunk_size = chunk_size
+
+    def exists(self, object_name: str) -> bool:
+        return self.bucket.blob(object_name).exists()
+
+    def stat(self, object_name: str):
+        """Object metadata (generation, size, custom metadata) without the body, or None."""
+        blob = self.bucket.get_blob(object_name)
+        if blob is None:
+            return None
+        return {"generation": blob.generation, "size": blob.size, "metadata": dict(blob.metadata or {})}
+
+    def upload_from_file(self, object_name: str, fileobj, content_type: str = None, metadata: dict = None):
+        blob = self.bucket.blob(object_name, chunk_size=self.chunk_size)
+        if metadata:
+            blob.metadata = metadata
+        blob.upload_from_file(fileobj, rewind=True, content_type=content_type)
+
+    def open_read(self, object_name: str):
+        return self.bucket.blob(object_name).open("rb", chunk_size=self.chunk_size)
+
+    def download_to_file(self, object_name: str, fileobj, generation=None):
+        # pinning the generation guarantees the bytes match what stat() reported
+        blob = self.bucket.blob(object_name, generation=generation, chunk_size=self.chunk_size)
+        blob.download_to_file(fileobj)
+
+
+class LocalObjectStore:
+    """
+    Directory-backed stand-in for a GCS bucket with the same interface as
+    GCSObjectStore. Used to run the DAG helpers locally or against a fake GCS.
+    Writes are atomic (temp file + rename) so parallel tasks never see partial objects.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, object_name: str) -> str:
+        return os.path.join(self.root, *object_name.split("/"))
+
+    def exists(self, object_name: str) -> bool:
+        return os.path.isfile(self._path(object_name))
+
+    def stat(self, object_name: str):
+        path = self._path(object_name)
+        if not os.path.isfile(path):
+            return None
+        st = os.stat(path)
+        metadata = {}
+        if os.path.isfile(path + ".metadata.json"):
+            with open(path + ".metadata.json", encoding="utf-8") as f:
+                metadata = json.load(f)
+        return {"generation": st.st_mtime_ns, "size": st.st_size, "metadata": metadata}
+
+    def _atomic_write(self, path: str, fileobj):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(fileobj, f, UPLOAD_CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def upload_from_file(self, object_name: str, fileobj, content_type: str = None, metadata: dict = None):
+        path = self._path(object_name)
+        if metadata:
+            self._atomic_write(path + ".metadata.json", io.BytesIO(json.dumps(metadata).encode("utf-8")))
+        fileobj.seek(0)
+        self._atomic_write(path, fileobj)
+
+    def open_read(self, object_name: str):
+        return open(self._path(object_name), "rb")
+
+    def download_to_file(self, object_name: str, fileobj, generation=None):
+        with self.open_read(object_name) as f:
+            shutil.copyfileobj(f, fileobj, UPLOAD_CHUNK_SIZE)
+
+
+# =========================
+# DATAFRAME TRANSFERS
+# =========================
+def upload_df(store, df: pd.DataFrame, object_name: str, name: str) -> int:
+    """
+    Serialise df to Parquet in memory and upload it in one go. The object is only
+    replaced once serialisation has fully succeeded. Returns the row count.
+    """
+    buf = io.BytesIO()
+    num_rows = write_parquet(df, buf, name)
+    # row/column counts ride along as object metadata so checks need no download
+    metadata = {"dataset": name, "row_count": str(num_rows), "column_count": str(len(df.columns))}
+    store.upload_from_file(object_name, buf, content_type=PARQUET_MIME, metadata=metadata)
+    return num_rows
+
+def download_df(store, object_name: str, columns=None) -> pd.DataFrame:
+    """Stream a Parquet (or legacy .csv) object from the store into a DataFrame."""
+    with store.open_read(object_name) as f:
+        if object_name.endswith(".csv"):
+            return pd.read_csv(f, usecols=columns or None)
+        return read_parquet(f, columns=columns)